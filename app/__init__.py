@@ -1,58 +1,93 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
-from flask_cors import CORS
-from flask_migrate import Migrate
-from config.config import config
-import os
-
-db = SQLAlchemy()
-jwt = JWTManager()
-migrate = Migrate()
-
-def create_app(config_name=None):
-    """Application factory function"""
-    if config_name is None:
-        config_name = os.getenv('FLASK_ENV', 'development')
-    
-    # Serve frontend from 'frontend' directory
-    frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
-    app = Flask(__name__, static_folder=frontend_path, static_url_path='/')
-    app.config.from_object(config[config_name])
-    
-    # Initialize extensions
-    db.init_app(app)
-    jwt.init_app(app)
-    CORS(app)
-    migrate.init_app(app, db)
-    
-    # Serve frontend files
-    @app.route('/')
-    def serve_index():
-        return app.send_static_file('index.html')
-    
-    @app.route('/<path:path>')
-    def serve_static(path):
-        if path != '' and os.path.exists(os.path.join(frontend_path, path)):
-            return app.send_static_file(path)
-        return app.send_static_file('index.html')
-    
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.movies import movies_bp
-    from app.routes.streaming import streaming_bp
-    from app.routes.users import users_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(movies_bp, url_prefix='/api/movies')
-    app.register_blueprint(streaming_bp, url_prefix='/api/stream')
-    app.register_blueprint(users_bp, url_prefix='/api/users')
-    
-    # Register error handlers
-    from app.utils.error_handlers import register_error_handlers
-    register_error_handlers(app)
-    
-    with app.app_context():
-        db.create_all()
-    
-    return app
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from flask_cors import CORS
+from config.config import config
+from app.utils.db_routing import RoutingSession
+import os
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = JWTManager()
+
+def create_app(config_name=None):
+    """Application factory function"""
+    if config_name is None:
+        config_name = os.getenv('FLASK_ENV', 'development')
+    
+    app = Flask(__name__, static_folder=None)
+    app.config.from_object(config[config_name])
+    
+    # Initialize extensions (replica binds must exist before the engines are created)
+    from app.utils.db_routing import add_replica_binds, register_replica_routing
+    add_replica_binds(app)
+    db.init_app(app)
+    register_replica_routing(app, db)
+    jwt.init_app(app)
+    
+    # Reject revoked (logged out) tokens without a query on every request
+    from app.services.token_revocation_service import TokenRevocationService
+    jwt.token_in_blocklist_loader(TokenRevocationService.is_token_revoked)
+    CORS(app)
+    init_migrations(app)
+    
+    # Serve frontend from 'frontend' directory
+    from app.utils.static_assets import register_static_assets
+    frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
+    register_static_assets(app, frontend_path)
+    
+    # Register blueprints
+    from app.routes.auth import auth_bp
+    from app.routes.movies import movies_bp
+    from app.routes.streaming import streaming_bp
+    from app.routes.users import users_bp
+    from app.routes.images import images_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(movies_bp, url_prefix='/api/movies')
+    app.register_blueprint(streaming_bp, url_prefix='/api/stream')
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(images_bp, url_prefix='/api/images')
+    
+    # Register error handlers
+    from app.utils.error_handlers import register_error_handlers
+    register_error_handlers(app)
+    
+    # Tag log records with request ids and write the (sampled) access log
+    from app.utils.logger_config import register_request_logging
+    register_request_logging(app)
+    
+    # Register metrics collection and the /metrics endpoint
+    from app.utils.metrics import register_metrics
+    register_metrics(app)
+    
+    # Add the Server-Timing breakdown (database, S3, TMDB) to responses
+    from app.utils.server_timing import register_server_timing
+    register_server_timing(app)
+    
+    # Register per-request query budgets (no-op unless QUERY_BUDGET_MODE is set)
+    from app.utils.query_budget import register_query_budget
+    register_query_budget(app)
+    
+    # Compress large API responses
+    from app.utils.compression import register_compression
+    register_compression(app)
+    
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+    
+    return app
+
+def init_migrations(app):
+    """Wire up Flask-Migrate for the `flask db` commands.
+    
+    Flask-Migrate imports Alembic, which dominates import time, so it is only
+    loaded when the app is created by the flask CLI (inside a click context)
+    or MIGRATIONS_ENABLED is set. Servers skip it entirely.
+    Schema changes are applied with `flask db upgrade` or `flask init-db`.
+    """
+    import click
+    if click.get_current_context(silent=True) is None and not app.config.get('MIGRATIONS_ENABLED'):
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db)
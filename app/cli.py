@@ -0,0 +1,192 @@
+import click
+import json
+from datetime import timedelta
+
+
+def register_commands(app):
+    """Register flask CLI commands"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create missing database tables and add the columns and indexes older ones lack"""
+        from app import db
+        from app.utils.schema import upgrade_schema
+
+        db.create_all()
+        click.echo('Database tables created')
+        for change in upgrade_schema(db):
+            click.echo(change)
+
+    @app.cli.group()
+    def storage():
+        """S3 storage maintenance commands"""
+
+    @storage.command('reconcile')
+    @click.option('--prefix', default='movies/', show_default=True, help='Only reconcile keys under this prefix')
+    @click.option('--delete', 'delete_orphans', is_flag=True, help='Batch-delete orphaned objects')
+    @click.option('--workers', default=4, show_default=True, help='Parallel delete_objects requests')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows per keyset page')
+    @click.option('--grace-hours', default=24, show_default=True,
+                  help='Ignore orphans newer than this (uploads still in progress)')
+    @click.option('--verbose', is_flag=True, help='Print every finding as it is found')
+    def reconcile(prefix, delete_orphans, workers, batch_size, grace_hours, verbose):
+        """Report orphaned objects, missing objects and size mismatches"""
+        from app.services import s3_service
+        from app.services.storage_reconciliation_service import StorageReconciler
+
+        reconciler = StorageReconciler(
+            s3_service.get(),
+            prefix=prefix,
+            batch_size=batch_size,
+            grace_period=timedelta(hours=grace_hours),
+            delete_orphans=delete_orphans,
+            workers=workers
+        )
+
+        def print_finding(kind, details):
+            click.echo(json.dumps({'finding': kind, **details}))
+
+        report = reconciler.run(on_finding=print_finding if verbose else None)
+        click.echo(json.dumps(report.to_dict(), indent=2))
+
+    @app.cli.group()
+    def genres():
+        """Genre catalog commands"""
+
+    @genres.command('sync')
+    def sync_genres():
+        """Import TMDB's genre list so TMDB genre ids map onto local genres"""
+        from app.services import tmdb_service
+        from app.services.genre_service import GenreService
+
+        created = GenreService.sync_tmdb_genres(tmdb_service.get().get_genres())
+        click.echo(f'Synced TMDB genres, {created} new')
+
+    @genres.command('backfill')
+    @click.option('--batch-size', default=1000, show_default=True, help='Movies per transaction')
+    def backfill_genres(batch_size):
+        """Link movies to genres parsed from their free-text genre"""
+        from app.services.genre_service import GenreService
+
+        linked = GenreService.backfill(batch_size)
+        click.echo(f'Linked {linked} movies to genres')
+
+    @app.cli.group()
+    def recommendations():
+        """Co-watch recommendation index commands"""
+
+    @recommendations.command('build')
+    @click.option('--top-k', default=None, type=int, help='Neighbours kept per movie (default: RECOMMENDATIONS_TOP_K)')
+    def build_recommendations(top_k):
+        """Rebuild the recommendation index from the whole watch history"""
+        from app.services.recommendation_service import RecommendationService
+
+        index, movies = RecommendationService.build_index(top_k)
+        click.echo(f'Indexed {movies} movies up to watch row {index.watermark}')
+
+    @recommendations.command('refresh')
+    def refresh_recommendations():
+        """Fold new watch history rows into the recommendation index"""
+        from app.services.recommendation_service import RecommendationService
+
+        index, recomputed = RecommendationService.refresh_index()
+        click.echo(f'Recomputed {recomputed} movies, watermark {index.watermark}')
+
+    @app.cli.group()
+    def trending():
+        """Local trending ranking commands"""
+
+    @trending.command('prune')
+    def prune_trending():
+        """Delete trending scores that have decayed below TRENDING_MIN_SCORE"""
+        from app.services.trending_service import trending as engine
+
+        _, pruned = engine.flush()
+        click.echo(f'Pruned {pruned} decayed trending scores')
+
+    @app.cli.group()
+    def rollups():
+        """Engagement rollup commands"""
+
+    @rollups.command('run')
+    @click.option('--batch-size', default=5000, show_default=True, help='Watch history rows per transaction')
+    @click.option('--overlap-minutes', default=5, show_default=True,
+                  help='Re-read rows this far behind the watermark to catch late commits')
+    def run_rollups(batch_size, overlap_minutes):
+        """Fold watch history changed since the last run into the engagement rollups"""
+        from app.services.engagement_service import EngagementRollup
+
+        processed = EngagementRollup(batch_size=batch_size, overlap=timedelta(minutes=overlap_minutes)).run()
+        click.echo(f'Processed {processed} watch history rows')
+
+    @app.cli.group()
+    def history():
+        """Watch history maintenance commands"""
+
+    @history.command('archive')
+    @click.option('--days', default=None, type=int, help='Archive entries untouched this long (default: HISTORY_ARCHIVE_AFTER_DAYS)')
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows per transaction')
+    @click.option('--max-batches', default=None, type=int, help='Stop after this many batches')
+    def archive_history(days, batch_size, max_batches):
+        """Move watch history entries nobody touched recently to watch_history_archive"""
+        from app.services.history_archive_service import HistoryArchiver
+
+        max_age = timedelta(days=days if days is not None else app.config['HISTORY_ARCHIVE_AFTER_DAYS'])
+        moved = HistoryArchiver(max_age, batch_size=batch_size).run(max_batches)
+        click.echo(f'Archived {moved} watch history entries')
+
+    @app.cli.group()
+    def tokens():
+        """Token revocation commands"""
+
+    @tokens.command('prune')
+    def prune_tokens():
+        """Delete revocations of tokens that have expired"""
+        from app.services.token_revocation_service import revocations
+
+        removed = revocations.prune()
+        click.echo(f'Pruned {removed} expired token revocations')
+
+    @app.cli.group()
+    def jobs():
+        """Background job queue commands"""
+
+    @jobs.command('work')
+    @click.option('--concurrency', default=None, type=int, help='Worker threads (default: JOBS_WORKERS)')
+    @click.option('--once', is_flag=True, help='Run the jobs that are due now and exit')
+    def work_jobs(concurrency, once):
+        """Run queued jobs until interrupted"""
+        import signal
+        from app.services.job_service import JobService, JobWorker
+
+        if once:
+            click.echo(f'Ran {JobService.run_pending()} jobs')
+            return
+
+        worker = JobWorker(app, concurrency=concurrency)
+        # SIGTERM (e.g. from docker stop) lets running jobs finish before exiting
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stopping.set())
+        worker.start()
+        click.echo(f'Job worker started with {worker.concurrency} threads')
+        try:
+            while not worker.stopping.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        worker.stop()
+        click.echo('Job worker stopped')
+
+    @jobs.command('status')
+    def job_status():
+        """Print the number of jobs in each state"""
+        from app.services.job_service import JobService
+
+        click.echo(json.dumps(JobService.counts(), indent=2))
+
+    @jobs.command('prune')
+    @click.option('--days', default=7, show_default=True, help='Keep finished jobs this many days')
+    def prune_jobs(days):
+        """Delete finished and failed jobs older than --days"""
+        from app.services.job_service import JobService
+
+        click.echo(f'Pruned {JobService.prune(timedelta(days=days))} finished jobs')
@@ -1 +1 @@
-# Middleware package
+# Middleware package
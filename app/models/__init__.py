@@ -1,5 +1,12 @@
-from app.models.user import User
-from app.models.movie import Movie
-from app.models.watch_history import WatchHistory
-
-__all__ = ['User', 'Movie', 'WatchHistory']
+from app.models.user import User
+from app.models.movie import Movie
+from app.models.genre import Genre, movie_genres
+from app.models.watch_history import ArchivedWatchHistory, WatchHistory
+from app.models.trending_score import TrendingScore
+from app.models.engagement import MovieDailyStats, MovieEngagement, RollupState
+from app.models.job import Job
+from app.models.revoked_token import RevokedToken
+from app.models.stored_object import StoredObject
+
+__all__ = ['User', 'Movie', 'Genre', 'movie_genres', 'WatchHistory', 'ArchivedWatchHistory', 'TrendingScore',
+           'MovieDailyStats', 'MovieEngagement', 'RollupState', 'Job', 'RevokedToken', 'StoredObject']
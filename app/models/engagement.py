@@ -0,0 +1,41 @@
+from app import db
+from datetime import datetime
+
+class MovieDailyStats(db.Model):
+    """Per-movie, per-day engagement aggregates maintained by the rollup job"""
+    __tablename__ = 'movie_daily_stats'
+    
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    starts = db.Column(db.Integer, nullable=False, default=0)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    seconds_watched = db.Column(db.BigInteger, nullable=False, default=0)
+    unique_viewers = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """Convert daily stats to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'starts': self.starts,
+            'completions': self.completions,
+            'seconds_watched': self.seconds_watched,
+            'unique_viewers': self.unique_viewers
+        }
+
+class MovieEngagement(db.Model):
+    """All-time engagement totals per movie, one row read per title"""
+    __tablename__ = 'movie_engagement'
+    
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    starts = db.Column(db.Integer, nullable=False, default=0)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    seconds_watched = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RollupState(db.Model):
+    """Watermark of an incremental rollup job"""
+    __tablename__ = 'rollup_state'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    watermark = db.Column(db.DateTime, nullable=False, default=datetime(1970, 1, 1))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,27 @@
+from app import db
+
+# Many-to-many link; the primary key serves movie -> genres, the index genre -> movies
+movie_genres = db.Table(
+    'movie_genres',
+    db.Column('movie_id', db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_movie_genres_genre_movie', 'genre_id', 'movie_id')
+)
+
+class Genre(db.Model):
+    """Normalized movie genre, optionally linked to its TMDB genre id"""
+    __tablename__ = 'genres'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False, index=True)  # Lowercase key used in ?genre= filters
+    tmdb_id = db.Column(db.Integer, unique=True)
+    
+    def to_dict(self):
+        """Convert genre to dictionary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug,
+            'tmdb_id': self.tmdb_id
+        }
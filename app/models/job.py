@@ -0,0 +1,46 @@
+from app import db
+from datetime import datetime
+import json
+
+class Job(db.Model):
+    """Unit of background work claimed and run by `flask jobs work`"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments for the handler
+    idempotency_key = db.Column(db.String(255), unique=True)  # Enqueueing the same key twice returns the first job
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this time
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)  # A running job past this is presumed crashed and claimable again
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, index=True)
+    
+    __table_args__ = (
+        # Serves the claim query: due jobs by status, oldest first
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    
+    @property
+    def arguments(self):
+        return json.loads(self.payload)
+    
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': self.arguments,
+            'idempotency_key': self.idempotency_key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat(),
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,13 @@
+from app import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """JWT revoked before it expired (logout); rows are pruned once the token expires"""
+    __tablename__ = 'revoked_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Processes sync their revocation filters past the last id seen
+    jti = db.Column(db.String(36), unique=True, nullable=False, index=True)
+    token_type = db.Column(db.String(10), nullable=False)  # access or refresh
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
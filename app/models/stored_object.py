@@ -0,0 +1,15 @@
+from app import db
+from datetime import datetime
+
+class StoredObject(db.Model):
+    """An uploaded file stored once in S3, keyed by its SHA-256 and shared by every movie with the same content"""
+    __tablename__ = 'stored_objects'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False, index=True)  # Hex digest of the content
+    s3_key = db.Column(db.String(500), unique=True, nullable=False)  # movies/sha256/<hex>/<random>, never reused
+    size = db.Column(db.BigInteger, nullable=False)
+    checksum_sha256 = db.Column(db.String(64))  # S3 ChecksumSHA256 (base64, "-<parts>" when multipart), verified after upload
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, ready or failed
+    ref_count = db.Column(db.Integer, default=1, nullable=False)  # Movies pointing at it; the object is released at 0
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+class TrendingScore(db.Model):
+    """Persisted exponentially decayed popularity of a movie"""
+    __tablename__ = 'trending_scores'
+    
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    # log of the decayed score scaled to TRENDING_EPOCH; ordering by it is time independent
+    log_score = db.Column(db.Float, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert trending score to dictionary"""
+        return {
+            'movie_id': self.movie_id,
+            'log_score': self.log_score,
+            'updated_at': self.updated_at.isoformat()
+        }
@@ -1,33 +1,76 @@
-from app import db
-from datetime import datetime
-
-class WatchHistory(db.Model):
-    """Watch history model for tracking user viewing activity"""
-    __tablename__ = 'watch_history'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False, index=True)
-    watch_time = db.Column(db.Integer, default=0)  # Seconds watched
-    total_duration = db.Column(db.Integer)  # Total movie duration in seconds
-    is_completed = db.Column(db.Boolean, default=False)
-    viewed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    last_watched = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
-    
-    __table_args__ = (
-        db.UniqueConstraint('user_id', 'movie_id', name='_user_movie_uc'),
-    )
-    
-    def to_dict(self):
-        """Convert watch history to dictionary"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'movie_id': self.movie_id,
-            'watch_time': self.watch_time,
-            'total_duration': self.total_duration,
-            'progress_percentage': round((self.watch_time / self.total_duration * 100) if self.total_duration else 0),
-            'is_completed': self.is_completed,
-            'viewed_at': self.viewed_at.isoformat(),
-            'last_watched': self.last_watched.isoformat()
-        }
+from app import db
+from datetime import datetime
+
+class WatchHistory(db.Model):
+    """Watch history model for tracking user viewing activity"""
+    __tablename__ = 'watch_history'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False, index=True)
+    watch_time = db.Column(db.Integer, default=0)  # Seconds watched
+    total_duration = db.Column(db.Integer)  # Total movie duration in seconds
+    is_completed = db.Column(db.Boolean, default=False)
+    viewed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_watched = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # What the engagement rollup has already counted for this row
+    rolled_watch_time = db.Column(db.Integer)  # NULL until the row is first rolled up
+    rolled_completed = db.Column(db.Boolean, default=False)
+    rolled_day = db.Column(db.Date)  # Last day this viewer was counted as unique
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'movie_id', name='_user_movie_uc'),
+        # Serves "continue watching": a user's unfinished entries, newest first
+        db.Index('ix_watch_history_user_progress', 'user_id', 'is_completed', 'last_watched'),
+        # Ids must not be reused once rows move to the archive (SQLite otherwise restarts from the highest live id)
+        {'sqlite_autoincrement': True},
+    )
+    
+    def to_dict(self):
+        """Convert watch history to dictionary"""
+        return history_entry_dict(self)
+
+class ArchivedWatchHistory(db.Model):
+    """Watch history entries untouched for HISTORY_ARCHIVE_AFTER_DAYS, moved out of watch_history.
+    
+    Same columns and ids as watch_history, with only the indexes that reads
+    and movie deletes need.  Written in batches by HistoryArchiver; an entry
+    moves back when its user watches the movie again.
+    """
+    __tablename__ = 'watch_history_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # The id it had in watch_history
+    user_id = db.Column(db.Integer, nullable=False)
+    movie_id = db.Column(db.Integer, nullable=False, index=True)
+    watch_time = db.Column(db.Integer, default=0)
+    total_duration = db.Column(db.Integer)
+    is_completed = db.Column(db.Boolean, default=False)
+    viewed_at = db.Column(db.DateTime)
+    last_watched = db.Column(db.DateTime)
+    rolled_watch_time = db.Column(db.Integer)
+    rolled_completed = db.Column(db.Boolean, default=False)
+    rolled_day = db.Column(db.Date)
+    archived_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    
+    __table_args__ = (
+        db.Index('ix_watch_history_archive_user_last_watched', 'user_id', 'last_watched'),
+    )
+    
+    def to_dict(self):
+        """Convert archived watch history to dictionary"""
+        return history_entry_dict(self)
+
+def history_entry_dict(entry):
+    """Serialize a watch history entry, live or archived (or a row selecting the same columns)"""
+    return {
+        'id': entry.id,
+        'user_id': entry.user_id,
+        'movie_id': entry.movie_id,
+        'watch_time': entry.watch_time,
+        'total_duration': entry.total_duration,
+        'progress_percentage': round((entry.watch_time / entry.total_duration * 100) if entry.total_duration else 0),
+        'is_completed': entry.is_completed,
+        'viewed_at': entry.viewed_at.isoformat(),
+        'last_watched': entry.last_watched.isoformat()
+    }
@@ -1,52 +1,79 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import AuthService
-from flask_jwt_extended import jwt_required, get_jwt_identity
-
-auth_bp = Blueprint('auth', __name__)
-
-@auth_bp.route('/register', methods=['POST'])
-def register():
-    """Register a new user"""
-    data = request.get_json()
-    
-    if not data or not all(k in data for k in ['username', 'email', 'password']):
-        return jsonify({'error': 'Missing required fields'}), 400
-    
-    if len(data['password']) < 8:
-        return jsonify({'error': 'Password must be at least 8 characters'}), 400
-    
-    response, status_code = AuthService.register_user(
-        data['username'],
-        data['email'],
-        data['password']
-    )
-    
-    return jsonify(response), status_code
-
-@auth_bp.route('/login', methods=['POST'])
-def login():
-    """Login user and get tokens"""
-    data = request.get_json()
-    
-    if not data or not all(k in data for k in ['username', 'password']):
-        return jsonify({'error': 'Missing username or password'}), 400
-    
-    response, status_code = AuthService.login_user(data['username'], data['password'])
-    
-    return jsonify(response), status_code
-
-@auth_bp.route('/refresh', methods=['POST'])
-@jwt_required(refresh=True)
-def refresh():
-    """Refresh access token"""
-    user_id = get_jwt_identity()
-    response, status_code = AuthService.refresh_access_token(user_id)
-    
-    return jsonify(response), status_code
-
-@auth_bp.route('/verify', methods=['GET'])
-@jwt_required()
-def verify_token():
-    """Verify JWT token is valid"""
-    user_id = get_jwt_identity()
-    return jsonify({'user_id': user_id, 'valid': True}), 200
+from flask import Blueprint, request, jsonify
+from app.services.auth_service import AuthService
+from app.utils.query_budget import query_budget
+from flask_jwt_extended import decode_token, get_jwt, get_jwt_identity, jwt_required
+
+auth_bp = Blueprint('auth', __name__)
+
+@auth_bp.route('/register', methods=['POST'])
+@query_budget(5)
+def register():
+    """Register a new user"""
+    data = request.get_json()
+    
+    if not data or not all(k in data for k in ['username', 'email', 'password']):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if len(data['password']) < 8:
+        return jsonify({'error': 'Password must be at least 8 characters'}), 400
+    
+    response, status_code = AuthService.register_user(
+        data['username'],
+        data['email'],
+        data['password']
+    )
+    
+    return jsonify(response), status_code
+
+@auth_bp.route('/login', methods=['POST'])
+@query_budget(3)
+def login():
+    """Login user and get tokens"""
+    data = request.get_json()
+    
+    if not data or not all(k in data for k in ['username', 'password']):
+        return jsonify({'error': 'Missing username or password'}), 400
+    
+    response, status_code = AuthService.login_user(data['username'], data['password'])
+    
+    return jsonify(response), status_code
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+@query_budget(2)
+def refresh():
+    """Refresh access token"""
+    user_id = get_jwt_identity()
+    response, status_code = AuthService.refresh_access_token(user_id)
+    
+    return jsonify(response), status_code
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+@query_budget(2)
+def logout():
+    """Revoke the presented token, and the refresh token in the body if one is given"""
+    tokens = [get_jwt()]
+    data = request.get_json(silent=True) or {}
+    
+    if data.get('refresh_token'):
+        try:
+            refresh_token = decode_token(data['refresh_token'])
+        except Exception:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if refresh_token['type'] != 'refresh' or refresh_token['sub'] != get_jwt_identity():
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if refresh_token['jti'] != tokens[0]['jti']:
+            tokens.append(refresh_token)
+    
+    response, status_code = AuthService.logout(tokens)
+    
+    return jsonify(response), status_code
+
+@auth_bp.route('/verify', methods=['GET'])
+@jwt_required()
+@query_budget(0)
+def verify_token():
+    """Verify JWT token is valid"""
+    user_id = get_jwt_identity()
+    return jsonify({'user_id': user_id, 'valid': True}), 200
@@ -0,0 +1,29 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.services.image_service import IMAGE_FORMATS, SOURCE_NAME, ImageUnavailable, images
+from app.utils.query_budget import query_budget
+from app.utils.static_assets import IMMUTABLE_CACHE_CONTROL
+import hashlib
+
+images_bp = Blueprint('images', __name__)
+
+@images_bp.route('/<int:width>/<image_format>/<name>', methods=['GET'])
+@query_budget(0)
+def get_image(width, image_format, name):
+    """Get a poster or backdrop resized to one of the configured widths"""
+    if width not in current_app.config['IMAGE_WIDTHS'] or image_format not in IMAGE_FORMATS or not SOURCE_NAME.match(name):
+        return jsonify({'error': 'Image not found'}), 404
+    
+    # A variant never changes for a given URL and quality, so revalidation needs no disk access
+    etag = hashlib.sha256(f"{name}/{width}/{image_format}/{current_app.config['IMAGE_QUALITY']}".encode()).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            data = images.get_variant(name, width, image_format)
+        except ImageUnavailable as e:
+            return jsonify({'error': str(e)}), 502
+        response = Response(data, mimetype=IMAGE_FORMATS[image_format])
+    
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.set_etag(etag)
+    return response
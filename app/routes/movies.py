@@ -1,226 +1,396 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.movie_service import MovieService
-from app.services.s3_service import S3Service
-from app.services.tmdb_service import TMDBService
-from app.models.movie import Movie
-from app import db
-from werkzeug.utils import secure_filename
-from datetime import datetime
-import os
-
-movies_bp = Blueprint('movies', __name__)
-s3_service = S3Service()
-tmdb_service = TMDBService()
-
-ALLOWED_EXTENSIONS = {'mp4', 'mkv', 'avi', 'mov', 'flv', 'wmv'}
-MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 5368709120))  # 5GB
-
-def allowed_file(filename):
-    """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-@movies_bp.route('/upload', methods=['POST'])
-@jwt_required()
-def upload_movie():
-    """Upload a new movie"""
-    user_id = get_jwt_identity()
-    
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    if not allowed_file(file.filename):
-        return jsonify({'error': 'File type not allowed'}), 400
-    
-    # Check file size
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({'error': 'File size exceeds maximum allowed'}), 413
-    
-    try:
-        # Get metadata from request
-        metadata = {
-            'title': request.form.get('title', 'Untitled'),
-            'description': request.form.get('description', ''),
-            'genre': request.form.get('genre', ''),
-            'tmdb_id': request.form.get('tmdb_id')
-        }
-        
-        # Generate S3 key
-        filename = secure_filename(file.filename)
-        s3_key = f"movies/{user_id}/{datetime.utcnow().timestamp()}_{filename}"
-        
-        # Upload to S3
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        s3_service.upload_movie(
-            file,
-            s3_key,
-            content_type=f'video/{file_ext}',
-            metadata=metadata
-        )
-        
-        # Create movie record
-        movie_data = {
-            'title': metadata['title'],
-            'description': metadata['description'],
-            'genre': metadata['genre'],
-            'tmdb_id': metadata['tmdb_id'],
-            's3_key': s3_key,
-            'file_size': file_size,
-            'video_format': file_ext,
-            'uploader_id': user_id,
-            'is_public': request.form.get('is_public', 'false').lower() == 'true'
-        }
-        
-        movie, status_code = MovieService.create_movie(movie_data)
-        
-        return jsonify({
-            'message': 'Movie uploaded successfully',
-            'movie': movie.to_dict()
-        }), status_code
-    except Exception as e:
-        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
-
-@movies_bp.route('/<int:movie_id>', methods=['GET'])
-def get_movie(movie_id):
-    """Get movie details"""
-    movie = MovieService.get_movie_by_id(movie_id)
-    
-    if not movie:
-        return jsonify({'error': 'Movie not found'}), 404
-    
-    if not movie.is_public:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    return jsonify(movie.to_dict(include_uploader=True)), 200
-
-@movies_bp.route('', methods=['GET'])
-def list_movies():
-    """List all public movies with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    paginated = MovieService.get_public_movies(page, per_page)
-    
-    return jsonify({
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'movies': [movie.to_dict() for movie in paginated.items]
-    }), 200
-
-@movies_bp.route('/featured', methods=['GET'])
-def get_featured():
-    """Get featured movies"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    paginated = MovieService.get_featured_movies(page, per_page)
-    
-    return jsonify({
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'movies': [movie.to_dict() for movie in paginated.items]
-    }), 200
-
-@movies_bp.route('/search', methods=['GET'])
-def search_movies():
-    """Search movies"""
-    query = request.args.get('q', '', type=str)
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    if not query:
-        return jsonify({'error': 'Search query required'}), 400
-    
-    paginated = MovieService.search_movies(query, page, per_page)
-    
-    return jsonify({
-        'query': query,
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'movies': [movie.to_dict() for movie in paginated.items]
-    }), 200
-
-@movies_bp.route('/tmdb/search', methods=['GET'])
-def tmdb_search():
-    """Search movies from TMDB API"""
-    query = request.args.get('q', '', type=str)
-    page = request.args.get('page', 1, type=int)
-    
-    if not query:
-        return jsonify({'error': 'Search query required'}), 400
-    
-    try:
-        results = tmdb_service.search_movies(query, page)
-        return jsonify(results), 200
-    except Exception as e:
-        return jsonify({'error': f'TMDB search failed: {str(e)}'}), 500
-
-@movies_bp.route('/tmdb/trending', methods=['GET'])
-def tmdb_trending():
-    """Get trending movies from TMDB"""
-    time_window = request.args.get('time_window', 'week', type=str)
-    page = request.args.get('page', 1, type=int)
-    
-    if time_window not in ['day', 'week']:
-        time_window = 'week'
-    
-    try:
-        results = tmdb_service.get_trending_movies(time_window, page)
-        return jsonify(results), 200
-    except Exception as e:
-        return jsonify({'error': f'Failed to fetch trending movies: {str(e)}'}), 500
-
-@movies_bp.route('/<int:movie_id>', methods=['PUT'])
-@jwt_required()
-def update_movie(movie_id):
-    """Update movie details"""
-    user_id = get_jwt_identity()
-    movie = MovieService.get_movie_by_id(movie_id)
-    
-    if not movie:
-        return jsonify({'error': 'Movie not found'}), 404
-    
-    if movie.uploader_id != user_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    data = request.get_json()
-    allowed_fields = ['title', 'description', 'genre', 'is_public', 'is_featured']
-    update_data = {k: v for k, v in data.items() if k in allowed_fields}
-    
-    try:
-        movie, status_code = MovieService.update_movie(movie_id, update_data)
-        return jsonify(movie.to_dict()), status_code
-    except Exception as e:
-        return jsonify({'error': f'Update failed: {str(e)}'}), 500
-
-@movies_bp.route('/<int:movie_id>', methods=['DELETE'])
-@jwt_required()
-def delete_movie(movie_id):
-    """Delete a movie"""
-    user_id = get_jwt_identity()
-    movie = MovieService.get_movie_by_id(movie_id)
-    
-    if not movie:
-        return jsonify({'error': 'Movie not found'}), 404
-    
-    if movie.uploader_id != user_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    try:
-        s3_service.delete_movie(movie.s3_key)
-        MovieService.delete_movie(movie_id)
-        return jsonify({'message': 'Movie deleted successfully'}), 200
-    except Exception as e:
-        return jsonify({'error': f'Deletion failed: {str(e)}'}), 500
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services import tmdb_service
+from app.services.genre_service import GenreService, genre_slug
+from app.services.movie_service import MovieService
+from app.services.recommendation_service import RecommendationService
+from app.services.search_service import SearchService
+from app.services.trending_service import TrendingService
+from app.models.movie import Movie
+from app import db
+from app.utils.file_handler import spool_and_hash
+from app.utils.query_budget import query_budget
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import os
+
+movies_bp = Blueprint('movies', __name__)
+
+ALLOWED_EXTENSIONS = {'mp4', 'mkv', 'avi', 'mov', 'flv', 'wmv'}
+MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 5368709120))  # 5GB
+BULK_UPDATE_FIELDS = {'is_public': bool, 'genre': str}
+
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+@movies_bp.route('/upload', methods=['POST'])
+@jwt_required()
+@query_budget(9)  # 5 (6 to retry a failed upload), plus up to 3 to look up, create and link genres
+def upload_movie():
+    """Upload a new movie"""
+    user_id = get_jwt_identity()
+    
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    # Check file size
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    file.seek(0)
+    
+    if file_size > MAX_FILE_SIZE:
+        return jsonify({'error': 'File size exceeds maximum allowed'}), 413
+    
+    try:
+        # Get metadata from request
+        metadata = {
+            'title': request.form.get('title', 'Untitled'),
+            'description': request.form.get('description', ''),
+            'genre': request.form.get('genre', ''),
+            'genre_ids': request.form.get('genre_ids', ''),  # Comma-separated TMDB genre ids
+            'tmdb_id': request.form.get('tmdb_id')
+        }
+        
+        filename = secure_filename(file.filename)
+        file_ext = filename.rsplit('.', 1)[1].lower()
+        
+        # Spool to local disk, hashing on the way; a background job copies new content to S3
+        spool_dir = current_app.config['VIDEOS_UPLOAD_PATH']
+        os.makedirs(spool_dir, exist_ok=True)
+        spool_path = os.path.join(spool_dir, f"{user_id}_{datetime.utcnow().timestamp()}_{filename}")
+        digest = spool_and_hash(file.stream, spool_path, current_app.config['UPLOAD_PART_SIZE'])
+        
+        # Create movie record
+        movie_data = {
+            'title': metadata['title'],
+            'description': metadata['description'],
+            'genre': metadata['genre'],
+            'genre_ids': [int(genre_id) for genre_id in metadata['genre_ids'].split(',') if genre_id.strip().isdigit()],
+            'tmdb_id': metadata['tmdb_id'],
+            'file_size': digest.size,
+            'video_format': file_ext,
+            'uploader_id': user_id,
+            'is_public': request.form.get('is_public', 'false').lower() == 'true'
+        }
+        
+        try:
+            movie, status_code = MovieService.create_pending_upload(
+                movie_data,
+                spool_path,
+                f'video/{file_ext}',
+                metadata,
+                digest
+            )
+        except Exception:
+            os.remove(spool_path)
+            raise
+        
+        return jsonify({
+            'message': 'Movie uploaded successfully' if status_code == 201
+            else 'Upload accepted; the movie is ready to stream once processing finishes',
+            'movie': movie.to_dict()
+        }), status_code
+    except Exception as e:
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+
+@movies_bp.route('/<int:movie_id>', methods=['GET'])
+@query_budget(1)
+def get_movie(movie_id):
+    """Get movie details"""
+    movie = MovieService.get_movie_with_uploader(movie_id)
+    
+    if not movie:
+        return jsonify({'error': 'Movie not found'}), 404
+    
+    if not movie.is_public:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(movie.to_dict(include_uploader=True, include_images=True)), 200
+
+@movies_bp.route('/batch', methods=['GET'])
+@query_budget(1)
+def get_movies_batch():
+    """Get details for many movies at once, in the order requested"""
+    try:
+        movie_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+    
+    if not movie_ids:
+        return jsonify({'error': 'No ids provided'}), 400
+    
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(movie_ids) > max_items:
+        return jsonify({'error': f'At most {max_items} ids per request'}), 400
+    
+    movies = MovieService.get_movies_with_uploaders(movie_ids)
+    
+    results = []
+    for movie_id in movie_ids:
+        movie = movies.get(movie_id)
+        if not movie:
+            results.append({'id': movie_id, 'status': 404, 'error': 'Movie not found'})
+        elif not movie.is_public:
+            results.append({'id': movie_id, 'status': 403, 'error': 'Access denied'})
+        else:
+            results.append({'id': movie_id, 'status': 200, 'movie': movie.to_dict(include_uploader=True, include_images=True)})
+    
+    return jsonify({'results': results}), 200
+
+@movies_bp.route('/<int:movie_id>/similar', methods=['GET'])
+@query_budget(1)
+def get_similar_movies(movie_id):
+    """Get movies watched by the same users"""
+    limit = min(request.args.get('limit', 20, type=int), 50)
+    
+    similar = RecommendationService.get_similar_movies(movie_id, limit)
+    
+    return jsonify({
+        'movie_id': movie_id,
+        'movies': [dict(movie.to_dict(), score=round(score, 4)) for movie, score in similar]
+    }), 200
+
+@movies_bp.route('', methods=['GET'])
+@query_budget(3)
+def list_movies():
+    """List public movies with pagination, genre/year/rating filters and facet counts"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    genre = genre_slug(request.args.get('genre', '', type=str)) or None
+    year = request.args.get('year', type=int)
+    min_rating = request.args.get('min_rating', type=float)
+    
+    paginated = MovieService.get_public_movies(page, per_page, genre, year, min_rating)
+    facets = MovieService.get_catalog_facets(genre, year, min_rating)
+    
+    return jsonify({
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'current_page': page,
+        'filters': {'genre': genre, 'year': year, 'min_rating': min_rating},
+        'facets': facets,
+        'movies': [movie.to_dict(include_images=True) for movie in paginated.items]
+    }), 200
+
+@movies_bp.route('/genres', methods=['GET'])
+@query_budget(1)
+def list_genres():
+    """List all genres"""
+    return jsonify({'genres': [genre.to_dict() for genre in GenreService.list_genres()]}), 200
+
+@movies_bp.route('/featured', methods=['GET'])
+@query_budget(2)
+def get_featured():
+    """Get featured movies"""
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    paginated = MovieService.get_featured_movies(page, per_page)
+    
+    return jsonify({
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'current_page': page,
+        'movies': [movie.to_dict(include_images=True) for movie in paginated.items]
+    }), 200
+
+@movies_bp.route('/trending', methods=['GET'])
+@query_budget(2)
+def get_trending():
+    """Get movies trending with our own viewers"""
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    
+    ranked = TrendingService.get_trending_movies(limit)
+    
+    return jsonify({
+        'movies': [dict(movie.to_dict(include_images=True), trending_score=round(score, 4)) for movie, score in ranked]
+    }), 200
+
+@movies_bp.route('/search', methods=['GET'])
+@query_budget(2)
+def search_movies():
+    """Search movies"""
+    query = request.args.get('q', '', type=str)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    if not query:
+        return jsonify({'error': 'Search query required'}), 400
+    
+    paginated = MovieService.search_movies(query, page, per_page)
+    
+    return jsonify({
+        'query': query,
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'current_page': page,
+        'movies': [movie.to_dict(include_images=True) for movie in paginated.items]
+    }), 200
+
+@movies_bp.route('/search/hybrid', methods=['GET'])
+@query_budget(2)
+def hybrid_search():
+    """Search our catalog and TMDB in one request, hosted titles first"""
+    query = request.args.get('q', '', type=str)
+    limit = min(request.args.get('limit', 20, type=int), 50)
+    
+    if not query:
+        return jsonify({'error': 'Search query required'}), 400
+    
+    results, sources = SearchService.hybrid_search(query, max(limit, 1))
+    
+    return jsonify({
+        'query': query,
+        'sources': sources,
+        'results': results
+    }), 200
+
+@movies_bp.route('/tmdb/search', methods=['GET'])
+@query_budget(0)
+def tmdb_search():
+    """Search movies from TMDB API"""
+    query = request.args.get('q', '', type=str)
+    page = request.args.get('page', 1, type=int)
+    
+    if not query:
+        return jsonify({'error': 'Search query required'}), 400
+    
+    try:
+        results = tmdb_service.get().search_movies(query, page)
+        return jsonify(results), 200
+    except Exception as e:
+        return jsonify({'error': f'TMDB search failed: {str(e)}'}), 500
+
+@movies_bp.route('/tmdb/trending', methods=['GET'])
+@query_budget(0)
+def tmdb_trending():
+    """Get trending movies from TMDB"""
+    time_window = request.args.get('time_window', 'week', type=str)
+    page = request.args.get('page', 1, type=int)
+    
+    if time_window not in ['day', 'week']:
+        time_window = 'week'
+    
+    try:
+        results = tmdb_service.get().get_trending_movies(time_window, page)
+        return jsonify(results), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch trending movies: {str(e)}'}), 500
+
+@movies_bp.route('/<int:movie_id>', methods=['PUT'])
+@jwt_required()
+@query_budget(7)  # 4, plus up to 3 to look up, create and relink genres
+def update_movie(movie_id):
+    """Update movie details"""
+    user_id = get_jwt_identity()
+    movie = MovieService.get_movie_by_id(movie_id)
+    
+    if not movie:
+        return jsonify({'error': 'Movie not found'}), 404
+    
+    if movie.uploader_id != user_id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json()
+    allowed_fields = ['title', 'description', 'genre', 'is_public', 'is_featured']
+    update_data = {k: v for k, v in data.items() if k in allowed_fields}
+    
+    try:
+        movie, status_code = MovieService.update_movie(movie_id, update_data)
+        return jsonify(movie.to_dict()), status_code
+    except Exception as e:
+        return jsonify({'error': f'Update failed: {str(e)}'}), 500
+
+@movies_bp.route('/<int:movie_id>', methods=['DELETE'])
+@jwt_required()
+@query_budget(9)  # 7, plus up to 2 when the last reference to a shared file goes
+def delete_movie(movie_id):
+    """Delete a movie"""
+    user_id = get_jwt_identity()
+    movie = MovieService.get_movie_by_id(movie_id)
+    
+    if not movie:
+        return jsonify({'error': 'Movie not found'}), 404
+    
+    if movie.uploader_id != user_id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        MovieService.delete_movie(movie_id)
+        return jsonify({'message': 'Movie deleted; its file is removed in the background'}), 202
+    except Exception as e:
+        return jsonify({'error': f'Deletion failed: {str(e)}'}), 500
+
+def _bulk_movie_ids(data):
+    """Validate the ids of a bulk request; returns (ids, error response)"""
+    movie_ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(movie_ids, list) or not movie_ids or not all(
+        isinstance(movie_id, int) and not isinstance(movie_id, bool) for movie_id in movie_ids
+    ):
+        return None, (jsonify({'error': 'ids must be a non-empty list of integers'}), 400)
+    
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(movie_ids) > max_items:
+        return None, (jsonify({'error': f'At most {max_items} ids per request'}), 400)
+    
+    return movie_ids, None
+
+@movies_bp.route('/bulk/update', methods=['POST'])
+@jwt_required()
+@query_budget(6)  # 2, plus up to 4 to look up, create and relink genres
+def bulk_update_movies():
+    """Change visibility or genre of many owned movies"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    
+    movie_ids, error = _bulk_movie_ids(data)
+    if error:
+        return error
+    
+    changes = data.get('changes')
+    if not isinstance(changes, dict) or not changes or not all(
+        field in BULK_UPDATE_FIELDS and isinstance(value, BULK_UPDATE_FIELDS[field])
+        for field, value in changes.items()
+    ):
+        return jsonify({'error': 'changes must set is_public (boolean) and/or genre (string)'}), 400
+    
+    try:
+        results = MovieService.bulk_update_movies(user_id, movie_ids, changes)
+    except Exception as e:
+        return jsonify({'error': f'Update failed: {str(e)}'}), 500
+    
+    return jsonify({
+        'updated': len({result['id'] for result in results if result['status'] == 200}),
+        'results': results
+    }), 200
+
+@movies_bp.route('/bulk/delete', methods=['POST'])
+@jwt_required()
+@query_budget(9)  # 6, plus 3 to drop references to shared files
+def bulk_delete_movies():
+    """Delete many owned movies; their files are removed in the background"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    
+    movie_ids, error = _bulk_movie_ids(data)
+    if error:
+        return error
+    
+    try:
+        results = MovieService.bulk_delete_movies(user_id, movie_ids)
+    except Exception as e:
+        return jsonify({'error': f'Deletion failed: {str(e)}'}), 500
+    
+    return jsonify({
+        'deleted': len({result['id'] for result in results if result['status'] == 200}),
+        'results': results
+    }), 202
@@ -1,81 +1,135 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.s3_service import S3Service
-from app.services.movie_service import MovieService
-
-streaming_bp = Blueprint('streaming', __name__)
-s3_service = S3Service()
-
-@streaming_bp.route('/<int:movie_id>/url', methods=['GET'])
-@jwt_required()
-def get_stream_url(movie_id):
-    """Get presigned URL for streaming"""
-    user_id = get_jwt_identity()
-    
-    movie = MovieService.get_movie_by_id(movie_id)
-    
-    if not movie:
-        return jsonify({'error': 'Movie not found'}), 404
-    
-    if not movie.is_public:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    try:
-        # Generate presigned URL (valid for 1 hour)
-        stream_url = s3_service.generate_presigned_url(movie.s3_key, expiration=3600)
-        
-        # Increment view count
-        movie.increment_view_count()
-        
-        return jsonify({
-            'movie_id': movie_id,
-            'stream_url': stream_url,
-            'title': movie.title,
-            'duration': movie.duration,
-            'resolution': movie.resolution,
-            'expires_in': 3600
-        }), 200
-    except Exception as e:
-        return jsonify({'error': f'Failed to generate stream URL: {str(e)}'}), 500
-
-@streaming_bp.route('/<int:movie_id>/watch', methods=['POST'])
-@jwt_required()
-def record_watch(movie_id):
-    """Record watch progress"""
-    user_id = get_jwt_identity()
-    data = request.get_json()
-    
-    if not data or 'watch_time' not in data or 'total_duration' not in data:
-        return jsonify({'error': 'Missing watch_time or total_duration'}), 400
-    
-    try:
-        watch_entry, status_code = MovieService.record_watch(
-            user_id,
-            movie_id,
-            data['watch_time'],
-            data['total_duration']
-        )
-        
-        return jsonify({
-            'message': 'Watch progress recorded',
-            'watch_entry': watch_entry.to_dict()
-        }), status_code
-    except Exception as e:
-        return jsonify({'error': f'Failed to record watch progress: {str(e)}'}), 500
-
-@streaming_bp.route('/history', methods=['GET'])
-@jwt_required()
-def get_watch_history():
-    """Get user's watch history"""
-    user_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    paginated = MovieService.get_user_watch_history(user_id, page, per_page)
-    
-    return jsonify({
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'watch_history': [entry.to_dict() for entry in paginated.items]
-    }), 200
+from flask import Blueprint, request, jsonify, current_app, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services import s3_service
+from app.services.movie_service import MovieService
+from app.services.trending_service import TrendingService
+from app.utils.query_budget import query_budget
+import math
+
+streaming_bp = Blueprint('streaming', __name__)
+
+@streaming_bp.route('/<int:movie_id>/url', methods=['GET'])
+@jwt_required()
+@query_budget(3)
+def get_stream_url(movie_id):
+    """Get presigned URL for streaming"""
+    user_id = get_jwt_identity()
+    
+    movie = MovieService.get_movie_by_id(movie_id)
+    
+    if not movie:
+        return jsonify({'error': 'Movie not found'}), 404
+    
+    if not movie.is_public:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if movie.upload_status in ('pending', 'failed'):
+        return jsonify({'error': f'Movie upload is {movie.upload_status}'}), 409
+    
+    try:
+        # Generate presigned URL (valid for 1 hour)
+        stream_url = s3_service.get().generate_presigned_url(movie.s3_key, expiration=3600)
+        
+        # Increment view count
+        movie.increment_view_count()
+        TrendingService.record_stream(movie_id)
+        
+        return jsonify({
+            'movie_id': movie_id,
+            'stream_url': stream_url,
+            'title': movie.title,
+            'duration': movie.duration,
+            'resolution': movie.resolution,
+            'expires_in': 3600
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to generate stream URL: {str(e)}'}), 500
+
+@streaming_bp.route('/<int:movie_id>/watch', methods=['POST'])
+@jwt_required()
+@query_budget(7)  # 4, plus 3 to move an archived entry back
+def record_watch(movie_id):
+    """Record watch progress"""
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data or 'watch_time' not in data or 'total_duration' not in data:
+        return jsonify({'error': 'Missing watch_time or total_duration'}), 400
+    
+    try:
+        watch_entry, status_code = MovieService.record_watch(
+            user_id,
+            movie_id,
+            data['watch_time'],
+            data['total_duration']
+        )
+        
+        return jsonify({
+            'message': 'Watch progress recorded',
+            'watch_entry': watch_entry.to_dict()
+        }), status_code
+    except Exception as e:
+        return jsonify({'error': f'Failed to record watch progress: {str(e)}'}), 500
+
+@streaming_bp.route('/watch/batch', methods=['POST'])
+@jwt_required()
+@query_budget(8)  # 6, plus 2 to move archived entries back
+def record_watch_batch():
+    """Record progress for many movies in one transaction"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    
+    if not data or not isinstance(data.get('updates'), list) or not data['updates']:
+        return jsonify({'error': 'Missing updates'}), 400
+    
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(data['updates']) > max_items:
+        return jsonify({'error': f'At most {max_items} updates per request'}), 400
+    
+    results = [None] * len(data['updates'])
+    valid = []
+    for position, update in enumerate(data['updates']):
+        if not isinstance(update, dict) or not all(
+            isinstance(update.get(field), int if field == 'movie_id' else (int, float))
+            and not isinstance(update.get(field), bool)
+            for field in ('movie_id', 'watch_time', 'total_duration')
+        ):
+            results[position] = {'status': 400, 'error': 'Missing or invalid movie_id, watch_time or total_duration'}
+        else:
+            valid.append((position, update))
+    
+    try:
+        applied = MovieService.record_watch_batch(
+            user_id,
+            [(update['movie_id'], update['watch_time'], update['total_duration']) for _, update in valid]
+        ) if valid else []
+    except Exception as e:
+        return jsonify({'error': f'Failed to record watch progress: {str(e)}'}), 500
+    
+    for (position, update), (status_code, value) in zip(valid, applied):
+        if status_code == 200:
+            results[position] = {'movie_id': update['movie_id'], 'status': 200, 'watch_entry': value}
+        else:
+            results[position] = {'movie_id': update['movie_id'], 'status': status_code, 'error': value}
+    
+    return jsonify({'results': results}), 200
+
+@streaming_bp.route('/history', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_watch_history():
+    """Get user's watch history"""
+    user_id = get_jwt_identity()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    if page < 1 or per_page < 1:
+        abort(404)
+    
+    entries, total = MovieService.get_user_watch_history(user_id, page, per_page)
+    
+    return jsonify({
+        'total': total,
+        'pages': math.ceil(total / per_page),
+        'current_page': page,
+        'watch_history': entries
+    }), 200
@@ -1,95 +1,164 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.user import User
-from app.services.movie_service import MovieService
-from app import db
-
-users_bp = Blueprint('users', __name__)
-
-@users_bp.route('/me', methods=['GET'])
-@jwt_required()
-def get_current_user():
-    """Get current user profile"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify(user.to_dict()), 200
-
-@users_bp.route('/me', methods=['PUT'])
-@jwt_required()
-def update_current_user():
-    """Update current user profile"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    data = request.get_json()
-    allowed_fields = ['first_name', 'last_name', 'profile_picture_url']
-    
-    try:
-        for key, value in data.items():
-            if key in allowed_fields:
-                setattr(user, key, value)
-        
-        db.session.commit()
-        return jsonify(user.to_dict()), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': f'Update failed: {str(e)}'}), 500
-
-@users_bp.route('/me/movies', methods=['GET'])
-@jwt_required()
-def get_user_movies():
-    """Get current user's uploaded movies"""
-    user_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    paginated = MovieService.get_user_movies(user_id, page, per_page)
-    
-    return jsonify({
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'movies': [movie.to_dict() for movie in paginated.items]
-    }), 200
-
-@users_bp.route('/<int:user_id>', methods=['GET'])
-def get_user_profile(user_id):
-    """Get public user profile"""
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    profile = user.to_dict()
-    # Add public statistics
-    profile['total_uploads'] = len(user.uploaded_movies)
-    
-    return jsonify(profile), 200
-
-@users_bp.route('/<int:user_id>/movies', methods=['GET'])
-def get_user_public_movies(user_id):
-    """Get user's public movies"""
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    paginated = MovieService.get_user_movies(user_id, page, per_page)
-    
-    return jsonify({
-        'user': user.to_dict(),
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': page,
-        'movies': [movie.to_dict() for movie in paginated.items if movie.is_public]
-    }), 200
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models.user import User
+from app.services.movie_service import MovieService
+from app.services.recommendation_service import RecommendationService
+from app.services.engagement_service import EngagementService
+from app import db
+from app.utils.db_routing import replica_reads
+from app.utils.query_budget import query_budget
+
+users_bp = Blueprint('users', __name__)
+
+@users_bp.route('/me', methods=['GET'])
+@jwt_required()
+@query_budget(1)
+def get_current_user():
+    """Get current user profile"""
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify(user.to_dict()), 200
+
+@users_bp.route('/me', methods=['PUT'])
+@jwt_required()
+@query_budget(3)
+def update_current_user():
+    """Update current user profile"""
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    data = request.get_json()
+    allowed_fields = ['first_name', 'last_name', 'profile_picture_url']
+    
+    try:
+        for key, value in data.items():
+            if key in allowed_fields:
+                setattr(user, key, value)
+        
+        db.session.commit()
+        return jsonify(user.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Update failed: {str(e)}'}), 500
+
+@users_bp.route('/me/movies', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_user_movies():
+    """Get current user's uploaded movies"""
+    user_id = get_jwt_identity()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    paginated = MovieService.get_user_movies(user_id, page, per_page)
+    
+    return jsonify({
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'current_page': page,
+        'movies': [movie.to_dict() for movie in paginated.items]
+    }), 200
+
+@users_bp.route('/me/movies/stats', methods=['GET'])
+@jwt_required()
+@query_budget(2)
+def get_user_movie_stats():
+    """Get engagement statistics for the current user's uploads"""
+    user_id = get_jwt_identity()
+    days = max(0, min(request.args.get('days', 30, type=int), 365))
+    
+    stats = EngagementService.get_uploader_stats(user_id, days)
+    
+    return jsonify({'days': days, 'movies': stats}), 200
+
+@users_bp.route('/me/continue-watching', methods=['GET'])
+@jwt_required()
+@query_budget(1)
+def get_continue_watching():
+    """Get in-progress movies for the current user"""
+    user_id = get_jwt_identity()
+    entries = MovieService.get_continue_watching(user_id)
+    
+    return jsonify({'continue_watching': entries}), 200
+
+@users_bp.route('/me/history/export', methods=['GET'])
+@jwt_required()
+@query_budget(0)  # The single export query runs while the body streams, after the budget check
+def export_watch_history():
+    """Stream the current user's full watch history as NDJSON or CSV"""
+    user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'ndjson')
+    mimetypes = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+    
+    if export_format not in mimetypes:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    response = Response(
+        stream_with_context(MovieService.export_watch_history(user_id, export_format)),
+        mimetype=mimetypes[export_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=watch-history.{export_format}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@users_bp.route('/me/recommendations', methods=['GET'])
+@jwt_required()
+@query_budget(3)
+def get_recommendations():
+    """Get personalised recommendations for the current user"""
+    user_id = get_jwt_identity()
+    limit = min(request.args.get('limit', 20, type=int), 50)
+    
+    recommended, source = RecommendationService.get_recommendations(user_id, limit)
+    
+    return jsonify({
+        'source': source,
+        'movies': [dict(movie.to_dict(), score=round(score, 4) if score is not None else None)
+                   for movie, score in recommended]
+    }), 200
+
+@users_bp.route('/<int:user_id>', methods=['GET'])
+@query_budget(2)
+@replica_reads
+def get_user_profile(user_id):
+    """Get public user profile"""
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    profile = user.to_dict()
+    # Add public statistics
+    profile['total_uploads'] = MovieService.count_user_movies(user_id)
+    
+    return jsonify(profile), 200
+
+@users_bp.route('/<int:user_id>/movies', methods=['GET'])
+@query_budget(3)
+@replica_reads
+def get_user_public_movies(user_id):
+    """Get user's public movies"""
+    user = User.query.get(user_id)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    paginated = MovieService.get_user_movies(user_id, page, per_page)
+    
+    return jsonify({
+        'user': user.to_dict(),
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'current_page': page,
+        'movies': [movie.to_dict() for movie in paginated.items if movie.is_public]
+    }), 200
@@ -1 +1,47 @@
-# Services package
+# Services package
+import importlib
+import os
+import threading
+
+
+class LazyService:
+    """Process-wide service instance, imported and constructed on first use.
+
+    Keeps heavy client libraries (boto3, requests) out of application
+    startup, and builds a fresh instance in each forked worker process.
+    """
+
+    def __init__(self, module_name, class_name):
+        self.module_name = module_name
+        self.class_name = class_name
+        self._instance = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the shared instance, creating it if needed"""
+        instance = self._instance
+        if instance is None or self._pid != os.getpid():
+            with self._lock:
+                if self._instance is None or self._pid != os.getpid():
+                    module = importlib.import_module(self.module_name)
+                    self._instance = getattr(module, self.class_name)()
+                    self._pid = os.getpid()
+                instance = self._instance
+        return instance
+
+    def override(self, instance):
+        """Replace the shared instance, e.g. with a fake in tests or benchmarks"""
+        with self._lock:
+            self._instance = instance
+            self._pid = os.getpid()
+
+    def reset(self):
+        """Drop the shared instance so the next get() builds a new one"""
+        with self._lock:
+            self._instance = None
+            self._pid = None
+
+
+s3_service = LazyService('app.services.s3_service', 'S3Service')
+tmdb_service = LazyService('app.services.tmdb_service', 'TMDBService')
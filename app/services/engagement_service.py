@@ -0,0 +1,188 @@
+from app.models.engagement import MovieDailyStats, MovieEngagement, RollupState
+from app.models.movie import Movie
+from app.models.watch_history import WatchHistory
+from app import db
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, tuple_
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'movie_engagement'
+
+
+class EngagementRollup:
+    """Folds changed watch_history rows into per-movie daily and all-time aggregates.
+
+    Rows are read past a ``last_watched`` watermark.  Each row remembers what
+    has already been counted (``rolled_*`` columns), so only the difference
+    since the last run is added and re-reading a row is harmless.  That is
+    what lets every run re-read an ``overlap`` window below the watermark to
+    pick up transactions that committed late.  Each batch updates the
+    aggregates, the rows and the watermark in one transaction.
+    """
+
+    def __init__(self, batch_size=5000, overlap=timedelta(minutes=5)):
+        self.batch_size = batch_size
+        self.overlap = overlap
+
+    def _lock_state(self):
+        state = RollupState.query.filter_by(name=ROLLUP_NAME).with_for_update().first()
+        if state is None:
+            db.session.add(RollupState(name=ROLLUP_NAME, watermark=datetime(1970, 1, 1)))
+            db.session.commit()
+            state = RollupState.query.filter_by(name=ROLLUP_NAME).with_for_update().first()
+        return state
+
+    def run(self):
+        """Process every row changed since the watermark; returns the number of rows read"""
+        last_key = (self._lock_state().watermark - self.overlap, 0)
+        db.session.commit()
+
+        processed = 0
+        while True:
+            # Serializes concurrent runs; held until the batch commits
+            state = self._lock_state()
+            rows = db.session.query(
+                WatchHistory.id,
+                WatchHistory.movie_id,
+                WatchHistory.watch_time,
+                WatchHistory.is_completed,
+                WatchHistory.viewed_at,
+                WatchHistory.last_watched,
+                WatchHistory.rolled_watch_time,
+                WatchHistory.rolled_completed,
+                WatchHistory.rolled_day
+            ).filter(
+                tuple_(WatchHistory.last_watched, WatchHistory.id) > last_key
+            ).order_by(WatchHistory.last_watched, WatchHistory.id).limit(self.batch_size).all()
+
+            if not rows:
+                db.session.commit()
+                break
+
+            self._apply(rows)
+            last_key = (rows[-1].last_watched, rows[-1].id)
+            state.watermark = max(state.watermark, rows[-1].last_watched)
+            db.session.commit()
+            processed += len(rows)
+
+        logger.info('Engagement rollup processed %s watch rows', processed)
+        return processed
+
+    def _apply(self, rows):
+        daily = defaultdict(lambda: [0, 0, 0, 0])  # (movie_id, day) -> starts, completions, seconds, viewers
+        totals = defaultdict(lambda: [0, 0, 0])  # (movie_id,) -> starts, completions, seconds
+        updates = []
+
+        for row in rows:
+            day = row.last_watched.date()
+            watched = row.watch_time or 0
+            rolled = row.rolled_watch_time
+            changed = False
+
+            if rolled is None:
+                daily[(row.movie_id, row.viewed_at.date())][0] += 1
+                totals[(row.movie_id,)][0] += 1
+                rolled = 0
+                changed = True
+            if watched > rolled:
+                # watch_time is a position; only progress past the furthest point counts
+                daily[(row.movie_id, day)][2] += watched - rolled
+                totals[(row.movie_id,)][2] += watched - rolled
+                rolled = watched
+                changed = True
+            if row.is_completed and not row.rolled_completed:
+                daily[(row.movie_id, day)][1] += 1
+                totals[(row.movie_id,)][1] += 1
+                changed = True
+            if row.rolled_day != day:
+                daily[(row.movie_id, day)][3] += 1
+                changed = True
+
+            if changed:
+                updates.append({
+                    '_id': row.id,
+                    '_rolled_watch_time': rolled,
+                    '_rolled_completed': bool(row.rolled_completed or row.is_completed),
+                    '_rolled_day': day
+                })
+
+        if updates:
+            # last_watched is set explicitly so its onupdate does not move the row past the watermark
+            db.session.execute(
+                WatchHistory.__table__.update().where(WatchHistory.__table__.c.id == bindparam('_id')).values(
+                    rolled_watch_time=bindparam('_rolled_watch_time'),
+                    rolled_completed=bindparam('_rolled_completed'),
+                    rolled_day=bindparam('_rolled_day'),
+                    last_watched=WatchHistory.__table__.c.last_watched
+                ),
+                updates
+            )
+        self._merge(MovieDailyStats, ('movie_id', 'day'), daily,
+                    ('starts', 'completions', 'seconds_watched', 'unique_viewers'))
+        self._merge(MovieEngagement, ('movie_id',), totals, ('starts', 'completions', 'seconds_watched'))
+
+    @staticmethod
+    def _merge(model, key_names, deltas, fields):
+        """Add ``{key tuple: values}`` deltas to the aggregate rows, creating missing ones"""
+        if not deltas:
+            return
+        key_columns = [getattr(model, name) for name in key_names]
+        existing = {
+            tuple(getattr(row, name) for name in key_names): row
+            for row in model.query.filter(tuple_(*key_columns).in_(list(deltas))).with_for_update()
+        }
+        # Rows of movies deleted since they were watched are skipped
+        live_movies = {movie_id for (movie_id,) in db.session.query(Movie.id).filter(
+            Movie.id.in_({key[0] for key in deltas})
+        )}
+
+        for key, values in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                if key[0] not in live_movies:
+                    continue
+                row = model(**dict(zip(key_names, key)), **{field: 0 for field in fields})
+                db.session.add(row)
+            for field, value in zip(fields, values):
+                setattr(row, field, getattr(row, field) + value)
+
+
+class EngagementService:
+    """Read side of the engagement rollups"""
+
+    @staticmethod
+    def get_uploader_stats(uploader_id, days=30):
+        """Get totals per uploaded movie and, optionally, the daily series for the last ``days`` days"""
+        rows = db.session.query(Movie.id, Movie.title, MovieEngagement).outerjoin(
+            MovieEngagement, MovieEngagement.movie_id == Movie.id
+        ).filter(Movie.uploader_id == uploader_id).order_by(Movie.id).all()
+
+        stats = {}
+        for movie_id, title, totals in rows:
+            starts = totals.starts if totals else 0
+            completions = totals.completions if totals else 0
+            seconds = totals.seconds_watched if totals else 0
+            stats[movie_id] = {
+                'movie_id': movie_id,
+                'title': title,
+                'starts': starts,
+                'completions': completions,
+                'completion_rate': round(completions / starts, 4) if starts else None,
+                'seconds_watched': seconds,
+                'average_seconds_watched': round(seconds / starts, 1) if starts else None,
+                'daily': []
+            }
+
+        if days and stats:
+            since = datetime.utcnow().date() - timedelta(days=days - 1)
+            daily = MovieDailyStats.query.join(Movie, Movie.id == MovieDailyStats.movie_id).filter(
+                Movie.uploader_id == uploader_id,
+                MovieDailyStats.day >= since
+            ).order_by(MovieDailyStats.movie_id, MovieDailyStats.day)
+            for row in daily:
+                stats[row.movie_id]['daily'].append(row.to_dict())
+
+        return list(stats.values())
@@ -0,0 +1,130 @@
+from app.models.genre import Genre, movie_genres
+from app.models.movie import Movie
+from app import db
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+GENRE_SEPARATORS = re.compile(r'\s*[,/|]\s*')
+
+
+def genre_slug(name):
+    """Lowercase key of a genre name ('Sci-Fi' -> 'sci-fi', 'Science Fiction' -> 'science-fiction')"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def split_genres(text):
+    """Split a free-text genre string into distinct names, keeping their order"""
+    names = {}
+    for name in GENRE_SEPARATORS.split(text or ''):
+        name = ' '.join(name.split())
+        if genre_slug(name):
+            names.setdefault(genre_slug(name), name)
+    return list(names.values())
+
+
+class GenreService:
+    """Service for the normalized genre catalog"""
+    
+    @staticmethod
+    def resolve(names=(), tmdb_ids=()):
+        """Return the Genre rows for names and TMDB genre ids, inserting missing names in one statement.
+        
+        Call it before making other changes: if a concurrent request creates
+        the same genre first, the session is rolled back and looked up again.
+        TMDB ids only match genres imported with ``flask genres sync``.
+        """
+        slugs = {genre_slug(name): name for name in names}
+        tmdb_ids = set(tmdb_ids)
+        if not slugs and not tmdb_ids:
+            return []
+        
+        def lookup():
+            return Genre.query.filter(Genre.slug.in_(list(slugs)) | Genre.tmdb_id.in_(list(tmdb_ids))).all()
+        
+        found = lookup()
+        missing = set(slugs) - {genre.slug for genre in found}
+        if missing:
+            try:
+                found += db.session.scalars(
+                    insert(Genre).returning(Genre), [{'name': slugs[slug], 'slug': slug} for slug in missing]
+                ).all()
+            except IntegrityError:
+                db.session.rollback()
+                found = lookup()
+        
+        by_slug = {genre.slug: genre for genre in found}
+        ordered = [by_slug[slug] for slug in slugs if slug in by_slug]
+        return ordered + [genre for genre in found if genre.tmdb_id in tmdb_ids and genre not in ordered]
+    
+    @staticmethod
+    def assign(movie, genres):
+        """Link a movie to genres and refresh its display string"""
+        movie.genres = list(genres)
+        movie.genre = ', '.join(genre.name for genre in genres) or None
+    
+    @staticmethod
+    def replace_for_movies(movie_ids, genres):
+        """Give many movies the same genres with one DELETE and one INSERT"""
+        db.session.execute(movie_genres.delete().where(movie_genres.c.movie_id.in_(movie_ids)))
+        if genres:
+            db.session.execute(movie_genres.insert(), [
+                {'movie_id': movie_id, 'genre_id': genre.id} for movie_id in movie_ids for genre in genres
+            ])
+    
+    @staticmethod
+    def list_genres():
+        """All genres by name"""
+        return Genre.query.order_by(Genre.name).all()
+    
+    @staticmethod
+    def sync_tmdb_genres(tmdb_genres):
+        """Upsert TMDB's genre list ([{'id', 'name'}]) so TMDB genre_ids map onto local genres"""
+        existing = Genre.query.all()
+        by_tmdb_id = {genre.tmdb_id: genre for genre in existing if genre.tmdb_id is not None}
+        by_slug = {genre.slug: genre for genre in existing}
+        created = 0
+        for item in tmdb_genres:
+            genre = by_tmdb_id.get(item['id']) or by_slug.get(genre_slug(item['name']))
+            if genre is None:
+                genre = Genre(name=item['name'], slug=genre_slug(item['name']))
+                db.session.add(genre)
+                by_slug[genre.slug] = genre
+                created += 1
+            genre.tmdb_id = item['id']
+        db.session.commit()
+        logger.info('Synced %s TMDB genres, %s new', len(tmdb_genres), created)
+        return created
+    
+    @staticmethod
+    def backfill(batch_size=1000):
+        """Link movies whose free-text genre has no genre rows yet; returns how many were linked"""
+        linked = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(Movie.id, Movie.genre).filter(
+                Movie.id > last_id,
+                Movie.genre.isnot(None),
+                Movie.genre != '',
+                ~Movie.id.in_(db.session.query(movie_genres.c.movie_id))
+            ).order_by(Movie.id).limit(batch_size).all()
+            if not rows:
+                return linked
+            last_id = rows[-1].id
+            
+            names = {row.id: split_genres(row.genre) for row in rows}
+            genres = {
+                genre.slug: genre
+                for genre in GenreService.resolve([name for row_names in names.values() for name in row_names])
+            }
+            links = [
+                {'movie_id': movie_id, 'genre_id': genres[genre_slug(name)].id}
+                for movie_id, row_names in names.items() for name in row_names
+            ]
+            if links:
+                db.session.execute(movie_genres.insert(), links)
+            db.session.commit()
+            linked += len(rows)
@@ -0,0 +1,111 @@
+from app.models.watch_history import ArchivedWatchHistory, WatchHistory
+from app import db
+from datetime import datetime
+from sqlalchemy import select
+import logging
+
+logger = logging.getLogger(__name__)
+
+hot_table = WatchHistory.__table__
+archive_table = ArchivedWatchHistory.__table__
+# Every watch_history column; the archive has the same ones plus archived_at
+HISTORY_COLUMNS = [column.name for column in hot_table.columns]
+
+
+def _move(source, target, ids):
+    """Copy rows by id with one INSERT ... SELECT, then delete them from source"""
+    db.session.execute(target.insert().from_select(
+        HISTORY_COLUMNS,
+        select(*(source.c[name] for name in HISTORY_COLUMNS)).where(source.c.id.in_(ids))
+    ))
+    db.session.execute(source.delete().where(source.c.id.in_(ids)))
+
+
+class HistoryArchiver:
+    """Moves watch_history rows untouched for ``max_age`` into watch_history_archive.
+    
+    Works oldest first in batches of ``batch_size``: each batch locks its
+    rows (skipping any a request is writing), copies them with one
+    INSERT ... SELECT, deletes them and commits, so no lock is held longer
+    than one batch.  Ids are kept, which keeps the recommendation index
+    watermark and the engagement rollup state valid for archived rows.
+    """
+    
+    def __init__(self, max_age, batch_size=5000):
+        self.max_age = max_age
+        self.batch_size = batch_size
+    
+    def run(self, max_batches=None):
+        """Archive every row older than the cutoff (or up to max_batches batches); returns how many moved"""
+        cutoff = datetime.utcnow() - self.max_age
+        moved = batches = 0
+        while max_batches is None or batches < max_batches:
+            ids = [row.id for row in db.session.query(WatchHistory.id).filter(
+                WatchHistory.last_watched < cutoff
+            ).order_by(WatchHistory.last_watched).limit(self.batch_size).with_for_update(skip_locked=True)]
+            if not ids:
+                break
+            
+            try:
+                _move(hot_table, archive_table, ids)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error('Error archiving watch history: %s', e)
+                raise
+            moved += len(ids)
+            batches += 1
+            logger.info('Archived %s watch history rows (%s so far)', len(ids), moved)
+        db.session.commit()
+        return moved
+
+
+def restore_archived_history(user_id, movie_ids):
+    """Move a user's archived entries for movie_ids back to watch_history before they are written.
+    
+    Runs in the caller's transaction.  Returns {movie_id: watch_time} for the
+    entries restored, an empty dict (after one indexed lookup) when none are
+    archived.  The archived rows are locked first, so of two concurrent
+    restores the second finds them gone instead of inserting them twice.
+    """
+    rows = db.session.query(
+        ArchivedWatchHistory.id, ArchivedWatchHistory.movie_id, ArchivedWatchHistory.watch_time
+    ).filter(
+        ArchivedWatchHistory.user_id == user_id,
+        ArchivedWatchHistory.movie_id.in_(list(movie_ids))
+    ).with_for_update().all()
+    if rows:
+        _move(archive_table, hot_table, [row.id for row in rows])
+    return {row.movie_id: row.watch_time or 0 for row in rows}
+
+
+def current_watch_times(user_id, movie_ids):
+    """Get {movie_id: watch_time} of the user's entries for movie_ids, restoring archived ones first.
+    
+    Live entries are locked, so the archiver skips them; the archive is only
+    searched for movies without one.  Runs in the caller's transaction.
+    """
+    times = {
+        row.movie_id: row.watch_time or 0
+        for row in db.session.query(WatchHistory.movie_id, WatchHistory.watch_time).filter(
+            WatchHistory.user_id == user_id,
+            WatchHistory.movie_id.in_(list(movie_ids))
+        ).with_for_update()
+    }
+    missing = [movie_id for movie_id in movie_ids if movie_id not in times]
+    if missing:
+        times.update(restore_archived_history(user_id, missing))
+    return times
+
+
+def history_union(*names, user_id=None, after_id=None):
+    """SELECT of the named columns over live and archived watch history, optionally for one user or past an id"""
+    parts = []
+    for table in (hot_table, archive_table):
+        part = select(*(table.c[name] for name in names))
+        if user_id is not None:
+            part = part.where(table.c.user_id == user_id)
+        if after_id is not None:
+            part = part.where(table.c.id > after_id)
+        parts.append(part)
+    return parts[0].union_all(parts[1])
@@ -0,0 +1,269 @@
+"""Resized poster and backdrop variants served from a local disk cache.
+
+Images are addressed by their TMDB file name (``kqjL17yufvn9OVLyXYpvtyrFfak.jpg``).
+The source is fetched once at TMDB's ``original`` size and kept in the cache
+next to its variants.  Each variant (width and format) is rendered with Pillow
+in a process pool so resizing does not hold the request workers' GIL, and
+concurrent requests for the same file share a single fetch and render.
+"""
+from app.utils.cache import MISSING, TTLCache
+from app.utils.metrics import instrumented, record_cache
+from collections import OrderedDict
+from concurrent.futures import Future
+from flask import current_app
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+SOURCE_NAME = re.compile(r'^[A-Za-z0-9_-]+\.(?:jpg|jpeg|png)$')
+TMDB_IMAGE_URL = re.compile(r'^https://image\.tmdb\.org/t/p/[a-z0-9]+/([A-Za-z0-9_-]+\.(?:jpg|jpeg|png))$')
+RENDER_TIMEOUT = 30  # Seconds
+
+# Sources that could not be fetched or decoded, so a bad name does not hit TMDB on every request
+failed_sources = TTLCache('image_failures', ttl=300, maxsize=1000)
+
+
+class ImageUnavailable(Exception):
+    """The source image could not be fetched or decoded"""
+
+
+def image_url(name, width, image_format=None):
+    """Path of one variant of a source image"""
+    return f"/api/images/{width}/{image_format or current_app.config['IMAGE_DEFAULT_FORMAT']}/{name}"
+
+
+def variant_urls(source_url, widths):
+    """Map width to variant path for a TMDB image URL, or None for other URLs"""
+    match = TMDB_IMAGE_URL.match(source_url or '')
+    if not match:
+        return None
+    return {str(width): image_url(match.group(1), width) for width in widths}
+
+
+def movie_image_urls(poster_url, backdrop_url):
+    config = current_app.config
+    return {
+        'poster': variant_urls(poster_url, config['IMAGE_POSTER_WIDTHS']),
+        'backdrop': variant_urls(backdrop_url, config['IMAGE_BACKDROP_WIDTHS'])
+    }
+
+
+def render_variant(source, width, image_format, quality):
+    """Resize encoded image bytes to at most ``width`` pixels wide (runs in a pool process)"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(source)) as image:
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            # JPEG sources decode straight at a reduced scale, which is most of the saving
+            image.draft('RGB', (width, height))
+            image = image.resize((width, height), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L') and (image_format == 'jpeg' or 'A' not in image.mode):
+            image = image.convert('RGB')
+
+        output = io.BytesIO()
+        if image_format == 'jpeg':
+            image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(output, 'WEBP', quality=quality, method=4)
+        return output.getvalue()
+
+
+class DiskLRUCache:
+    """Directory of files bounded by total size, evicting the least recently used.
+
+    Recency is tracked in memory and seeded from file mtimes on first use (hits
+    touch the file), so it survives restarts.  Every process enforces the bound
+    on its own view of the directory; several workers sharing one can overshoot
+    it until the next write evicts.
+    """
+
+    def __init__(self, root, max_bytes, name='images'):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.name = name
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _load(self):
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._size += size
+        self._loaded = True
+
+    def _touch(self, path, size):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._size += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            evicted = []
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_path, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_path)
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key):
+        """Return the cached bytes for ``key`` or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Possibly evicted by another process
+            with self._lock:
+                self._size -= self._entries.pop(path, 0)
+            record_cache(self.name, False)
+            return None
+        self._touch(path, len(data))
+        record_cache(self.name, True)
+        return data
+
+    def set(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._touch(path, len(data))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ImageService:
+    """Fetches, resizes and caches images; one instance per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cache = None
+        self._pool = None
+        self._inflight = {}  # cache key -> Future shared by concurrent requests
+
+    def _check_fork(self):
+        # A pool inherited from a parent process cannot be used
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def cache(self):
+        with self._lock:
+            self._check_fork()
+            if self._cache is None:
+                config = current_app.config
+                self._cache = DiskLRUCache(config['IMAGE_CACHE_DIR'], config['IMAGE_CACHE_MAX_BYTES'])
+            return self._cache
+
+    def _render(self, source, width, image_format):
+        config = current_app.config
+        args = (source, width, image_format, config['IMAGE_QUALITY'])
+        if not config['IMAGE_WORKERS']:
+            return render_variant(*args)
+        with self._lock:
+            self._check_fork()
+            if self._pool is None:
+                # Imported here: it pulls in multiprocessing, which app startup does not need
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=config['IMAGE_WORKERS'])
+            pool = self._pool
+        return pool.submit(render_variant, *args).result(timeout=RENDER_TIMEOUT)
+
+    def _single_flight(self, key, produce):
+        """Return the cached value for ``key``, computing it once however many threads ask"""
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result(timeout=RENDER_TIMEOUT * 2)
+
+        try:
+            data = produce()
+            self.cache.set(key, data)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    @instrumented('tmdb', 'fetch_image')
+    def _fetch(self, name):
+        import requests
+
+        config = current_app.config
+        max_bytes = config['IMAGE_MAX_SOURCE_BYTES']
+        try:
+            with requests.get(f"{config['IMAGE_SOURCE_BASE_URL']}/{name}", timeout=10, stream=True) as response:
+                response.raise_for_status()
+                data = response.raw.read(max_bytes + 1, decode_content=True)
+        except requests.RequestException as e:
+            raise ImageUnavailable(f'Failed to fetch {name}: {str(e)}') from e
+        if len(data) > max_bytes:
+            raise ImageUnavailable(f'{name} is larger than {max_bytes} bytes')
+        return data
+
+    def get_variant(self, name, width, image_format):
+        """Return the encoded variant of a source image, fetching and rendering it if needed"""
+        failure = failed_sources.get(name)
+        if failure is not MISSING:
+            raise ImageUnavailable(failure)
+
+        def render():
+            source = self._single_flight(f'source/{name}', lambda: self._fetch(name))
+            try:
+                return self._render(source, width, image_format)
+            except Exception as e:
+                # Decoding errors come back from the pool as Pillow exceptions
+                raise ImageUnavailable(f'Failed to resize {name}: {str(e)}') from e
+
+        try:
+            return self._single_flight(f'{name}/{width}.{image_format}', render)
+        except ImageUnavailable as e:
+            failed_sources.set(name, str(e))
+            logger.warning('%s', e)
+            raise
+
+
+images = ImageService()
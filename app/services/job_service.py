@@ -0,0 +1,213 @@
+from app.models.job import Job
+from app import db
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+import json
+import logging
+import os
+import random
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+# kind -> (handler(payload), on_failure(payload, error) or None)
+JOB_HANDLERS = {}
+
+
+def job_handler(kind, on_failure=None):
+    """Register the function that runs jobs of ``kind``.
+
+    Jobs are delivered at least once (a worker can crash after the work but
+    before recording it), so handlers must be safe to repeat.  ``on_failure``
+    runs once a job has used up its attempts.
+    """
+    def decorator(f):
+        JOB_HANDLERS[kind] = (f, on_failure)
+        return f
+    return decorator
+
+
+class JobService:
+    """Database-backed job queue; no broker needed"""
+
+    @staticmethod
+    def enqueue(kind, payload=None, idempotency_key=None, delay=None, max_attempts=None, commit=True):
+        """Queue a job, or return the existing one with the same idempotency key.
+
+        With ``commit=False`` the job is only added to the session, so it is
+        committed (or rolled back) together with the caller's own changes.
+        """
+        if idempotency_key is not None:
+            existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+            if existing is not None:
+                return existing
+
+        job = Job(
+            kind=kind,
+            payload=json.dumps(payload or {}),
+            idempotency_key=idempotency_key,
+            max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+            run_at=datetime.utcnow() + (delay or timedelta(0))
+        )
+        db.session.add(job)
+        if not commit:
+            return job
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request enqueued the same key first
+            db.session.rollback()
+            return Job.query.filter_by(idempotency_key=idempotency_key).first()
+        return job
+
+    @staticmethod
+    def claim(worker_id):
+        """Lock the next due job for this worker and return it, or None.
+
+        Each candidate is taken with a conditional UPDATE, so concurrent
+        workers on any backend never claim the same job twice.  Running jobs
+        whose visibility timeout has passed are claimable again.
+        """
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Job.status == 'queued', Job.run_at <= now),
+            and_(Job.status == 'running', Job.locked_until < now)
+        )
+        candidates = [row.id for row in db.session.query(Job.id).filter(claimable).order_by(Job.run_at).limit(10)]
+
+        for job_id in candidates:
+            claimed = Job.query.filter(Job.id == job_id, claimable).update({
+                'status': 'running',
+                'locked_by': worker_id,
+                'locked_until': now + timedelta(seconds=current_app.config['JOBS_VISIBILITY_TIMEOUT']),
+                'attempts': Job.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, job_id)
+        return None
+
+    @staticmethod
+    def execute(job):
+        """Run a claimed job and record the outcome; returns True on success"""
+        handler, on_failure = JOB_HANDLERS.get(job.kind, (None, None))
+        job_id = job.id
+        try:
+            if handler is None:
+                raise LookupError(f'No handler registered for job kind {job.kind}')
+            if job.attempts > job.max_attempts:
+                raise TimeoutError('Visibility timeout expired on the last attempt')
+            handler(job.arguments)
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            JobService._retry_or_fail(job, e, on_failure)
+            return False
+
+        job.status = 'done'
+        job.locked_by = None
+        job.locked_until = None
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def _retry_or_fail(job, error, on_failure):
+        config = current_app.config
+        job.last_error = f'{type(error).__name__}: {str(error)}'
+        job.locked_by = None
+        job.locked_until = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.error('Job %s (%s) failed after %s attempts: %s', job.id, job.kind, job.attempts, job.last_error)
+            if on_failure is not None:
+                try:
+                    on_failure(job.arguments, error)
+                except Exception:
+                    logger.exception('Failure hook of job %s (%s) raised', job.id, job.kind)
+        else:
+            # Exponential backoff with jitter so a failing dependency is not hammered in lockstep
+            delay = min(config['JOBS_BACKOFF_SECONDS'] * 2 ** (job.attempts - 1), config['JOBS_BACKOFF_MAX_SECONDS'])
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+            logger.warning('Job %s (%s) attempt %s failed, retrying in %ss: %s', job.id, job.kind, job.attempts, delay, job.last_error)
+        db.session.commit()
+
+    @staticmethod
+    def run_pending(worker_id=None, limit=None):
+        """Run due jobs in this thread until none are left; returns how many ran"""
+        worker_id = worker_id or default_worker_id()
+        ran = 0
+        while limit is None or ran < limit:
+            job = JobService.claim(worker_id)
+            if job is None:
+                break
+            JobService.execute(job)
+            ran += 1
+        return ran
+
+    @staticmethod
+    def prune(older_than):
+        """Delete finished jobs older than ``older_than``; returns how many were removed"""
+        removed = Job.query.filter(
+            Job.status.in_(['done', 'failed']),
+            Job.finished_at < datetime.utcnow() - older_than
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    @staticmethod
+    def counts():
+        """Number of jobs per status"""
+        return dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class JobWorker:
+    """Polls the queue from a pool of threads until stopped"""
+
+    def __init__(self, app, concurrency=None, poll_interval=None):
+        self.app = app
+        self.concurrency = concurrency or app.config['JOBS_WORKERS']
+        self.poll_interval = app.config['JOBS_POLL_INTERVAL'] if poll_interval is None else poll_interval
+        self.stopping = threading.Event()
+        self._threads = []
+
+    def _loop(self):
+        worker_id = default_worker_id()
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    job = JobService.claim(worker_id)
+                    if job is None:
+                        self.stopping.wait(self.poll_interval)
+                        continue
+                    JobService.execute(job)
+                except Exception:
+                    logger.exception('Job worker loop failed')
+                    db.session.rollback()
+                    self.stopping.wait(self.poll_interval)
+                finally:
+                    db.session.remove()
+
+    def start(self):
+        for number in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info('Started %s job worker threads', self.concurrency)
+
+    def stop(self, timeout=None):
+        """Finish the jobs in progress and stop polling"""
+        self.stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
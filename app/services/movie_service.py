@@ -1,122 +1,777 @@
-from app.models.movie import Movie
-from app.models.watch_history import WatchHistory
-from app import db
-import logging
-
-logger = logging.getLogger(__name__)
-
-class MovieService:
-    """Service for movie management operations"""
-    
-    @staticmethod
-    def create_movie(movie_data):
-        """Create a new movie record"""
-        try:
-            movie = Movie(**movie_data)
-            db.session.add(movie)
-            db.session.commit()
-            
-            logger.info(f"Movie created: {movie.title}")
-            return movie, 201
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error creating movie: {str(e)}")
-            raise
-    
-    @staticmethod
-    def update_movie(movie_id, update_data):
-        """Update movie details"""
-        try:
-            movie = Movie.query.get(movie_id)
-            if not movie:
-                return None, 404
-            
-            for key, value in update_data.items():
-                if hasattr(movie, key):
-                    setattr(movie, key, value)
-            
-            db.session.commit()
-            logger.info(f"Movie updated: {movie.title}")
-            return movie, 200
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error updating movie: {str(e)}")
-            raise
-    
-    @staticmethod
-    def delete_movie(movie_id):
-        """Delete a movie"""
-        try:
-            movie = Movie.query.get(movie_id)
-            if not movie:
-                return False
-            
-            db.session.delete(movie)
-            db.session.commit()
-            logger.info(f"Movie deleted: {movie.title}")
-            return True
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error deleting movie: {str(e)}")
-            raise
-    
-    @staticmethod
-    def get_movie_by_id(movie_id):
-        """Get movie by ID"""
-        return Movie.query.get(movie_id)
-    
-    @staticmethod
-    def get_public_movies(page=1, per_page=20):
-        """Get all public movies with pagination"""
-        return Movie.query.filter_by(is_public=True).paginate(page=page, per_page=per_page)
-    
-    @staticmethod
-    def get_featured_movies(page=1, per_page=20):
-        """Get featured movies"""
-        return Movie.query.filter_by(is_public=True, is_featured=True).paginate(page=page, per_page=per_page)
-    
-    @staticmethod
-    def search_movies(query, page=1, per_page=20):
-        """Search movies by title or description"""
-        return Movie.query.filter(
-            (Movie.is_public == True) &
-            ((Movie.title.ilike(f'%{query}%')) | (Movie.description.ilike(f'%{query}%')))
-        ).paginate(page=page, per_page=per_page)
-    
-    @staticmethod
-    def get_user_movies(user_id, page=1, per_page=20):
-        """Get all movies uploaded by a user"""
-        return Movie.query.filter_by(uploader_id=user_id).paginate(page=page, per_page=per_page)
-    
-    @staticmethod
-    def record_watch(user_id, movie_id, watch_time, total_duration):
-        """Record or update watch history"""
-        try:
-            watch_entry = WatchHistory.query.filter_by(user_id=user_id, movie_id=movie_id).first()
-            
-            if watch_entry:
-                watch_entry.watch_time = watch_time
-                watch_entry.is_completed = watch_time >= total_duration * 0.9  # 90% watched
-            else:
-                watch_entry = WatchHistory(
-                    user_id=user_id,
-                    movie_id=movie_id,
-                    watch_time=watch_time,
-                    total_duration=total_duration,
-                    is_completed=watch_time >= total_duration * 0.9
-                )
-                db.session.add(watch_entry)
-            
-            db.session.commit()
-            return watch_entry, 200
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error recording watch history: {str(e)}")
-            raise
-    
-    @staticmethod
-    def get_user_watch_history(user_id, page=1, per_page=20):
-        """Get user's watch history"""
-        return WatchHistory.query.filter_by(user_id=user_id).order_by(
-            WatchHistory.last_watched.desc()
-        ).paginate(page=page, per_page=per_page)
+from app.models.genre import Genre, movie_genres
+from app.models.movie import Movie
+from app.models.stored_object import StoredObject
+from app.models.watch_history import ArchivedWatchHistory, WatchHistory, history_entry_dict
+from app import db
+from app.services import s3_service
+from app.services.genre_service import GenreService, split_genres
+from app.services.history_archive_service import current_watch_times, history_union, restore_archived_history
+from app.services.job_service import JobService, job_handler
+from app.services.storage_reconciliation_service import S3_DELETE_BATCH_SIZE
+from app.services.trending_service import TrendingService
+from app.utils.cache import MISSING, TTLCache
+from app.utils.db_routing import replica_reads
+from collections import Counter
+from datetime import date
+from flask import current_app
+from sqlalchemy import String, bindparam, case, cast, extract, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+continue_watching_cache = TTLCache('continue_watching')
+# Facet counts of the public catalog per filter combination; movie writes clear it in this worker only,
+# so CATALOG_FACETS_CACHE_TTL bounds how stale other workers' counts get
+catalog_facets_cache = TTLCache('catalog_facets', maxsize=1000)
+RATING_BUCKETS = range(10, 0, -1)
+HISTORY_ENTRY_COLUMNS = ('id', 'user_id', 'movie_id', 'watch_time', 'total_duration', 'is_completed',
+                         'viewed_at', 'last_watched')
+HISTORY_EXPORT_FIELDS = ('movie_id', 'title', 'watch_time', 'total_duration', 'progress_percentage',
+                         'is_completed', 'viewed_at', 'last_watched')
+
+class MovieService:
+    """Service for movie management operations"""
+    
+    @staticmethod
+    def create_movie(movie_data):
+        """Create a new movie record"""
+        try:
+            genres = GenreService.resolve(split_genres(movie_data.pop('genre', None)), movie_data.pop('genre_ids', ()))
+            movie = Movie(**movie_data)
+            GenreService.assign(movie, genres)
+            db.session.add(movie)
+            db.session.commit()
+            catalog_facets_cache.clear()
+            
+            logger.info('Movie created: %s', movie.title)
+            return movie, 201
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error creating movie: %s', e)
+            raise
+    
+    @staticmethod
+    def update_movie(movie_id, update_data):
+        """Update movie details"""
+        try:
+            update_data = dict(update_data)
+            # Resolved before any change, see GenreService.resolve
+            genres = GenreService.resolve(split_genres(update_data.pop('genre'))) if 'genre' in update_data else None
+            movie = Movie.query.get(movie_id)
+            if not movie:
+                return None, 404
+            
+            for key, value in update_data.items():
+                if hasattr(movie, key):
+                    setattr(movie, key, value)
+            if genres is not None:
+                GenreService.assign(movie, genres)
+            
+            db.session.commit()
+            catalog_facets_cache.clear()
+            logger.info('Movie updated: %s', movie.title)
+            return movie, 200
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error updating movie: %s', e)
+            raise
+    
+    @staticmethod
+    def _claim_stored_object(digest):
+        """Take a reference to the stored copy of the content, recording it if it is new.
+        
+        Returns (stored_object, needs_upload).  The reference is taken with an
+        UPDATE that only matches while the row is still referenced, so a
+        concurrent last delete either sees this reference or has already
+        released the row, and then a new one is created.  Every row gets a
+        key of its own, so a released object is never written again.
+        """
+        stored = StoredObject.query.filter_by(sha256=digest.sha256).first()
+        if stored is not None:
+            claimed = StoredObject.query.filter(StoredObject.id == stored.id, StoredObject.ref_count > 0).update(
+                {'ref_count': StoredObject.ref_count + 1}, synchronize_session=False
+            )
+            if claimed:
+                # An earlier copy of this content never made it to S3; the first upload to claim it tries again
+                needs_upload = stored.status == 'failed' and StoredObject.query.filter_by(
+                    id=stored.id, status='failed'
+                ).update({'status': 'pending'}, synchronize_session=False) == 1
+                return stored, needs_upload
+            # Released since the lookup; the row is gone along with its last reference
+            db.session.expunge(stored)
+        
+        stored = StoredObject(
+            sha256=digest.sha256,
+            s3_key=f'movies/sha256/{digest.sha256}/{uuid.uuid4().hex}',
+            size=digest.size,
+            checksum_sha256=digest.checksum_sha256
+        )
+        db.session.add(stored)
+        db.session.flush()
+        return stored, True
+    
+    @staticmethod
+    def create_pending_upload(movie_data, spool_path, content_type, metadata, digest):
+        """Create a movie for a spooled upload, sharing the stored file if the same content was uploaded before.
+        
+        New content is copied to S3 by a background job.  Content that is
+        already stored, or on its way, only gains a reference and the spooled
+        copy is dropped; the movie is ready at once (201) or with the upload
+        in flight (202).
+        """
+        genre_names, genre_ids = split_genres(movie_data.pop('genre', None)), movie_data.pop('genre_ids', ())
+        try:
+            for attempt in range(2):
+                try:
+                    genres = GenreService.resolve(genre_names, genre_ids)
+                    stored, needs_upload = MovieService._claim_stored_object(digest)
+                    break
+                except (IntegrityError, StaleDataError):
+                    # The same new content was recorded, or its row released, concurrently; look it up again
+                    db.session.rollback()
+                    if attempt:
+                        raise
+            
+            movie = Movie(
+                upload_status='ready' if stored.status == 'ready' else 'pending',
+                s3_key=stored.s3_key,
+                stored_object_id=stored.id,
+                **movie_data
+            )
+            GenreService.assign(movie, genres)
+            db.session.add(movie)
+            if needs_upload:
+                JobService.enqueue('storage.store_object', {
+                    'object_id': stored.id,
+                    'key': stored.s3_key,
+                    'path': spool_path,
+                    'content_type': content_type,
+                    'metadata': metadata,
+                    'part_size': current_app.config['UPLOAD_PART_SIZE']
+                }, commit=False)
+            db.session.commit()
+            catalog_facets_cache.clear()
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error creating movie: %s', e)
+            raise
+        
+        if not needs_upload:
+            _remove_spooled_file(spool_path)
+            logger.info('Movie created sharing stored object %s: %s', movie.stored_object_id, movie.title)
+        else:
+            logger.info('Movie created pending upload: %s', movie.title)
+        return movie, 201 if movie.upload_status == 'ready' else 202
+    
+    @staticmethod
+    def _drop_references(counts):
+        """Drop references to stored objects ({object_id: count}); returns the keys of objects left unused.
+        
+        Unused rows are deleted in the same transaction; their S3 objects are
+        deleted afterwards by the caller.
+        """
+        ids = list(counts)
+        StoredObject.query.filter(StoredObject.id.in_(ids)).update(
+            {'ref_count': StoredObject.ref_count - case(counts, value=StoredObject.id)},
+            synchronize_session=False
+        )
+        released = db.session.query(StoredObject.id, StoredObject.s3_key).filter(
+            StoredObject.id.in_(ids), StoredObject.ref_count <= 0
+        ).all()
+        if released:
+            StoredObject.query.filter(
+                StoredObject.id.in_([row.id for row in released]), StoredObject.ref_count <= 0
+            ).delete(synchronize_session=False)
+        return [row.s3_key for row in released]
+    
+    @staticmethod
+    def delete_movie(movie_id):
+        """Delete a movie and queue the removal of its file once no other movie shares it"""
+        try:
+            movie = Movie.query.get(movie_id)
+            if not movie:
+                return False
+            
+            title = movie.title
+            # Bulk statements rather than the ORM cascade, which loads and deletes row by row
+            WatchHistory.query.filter_by(movie_id=movie_id).delete(synchronize_session=False)
+            ArchivedWatchHistory.query.filter_by(movie_id=movie_id).delete(synchronize_session=False)
+            GenreService.replace_for_movies([movie_id], [])
+            Movie.query.filter_by(id=movie_id).delete(synchronize_session=False)
+            # Queued in the same transaction, so the file is removed exactly when the last reference is
+            if movie.stored_object_id is None:
+                JobService.enqueue('storage.delete_object', {'key': movie.s3_key}, commit=False)
+            else:
+                for key in MovieService._drop_references({movie.stored_object_id: 1}):
+                    JobService.enqueue('storage.release_object', {'key': key}, commit=False)
+            db.session.commit()
+            catalog_facets_cache.clear()
+            logger.info('Movie deleted: %s', title)
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error deleting movie: %s', e)
+            raise
+    
+    @staticmethod
+    def _owned_movies(user_id, movie_ids, *columns):
+        """Split requested ids into {id: row} owned by the user and {id: status} for the rest"""
+        rows = db.session.query(Movie.id, Movie.uploader_id, *columns).filter(Movie.id.in_(set(movie_ids))).all()
+        found = {row.id: row for row in rows}
+        owned = {movie_id: row for movie_id, row in found.items() if row.uploader_id == user_id}
+        refused = {movie_id: (403 if movie_id in found else 404) for movie_id in movie_ids if movie_id not in owned}
+        return owned, refused
+    
+    @staticmethod
+    def _bulk_results(movie_ids, refused):
+        errors = {403: 'Access denied', 404: 'Movie not found'}
+        results = []
+        for movie_id in movie_ids:
+            if movie_id in refused:
+                results.append({'id': movie_id, 'status': refused[movie_id], 'error': errors[refused[movie_id]]})
+            else:
+                results.append({'id': movie_id, 'status': 200})
+        return results
+    
+    @staticmethod
+    def bulk_update_movies(user_id, movie_ids, update_data):
+        """Apply the same changes to every listed movie the user owns with one UPDATE"""
+        update_data = dict(update_data)
+        genres = GenreService.resolve(split_genres(update_data['genre'])) if 'genre' in update_data else None
+        owned, refused = MovieService._owned_movies(user_id, movie_ids)
+        try:
+            if owned and genres is not None:
+                GenreService.replace_for_movies(list(owned), genres)
+                update_data['genre'] = ', '.join(genre.name for genre in genres) or None
+            if owned:
+                Movie.query.filter(Movie.id.in_(list(owned))).update(update_data, synchronize_session=False)
+            db.session.commit()
+            catalog_facets_cache.clear()
+            logger.info('Bulk updated %s movies for user %s', len(owned), user_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error bulk updating movies: %s', e)
+            raise
+        return MovieService._bulk_results(movie_ids, refused)
+    
+    @staticmethod
+    def bulk_delete_movies(user_id, movie_ids):
+        """Delete every listed movie the user owns in one transaction and queue the removal of their files.
+        
+        The files are deleted in delete_objects batches by one
+        ``storage.delete_objects`` job queued in the same transaction as the
+        rows; files still shared with other movies stay.
+        """
+        owned, refused = MovieService._owned_movies(user_id, movie_ids, Movie.s3_key, Movie.stored_object_id)
+        try:
+            if owned:
+                ids = list(owned)
+                WatchHistory.query.filter(WatchHistory.movie_id.in_(ids)).delete(synchronize_session=False)
+                ArchivedWatchHistory.query.filter(ArchivedWatchHistory.movie_id.in_(ids)).delete(synchronize_session=False)
+                GenreService.replace_for_movies(ids, [])
+                Movie.query.filter(Movie.id.in_(ids)).delete(synchronize_session=False)
+                references = Counter(row.stored_object_id for row in owned.values() if row.stored_object_id is not None)
+                keys = MovieService._drop_references(references) if references else []
+                keys += list({row.s3_key for row in owned.values() if row.stored_object_id is None})
+                if keys:
+                    JobService.enqueue('storage.delete_objects', {'keys': keys}, commit=False)
+            db.session.commit()
+            catalog_facets_cache.clear()
+            logger.info('Bulk deleted %s movies for user %s', len(owned), user_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error bulk deleting movies: %s', e)
+            raise
+        return MovieService._bulk_results(movie_ids, refused)
+    
+    @staticmethod
+    def get_movie_by_id(movie_id):
+        """Get movie by ID"""
+        return Movie.query.get(movie_id)
+    
+    @staticmethod
+    @replica_reads
+    def get_movie_with_uploader(movie_id):
+        """Get movie by ID with its uploader loaded in the same query"""
+        return Movie.query.options(db.joinedload(Movie.uploader)).filter_by(id=movie_id).first()
+    
+    @staticmethod
+    @replica_reads
+    def get_movies_with_uploaders(movie_ids):
+        """Get {id: movie} for many ids with their uploaders in one query"""
+        if not movie_ids:
+            return {}
+        movies = Movie.query.options(db.joinedload(Movie.uploader)).filter(Movie.id.in_(set(movie_ids)))
+        return {movie.id: movie for movie in movies}
+    
+    @staticmethod
+    def _catalog_filters(genre=None, year=None, min_rating=None):
+        """Conditions for the public catalog filters, keyed by facet name"""
+        filters = {}
+        if genre:
+            filters['genre'] = Movie.id.in_(
+                select(movie_genres.c.movie_id).join(Genre, Genre.id == movie_genres.c.genre_id).where(Genre.slug == genre)
+            )
+        if year is not None:
+            # A range rather than extract(year) so ix_movies_public_release_date applies
+            filters['year'] = (Movie.release_date >= date(year, 1, 1)) & (Movie.release_date < date(year + 1, 1, 1))
+        if min_rating is not None:
+            filters['min_rating'] = Movie.rating >= min_rating
+        return filters
+    
+    @staticmethod
+    @replica_reads
+    def get_public_movies(page=1, per_page=20, genre=None, year=None, min_rating=None):
+        """Get public movies with pagination, optionally filtered by genre slug, release year and minimum rating"""
+        filters = MovieService._catalog_filters(genre, year, min_rating)
+        return Movie.query.filter(Movie.is_public == True, *filters.values()).paginate(page=page, per_page=per_page)
+    
+    @staticmethod
+    @replica_reads
+    def get_catalog_facets(genre=None, year=None, min_rating=None):
+        """Count public movies per genre, release year and rating with one grouped query.
+        
+        Each facet is counted under the other active filters, so its counts
+        show what selecting a value would return.
+        """
+        key = (genre, year, min_rating)
+        cached = catalog_facets_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        
+        filters = MovieService._catalog_filters(genre, year, min_rating)
+        
+        def where(facet):
+            return [Movie.is_public == True] + [condition for name, condition in filters.items() if name != facet]
+        
+        rating_bucket = case(*((Movie.rating >= bucket, bucket) for bucket in RATING_BUCKETS), else_=0)
+        by_genre = select(
+            literal('genre').label('facet'), Genre.slug.label('value'), Genre.name.label('name'), db.func.count().label('count')
+        ).select_from(Movie).join(movie_genres, movie_genres.c.movie_id == Movie.id).join(
+            Genre, Genre.id == movie_genres.c.genre_id
+        ).where(*where('genre')).group_by(Genre.slug, Genre.name)
+        by_year = select(
+            literal('year'), cast(extract('year', Movie.release_date), String), literal(None), db.func.count()
+        ).where(Movie.release_date.isnot(None), *where('year')).group_by(extract('year', Movie.release_date))
+        by_rating = select(
+            literal('min_rating'), cast(rating_bucket, String), literal(None), db.func.count()
+        ).where(Movie.rating.isnot(None), *where('min_rating')).group_by(rating_bucket)
+        rows = db.session.execute(union_all(by_genre, by_year, by_rating)).all()
+        
+        genres = sorted(
+            ({'value': row.value, 'name': row.name, 'count': row.count} for row in rows if row.facet == 'genre'),
+            key=lambda item: (-item['count'], item['name'])
+        )
+        years = sorted(
+            ({'value': int(float(row.value)), 'count': row.count} for row in rows if row.facet == 'year'),
+            key=lambda item: -item['value']
+        )
+        # min_rating counts are cumulative: movies rated at least the value
+        buckets = {int(float(row.value)): row.count for row in rows if row.facet == 'min_rating'}
+        ratings = []
+        total = 0
+        for bucket in RATING_BUCKETS:
+            total += buckets.get(bucket, 0)
+            if total:
+                ratings.append({'value': bucket, 'count': total})
+        
+        facets = {'genre': genres, 'year': years, 'min_rating': ratings}
+        catalog_facets_cache.set(key, facets, ttl=current_app.config['CATALOG_FACETS_CACHE_TTL'])
+        return facets
+    
+    @staticmethod
+    @replica_reads
+    def get_featured_movies(page=1, per_page=20):
+        """Get featured movies"""
+        return Movie.query.filter_by(is_public=True, is_featured=True).paginate(page=page, per_page=per_page)
+    
+    @staticmethod
+    def _search_condition(query):
+        return (Movie.is_public == True) & ((Movie.title.ilike(f'%{query}%')) | (Movie.description.ilike(f'%{query}%')))
+    
+    @staticmethod
+    @replica_reads
+    def search_movies(query, page=1, per_page=20):
+        """Search movies by title or description"""
+        return Movie.query.filter(MovieService._search_condition(query)).paginate(page=page, per_page=per_page)
+    
+    @staticmethod
+    @replica_reads
+    def search_top_movies(query, limit=20):
+        """Search movies by title or description, most viewed first, without counting the matches"""
+        return Movie.query.filter(MovieService._search_condition(query)).order_by(
+            Movie.view_count.desc(), Movie.id
+        ).limit(limit).all()
+    
+    @staticmethod
+    @replica_reads
+    def get_public_movies_by_tmdb_ids(tmdb_ids):
+        """Get {tmdb_id: movie} for the public movies we host with the given TMDB ids"""
+        if not tmdb_ids:
+            return {}
+        movies = Movie.query.filter(Movie.is_public == True, Movie.tmdb_id.in_(set(tmdb_ids)))
+        return {movie.tmdb_id: movie for movie in movies}
+    
+    @staticmethod
+    def export_watch_history(user_id, export_format='ndjson'):
+        """Yield the user's full watch history, archived entries included, newest first, as NDJSON lines or CSV text.
+        
+        Rows are read through a streaming cursor HISTORY_EXPORT_BATCH_SIZE at a
+        time and each batch is yielded as one chunk, so memory does not grow
+        with the size of the history.
+        """
+        history = history_union(*HISTORY_ENTRY_COLUMNS, user_id=user_id).subquery()
+        query = select(
+            history.c.movie_id,
+            Movie.title,
+            history.c.watch_time,
+            history.c.total_duration,
+            history.c.is_completed,
+            history.c.viewed_at,
+            history.c.last_watched
+        ).join(Movie, Movie.id == history.c.movie_id).order_by(
+            history.c.last_watched.desc(), history.c.id.desc()
+        ).execution_options(yield_per=current_app.config['HISTORY_EXPORT_BATCH_SIZE'])
+        
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(HISTORY_EXPORT_FIELDS)
+            yield buffer.getvalue()
+        
+        result = db.session.execute(query)
+        try:
+            for rows in result.partitions():
+                entries = [{
+                    'movie_id': row.movie_id,
+                    'title': row.title,
+                    'watch_time': row.watch_time,
+                    'total_duration': row.total_duration,
+                    'progress_percentage': round((row.watch_time / row.total_duration * 100) if row.total_duration else 0),
+                    'is_completed': row.is_completed,
+                    'viewed_at': row.viewed_at.isoformat(),
+                    'last_watched': row.last_watched.isoformat()
+                } for row in rows]
+                
+                if export_format == 'csv':
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows([entry[field] for field in HISTORY_EXPORT_FIELDS] for entry in entries)
+                    yield buffer.getvalue()
+                else:
+                    yield ''.join(json.dumps(entry) + '\n' for entry in entries)
+        finally:
+            # Releases the cursor when the client disconnects mid-export
+            result.close()
+    
+    @staticmethod
+    @replica_reads
+    def get_user_movies(user_id, page=1, per_page=20):
+        """Get all movies uploaded by a user"""
+        return Movie.query.filter_by(uploader_id=user_id).paginate(page=page, per_page=per_page)
+    
+    @staticmethod
+    @replica_reads
+    def count_user_movies(user_id):
+        """Count movies uploaded by a user without loading them"""
+        return Movie.query.filter_by(uploader_id=user_id).count()
+    
+    @staticmethod
+    def record_watch(user_id, movie_id, watch_time, total_duration):
+        """Record or update watch history.
+        
+        The entry is locked while it is updated, so the archiver skips it.  If
+        it moved anyway (archived, or restored by a concurrent request) before
+        the lock was taken, the write is retried once against its new place.
+        """
+        try:
+            for attempt in range(2):
+                try:
+                    watch_entry = WatchHistory.query.filter_by(user_id=user_id, movie_id=movie_id).with_for_update().first()
+                    if watch_entry is None and restore_archived_history(user_id, [movie_id]):
+                        watch_entry = WatchHistory.query.filter_by(user_id=user_id, movie_id=movie_id).first()
+                    previous_watch_time = (watch_entry.watch_time or 0) if watch_entry else 0
+                    
+                    if watch_entry:
+                        watch_entry.watch_time = watch_time
+                        watch_entry.is_completed = watch_time >= total_duration * 0.9  # 90% watched
+                    else:
+                        watch_entry = WatchHistory(
+                            user_id=user_id,
+                            movie_id=movie_id,
+                            watch_time=watch_time,
+                            total_duration=total_duration,
+                            is_completed=watch_time >= total_duration * 0.9
+                        )
+                        db.session.add(watch_entry)
+                    
+                    db.session.commit()
+                    break
+                except (IntegrityError, StaleDataError):
+                    # The entry was created, archived or restored concurrently; read it again
+                    db.session.rollback()
+                    if attempt:
+                        raise
+            continue_watching_cache.invalidate(user_id)
+            TrendingService.record_progress(movie_id, watch_time - previous_watch_time, total_duration)
+            return watch_entry, 200
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error recording watch history: %s', e)
+            raise
+    
+    @staticmethod
+    def record_watch_batch(user_id, updates):
+        """Apply many progress updates in one transaction with the same rules as record_watch.
+        
+        ``updates`` is a list of (movie_id, watch_time, total_duration) applied
+        in order, so a repeated movie ends with its last update.  Movies must
+        exist and be public or owned by the user.  Returns one (status, watch
+        entry dict or error message) per update; entries reflect the stored
+        row after the whole batch.  The statement count does not grow with
+        the batch size.
+        """
+        movie_ids = {movie_id for movie_id, _, _ in updates}
+        visible = {
+            row.id: row.is_public or row.uploader_id == user_id
+            for row in db.session.query(Movie.id, Movie.is_public, Movie.uploader_id).filter(Movie.id.in_(movie_ids))
+        }
+        allowed = [movie_id for movie_id in movie_ids if visible.get(movie_id)]
+        
+        try:
+            for attempt in range(2):
+                try:
+                    statuses = []
+                    final = {}  # movie_id -> (watch_time, total_duration) after the batch
+                    progress = []
+                    # Archived entries are moved back first, so the updates below find them
+                    previous = current_watch_times(user_id, allowed) if allowed else {}
+                    existing = set(previous)
+                    
+                    for movie_id, watch_time, total_duration in updates:
+                        if movie_id not in visible:
+                            statuses.append((404, 'Movie not found'))
+                            continue
+                        if not visible[movie_id]:
+                            statuses.append((403, 'Access denied'))
+                            continue
+                        statuses.append((200, movie_id))
+                        progress.append((movie_id, watch_time - previous.get(movie_id, 0), total_duration))
+                        previous[movie_id] = watch_time
+                        # Like record_watch, an existing entry keeps its original total_duration
+                        final[movie_id] = (watch_time, total_duration)
+                    
+                    table = WatchHistory.__table__
+                    updated = [
+                        {'_movie_id': movie_id, 'watch_time': watch_time, 'is_completed': watch_time >= total_duration * 0.9}
+                        for movie_id, (watch_time, total_duration) in final.items() if movie_id in existing
+                    ]
+                    created = [
+                        {'user_id': user_id, 'movie_id': movie_id, 'watch_time': watch_time,
+                         'total_duration': total_duration, 'is_completed': watch_time >= total_duration * 0.9}
+                        for movie_id, (watch_time, total_duration) in final.items() if movie_id not in existing
+                    ]
+                    # One executemany each; ORM flushes would insert row by row on backends without batched RETURNING
+                    if updated:
+                        db.session.execute(
+                            table.update().where(
+                                table.c.user_id == user_id,
+                                table.c.movie_id == bindparam('_movie_id')
+                            ).values(watch_time=bindparam('watch_time'), is_completed=bindparam('is_completed')),
+                            updated
+                        )
+                    if created:
+                        db.session.execute(table.insert(), created)
+                    
+                    entries = {
+                        entry.movie_id: entry.to_dict()
+                        for entry in WatchHistory.query.filter(
+                            WatchHistory.user_id == user_id,
+                            WatchHistory.movie_id.in_(list(final))
+                        )
+                    } if final else {}
+                    db.session.commit()
+                    break
+                except IntegrityError:
+                    # Another request created or restored one of the entries; read them again
+                    db.session.rollback()
+                    if attempt:
+                        raise
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Error recording watch history batch: %s', e)
+            raise
+        
+        if final:
+            continue_watching_cache.invalidate(user_id)
+        for movie_id, seconds_watched, total_duration in progress:
+            TrendingService.record_progress(movie_id, seconds_watched, total_duration)
+        return [(status, entries[value] if status == 200 else value) for status, value in statuses]
+    
+    @staticmethod
+    def get_continue_watching(user_id):
+        """Get the user's unfinished movies, newest first, in a single joined query"""
+        cached = continue_watching_cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+        
+        rows = db.session.query(
+            WatchHistory.movie_id,
+            WatchHistory.watch_time,
+            WatchHistory.total_duration,
+            WatchHistory.last_watched,
+            Movie.title,
+            Movie.genre,
+            Movie.duration,
+            Movie.poster_url,
+            Movie.backdrop_url,
+            Movie.resolution
+        ).join(Movie, Movie.id == WatchHistory.movie_id).filter(
+            WatchHistory.user_id == user_id,
+            WatchHistory.is_completed == False,
+            db.or_(Movie.is_public == True, Movie.uploader_id == user_id)
+        ).order_by(
+            WatchHistory.last_watched.desc()
+        ).limit(current_app.config['CONTINUE_WATCHING_LIMIT']).all()
+        
+        entries = [{
+            'movie_id': row.movie_id,
+            'watch_time': row.watch_time,
+            'total_duration': row.total_duration,
+            'progress_percentage': round((row.watch_time / row.total_duration * 100) if row.total_duration else 0),
+            'last_watched': row.last_watched.isoformat(),
+            'movie': {
+                'id': row.movie_id,
+                'title': row.title,
+                'genre': row.genre,
+                'duration': row.duration,
+                'poster_url': row.poster_url,
+                'backdrop_url': row.backdrop_url,
+                'resolution': row.resolution
+            }
+        } for row in rows]
+        
+        continue_watching_cache.set(user_id, entries, ttl=current_app.config['CONTINUE_WATCHING_CACHE_TTL'])
+        return entries
+    
+    @staticmethod
+    def get_user_watch_history(user_id, page=1, per_page=20):
+        """Get a page of the user's watch history, newest first, continuing into archived entries.
+        
+        Returns (entry dicts, total).
+        """
+        history = history_union(*HISTORY_ENTRY_COLUMNS, user_id=user_id).subquery()
+        total = db.session.scalar(select(db.func.count()).select_from(history))
+        rows = db.session.execute(
+            select(history).order_by(history.c.last_watched.desc(), history.c.id.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
+        return [history_entry_dict(row) for row in rows], total
+
+
+def _remove_spooled_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@job_handler('storage.delete_object')
+def delete_stored_object(payload):
+    """Remove a deleted movie's file from S3 (deleting a missing key succeeds, so retries are safe)"""
+    s3_service.get().delete_movie(payload['key'])
+
+
+@job_handler('storage.delete_objects')
+def delete_stored_objects(payload):
+    """Remove bulk-deleted files from S3 in batches; the job is retried if any key was not deleted"""
+    s3 = s3_service.get()
+    keys = payload['keys']
+    errors = {}
+    for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        errors.update(s3.delete_objects(keys[start:start + S3_DELETE_BATCH_SIZE])[1])
+    if errors:
+        key, error = next(iter(errors.items()))
+        raise RuntimeError(f'{len(errors)} of {len(keys)} objects not deleted, first {key}: {error}')
+
+
+@job_handler('storage.release_object')
+def release_stored_object(payload):
+    """Remove a shared file from S3 once no movie references it (its key is never handed out again)"""
+    s3_service.get().delete_movie(payload['key'])
+
+
+def _mark_upload_failed(payload, error):
+    Movie.query.filter_by(id=payload['movie_id']).update({'upload_status': 'failed'}, synchronize_session=False)
+    db.session.commit()
+    _remove_spooled_file(payload['path'])
+
+
+@job_handler('movies.store_upload', on_failure=_mark_upload_failed)
+def store_upload(payload):
+    """Copy a spooled upload to S3 and mark its movie ready (uploads queued before deduplication)"""
+    movie = db.session.get(Movie, payload['movie_id'])
+    if movie is None:
+        # Deleted while pending; an earlier attempt may have written the object after its delete job ran
+        s3_service.get().delete_movie(payload['key'])
+        _remove_spooled_file(payload['path'])
+        return
+    
+    if movie.upload_status != 'ready':
+        with open(payload['path'], 'rb') as file_obj:
+            s3_service.get().upload_movie(
+                file_obj,
+                movie.s3_key,
+                content_type=payload['content_type'],
+                metadata=payload['metadata']
+            )
+        movie.upload_status = 'ready'
+        db.session.commit()
+    _remove_spooled_file(payload['path'])
+    logger.info('Stored upload for movie %s', movie.id)
+
+
+def _mark_object_failed(payload, error):
+    StoredObject.query.filter_by(id=payload['object_id']).update({'status': 'failed'}, synchronize_session=False)
+    Movie.query.filter_by(stored_object_id=payload['object_id']).update(
+        {'upload_status': 'failed'}, synchronize_session=False
+    )
+    db.session.commit()
+    _remove_spooled_file(payload['path'])
+
+
+@job_handler('storage.store_object', on_failure=_mark_object_failed)
+def store_object(payload):
+    """Copy spooled content to its S3 key, check what S3 stored, and mark every movie sharing it ready"""
+    stored = db.session.get(StoredObject, payload['object_id'])
+    if stored is None:
+        # Every movie using it was deleted while pending; an earlier attempt may have written the object
+        s3_service.get().delete_movie(payload['key'])
+        _remove_spooled_file(payload['path'])
+        return
+    
+    if stored.status != 'ready':
+        s3 = s3_service.get()
+        with open(payload['path'], 'rb') as file_obj:
+            s3.upload_movie(
+                file_obj,
+                stored.s3_key,
+                content_type=payload['content_type'],
+                metadata=payload['metadata'],
+                part_size=payload['part_size']
+            )
+        checksum = s3.get_object_checksum(stored.s3_key)
+        if checksum is not None and checksum != stored.checksum_sha256:
+            raise ValueError(f'Checksum mismatch for {stored.s3_key}: S3 has {checksum}, received {stored.checksum_sha256}')
+        stored.status = 'ready'
+        Movie.query.filter_by(stored_object_id=stored.id).update({'upload_status': 'ready'}, synchronize_session=False)
+        db.session.commit()
+    _remove_spooled_file(payload['path'])
+    logger.info('Stored object %s at %s', stored.id, stored.s3_key)
@@ -0,0 +1,292 @@
+"""Array-backed item-to-item co-watch index.
+
+Two movies are similar when the same users watched both.  With ``n_i`` the
+number of users who watched movie ``i`` and ``C_ij`` the number who watched
+both ``i`` and ``j``, the score is the cosine similarity of the binary
+user x movie matrix columns::
+
+    sim(i, j) = C_ij / sqrt(n_i * n_j)
+
+The interaction matrix is kept as two integer arrays (one entry per
+``watch_history`` row) and turned into compressed sparse row/column offsets
+with ``np.argsort`` and ``np.bincount``, so no SciPy dependency is needed.
+Only the top ``k`` neighbours of every movie are stored, as fixed-width
+``(movies, k)`` arrays that load with a single ``np.load``.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+NO_NEIGHBOUR = 0  # Movie ids start at 1, so 0 pads short neighbour rows
+
+
+def pair_keys(users, movies):
+    """Pack (user_id, movie_id) pairs into single int64 keys for set operations"""
+    return (users.astype(np.int64) << 32) | movies.astype(np.int64)
+
+
+def _offsets(group, size):
+    return np.concatenate(([0], np.cumsum(np.bincount(group, minlength=size))))
+
+
+def _gather_ranges(values, starts, ends):
+    """Concatenate ``values[starts[n]:ends[n]]`` for every n without a Python loop"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return values[:0]
+    shifts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return values[shifts + np.arange(total)]
+
+
+class CoWatchMatrix:
+    """Binary user x movie matrix in both CSR (by user) and CSC (by movie) form"""
+
+    def __init__(self, users, movies):
+        self.users = users
+        self.movies = movies
+        self.movie_ids, movie_index = np.unique(movies, return_inverse=True)
+        user_ids, user_index = np.unique(users, return_inverse=True)
+
+        by_user = np.argsort(user_index, kind='stable')
+        self.user_items = movie_index[by_user]
+        self.user_offsets = _offsets(user_index, len(user_ids))
+
+        by_movie = np.argsort(movie_index, kind='stable')
+        self.movie_users = user_index[by_movie]
+        self.movie_offsets = _offsets(movie_index, len(self.movie_ids))
+        self.watchers = np.diff(self.movie_offsets)
+
+        self._user_ids = user_ids
+
+    def similarities(self, column):
+        """Return (candidate columns, cosine similarity) for every movie co-watched with ``column``"""
+        watchers = self.movie_users[self.movie_offsets[column]:self.movie_offsets[column + 1]]
+        co_watched = _gather_ranges(self.user_items, self.user_offsets[watchers], self.user_offsets[watchers + 1])
+        # Sort-based counting keeps the cost proportional to the co-watch volume, not the catalogue size
+        candidates, counts = np.unique(co_watched, return_counts=True)
+        keep = candidates != column
+        candidates, counts = candidates[keep], counts[keep]
+        return candidates, counts / np.sqrt(float(self.watchers[column]) * self.watchers[candidates])
+
+    def top_k(self, movie_ids, k, on_similarities=None):
+        """Return (neighbours, scores) arrays of shape (len(movie_ids), k).
+
+        ``on_similarities(movie_id, candidate_ids, similarity)`` is called with
+        the full, untruncated candidate list of every movie.
+        """
+        neighbours = np.full((len(movie_ids), k), NO_NEIGHBOUR, dtype=np.int64)
+        scores = np.zeros((len(movie_ids), k), dtype=np.float32)
+        columns = np.searchsorted(self.movie_ids, movie_ids)
+        for row, column in enumerate(columns):
+            candidates, similarity = self.similarities(column)
+            if on_similarities is not None:
+                on_similarities(self.movie_ids[column], self.movie_ids[candidates], similarity)
+            if not len(candidates):
+                continue
+            # Highest score first, ties broken by movie id so builds and refreshes agree
+            order = np.lexsort((self.movie_ids[candidates], -similarity))[:k]
+            neighbours[row, :len(order)] = self.movie_ids[candidates[order]]
+            scores[row, :len(order)] = similarity[order]
+        return neighbours, scores
+
+
+def merge_neighbours(movie_ids, neighbours, scores, owners, ids, values):
+    """Upsert (owner, neighbour id, score) entries into the top-k rows of ``owners`` in place"""
+    k = neighbours.shape[1]
+    owner_rows = np.searchsorted(movie_ids, owners)
+
+    # Skip entries that neither beat a full row's last score nor update a listed pair
+    full = neighbours[owner_rows, -1] != NO_NEIGHBOUR
+    floor = np.where(full, scores[owner_rows, -1], -np.inf)
+    candidate = values >= floor
+    listed = np.zeros(len(owner_rows), dtype=bool)
+    listed[~candidate] = (neighbours[owner_rows[~candidate]] == ids[~candidate, None]).any(axis=1)
+    relevant = candidate | listed
+    owner_rows, ids, values = owner_rows[relevant], ids[relevant], values[relevant]
+    if not len(owner_rows):
+        return
+
+    touched = np.unique(owner_rows)
+    current = neighbours[touched]
+    present = current != NO_NEIGHBOUR
+
+    rows = np.concatenate((owner_rows, np.broadcast_to(touched[:, None], current.shape)[present]))
+    ids = np.concatenate((ids, current[present]))
+    values = np.concatenate((values, scores[touched][present]))
+    fresh = np.concatenate((np.zeros(len(owner_rows), dtype=bool), np.ones(int(present.sum()), dtype=bool)))
+
+    # A pair listed both ways keeps the fresh score (fresh sorts first as False)
+    order = np.lexsort((fresh, ids, rows))
+    rows, ids, values = rows[order], ids[order], values[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (ids[1:] != ids[:-1])
+    rows, ids, values = rows[first], ids[first], values[first]
+
+    order = np.lexsort((ids, -values, rows))
+    rows, ids, values = rows[order], ids[order], values[order]
+    group_start = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    rank = np.arange(len(rows)) - np.repeat(group_start, np.diff(np.concatenate((group_start, [len(rows)]))))
+    keep = rank < k
+
+    neighbours[touched] = NO_NEIGHBOUR
+    scores[touched] = 0
+    neighbours[rows[keep], rank[keep]] = ids[keep]
+    scores[rows[keep], rank[keep]] = values[keep]
+
+
+class RecommendationIndex:
+    """Top-K similar movies per movie plus the interactions needed to refresh it"""
+
+    def __init__(self, movie_ids, neighbours, scores, users, movies, watermark, k):
+        self.movie_ids = movie_ids
+        self.neighbours = neighbours
+        self.scores = scores
+        self.users = users
+        self.movies = movies
+        self.watermark = watermark
+        self.k = k
+
+    @classmethod
+    def build(cls, users, movies, watermark, k):
+        """Compute the index from scratch"""
+        users, movies = _unique_pairs(users, movies)
+        matrix = CoWatchMatrix(users, movies)
+        neighbours, scores = matrix.top_k(matrix.movie_ids, k)
+        return cls(matrix.movie_ids, neighbours, scores, users, movies, watermark, k)
+
+    def refresh(self, new_users, new_movies, watermark, merge_batch=1000000):
+        """Fold new watch rows in without a full rebuild; returns the number of recomputed movies.
+
+        A new pair (u, m) changes n_m and C_mj for the movies j that u
+        watched, so only sim(m, *) pairs move.  Rows of the movies gaining
+        watchers are recomputed; their exact similarities are then merged into
+        the rows of every co-watched movie.  The one approximation: when a
+        neighbour's score drops (its watcher count grew) a movie just outside
+        that row's top-K is not reconsidered until the next full build.
+        """
+        known = np.isin(pair_keys(new_users, new_movies), pair_keys(self.users, self.movies))
+        new_users, new_movies = _unique_pairs(new_users[~known], new_movies[~known])
+        self.watermark = max(self.watermark, watermark)
+        if not len(new_users):
+            return 0
+
+        users = np.concatenate((self.users, new_users))
+        movies = np.concatenate((self.movies, new_movies))
+        matrix = CoWatchMatrix(users, movies)
+        changed = np.unique(new_movies)
+
+        neighbours = np.full((len(matrix.movie_ids), self.k), NO_NEIGHBOUR, dtype=np.int64)
+        scores = np.zeros((len(matrix.movie_ids), self.k), dtype=np.float32)
+        previous_rows = np.searchsorted(matrix.movie_ids, self.movie_ids)
+        neighbours[previous_rows] = self.neighbours
+        scores[previous_rows] = self.scores
+
+        pending = []
+        pending_size = [0]
+
+        def flush():
+            if pending:
+                owners, ids, values = (np.concatenate(parts) for parts in zip(*pending))
+                merge_neighbours(matrix.movie_ids, neighbours, scores, owners, ids, values)
+                pending.clear()
+                pending_size[0] = 0
+
+        def collect(movie_id, candidate_ids, similarity):
+            # sim(j, m) == sim(m, j); rows of changed movies are rewritten below
+            unchanged = ~np.isin(candidate_ids, changed)
+            pending.append((candidate_ids[unchanged], np.full(int(unchanged.sum()), movie_id), similarity[unchanged]))
+            pending_size[0] += len(pending[-1][0])
+            if pending_size[0] >= merge_batch:
+                flush()
+
+        changed_neighbours, changed_scores = matrix.top_k(changed, self.k, on_similarities=collect)
+        flush()
+        changed_rows = np.searchsorted(matrix.movie_ids, changed)
+        neighbours[changed_rows] = changed_neighbours
+        scores[changed_rows] = changed_scores
+
+        self.movie_ids, self.neighbours, self.scores = matrix.movie_ids, neighbours, scores
+        self.users, self.movies = users, movies
+        return len(changed)
+
+    def similar(self, movie_id, limit):
+        """Return [(movie_id, score)] for the most similar movies"""
+        row = np.searchsorted(self.movie_ids, movie_id)
+        if row >= len(self.movie_ids) or self.movie_ids[row] != movie_id:
+            return []
+        neighbours = self.neighbours[row]
+        keep = neighbours != NO_NEIGHBOUR
+        return list(zip(neighbours[keep][:limit].tolist(), self.scores[row][keep][:limit].tolist()))
+
+    def recommend(self, history, limit, weights=None):
+        """Sum the neighbour scores of the movies in ``history`` and return the best unseen ones"""
+        history = np.asarray(history, dtype=np.int64)
+        rows = np.searchsorted(self.movie_ids, history)
+        found = rows < len(self.movie_ids)
+        found[found] = self.movie_ids[rows[found]] == history[found]
+        if not found.any():
+            return []
+
+        neighbours = self.neighbours[rows[found]]
+        scores = self.scores[rows[found]]
+        if weights is not None:
+            scores = scores * np.asarray(weights, dtype=np.float32)[found][:, None]
+        neighbours, scores = neighbours.ravel(), scores.ravel()
+        keep = (neighbours != NO_NEIGHBOUR) & ~np.isin(neighbours, history)
+        candidates, inverse = np.unique(neighbours[keep], return_inverse=True)
+        totals = np.bincount(inverse, weights=scores[keep], minlength=len(candidates))
+
+        best = np.lexsort((candidates, -totals))[:limit]
+        return list(zip(candidates[best].tolist(), totals[best].tolist()))
+
+    def save(self, path):
+        """Write the index atomically so running workers never read a partial file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.array(FORMAT_VERSION),
+                    k=np.array(self.k),
+                    watermark=np.array(self.watermark, dtype=np.int64),
+                    movie_ids=self.movie_ids,
+                    neighbours=self.neighbours,
+                    scores=self.scores,
+                    users=self.users,
+                    movies=self.movies
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, with_interactions=False):
+        """Load an index; the interaction arrays are only read when refreshing"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                raise ValueError(f'Unsupported recommendation index version {int(data["version"])}')
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(
+                data['movie_ids'],
+                data['neighbours'],
+                data['scores'],
+                data['users'] if with_interactions else empty,
+                data['movies'] if with_interactions else empty,
+                int(data['watermark']),
+                int(data['k'])
+            )
+
+
+def _unique_pairs(users, movies):
+    users = np.asarray(users, dtype=np.int64)
+    movies = np.asarray(movies, dtype=np.int64)
+    if not len(users):
+        return users, movies
+    keys = np.unique(pair_keys(users, movies))
+    return keys >> 32, keys & 0xFFFFFFFF
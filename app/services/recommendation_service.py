@@ -0,0 +1,146 @@
+from app.models.movie import Movie
+from app.models.watch_history import WatchHistory
+from app import db
+from app.services.history_archive_service import history_union
+from flask import current_app
+from sqlalchemy import select
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationService:
+    """Serves and maintains the precomputed co-watch index"""
+
+    _index = None
+    _index_mtime = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_index():
+        """Return the loaded index, reloading it when the file on disk changes"""
+        path = current_app.config['RECOMMENDATIONS_INDEX_PATH']
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        if mtime != RecommendationService._index_mtime:
+            with RecommendationService._lock:
+                if mtime != RecommendationService._index_mtime:
+                    from app.services.recommendation_index import RecommendationIndex
+                    RecommendationService._index = RecommendationIndex.load(path)
+                    RecommendationService._index_mtime = mtime
+                    logger.info('Loaded recommendation index: %s movies', len(RecommendationService._index.movie_ids))
+        return RecommendationService._index
+
+    @staticmethod
+    def _public_movies_in_order(scored):
+        """Fetch public movies for [(movie_id, score)] in one query, keeping the ranking"""
+        if not scored:
+            return []
+        movies = {
+            movie.id: movie
+            for movie in Movie.query.filter(Movie.id.in_([movie_id for movie_id, _ in scored]), Movie.is_public == True)
+        }
+        return [(movies[movie_id], score) for movie_id, score in scored if movie_id in movies]
+
+    @staticmethod
+    def get_similar_movies(movie_id, limit=20):
+        """Get public movies most often watched by the same users, best first"""
+        index = RecommendationService.get_index()
+        if index is None:
+            return []
+        return RecommendationService._public_movies_in_order(index.similar(movie_id, limit))
+
+    @staticmethod
+    def get_recommendations(user_id, limit=20):
+        """Get movies similar to the user's recent watches, or the most viewed ones as a fallback"""
+        history_size = current_app.config['RECOMMENDATIONS_HISTORY_SIZE']
+        history = [row.movie_id for row in db.session.query(WatchHistory.movie_id).filter(
+            WatchHistory.user_id == user_id
+        ).order_by(WatchHistory.last_watched.desc()).limit(history_size)]
+
+        index = RecommendationService.get_index()
+        if index is not None and history:
+            # Recent watches count more than older ones
+            weights = [1.0 / (1 + position * 0.1) for position in range(len(history))]
+            scored = index.recommend(history, limit * 2, weights=weights)
+            recommended = RecommendationService._public_movies_in_order(scored)[:limit]
+            if recommended:
+                return recommended, 'co_watch'
+
+        query = Movie.query.filter(Movie.is_public == True)
+        if history:
+            query = query.filter(~Movie.id.in_(history))
+        popular = query.order_by(Movie.view_count.desc()).limit(limit).all()
+        return [(movie, None) for movie in popular], 'popular'
+
+    @staticmethod
+    def iter_watch_pairs(after_id=0, batch_size=100000):
+        """Yield (max_id, user_ids, movie_ids) arrays of watch rows with id > after_id in keyset batches.
+
+        Archived rows are included; they keep their ids, so a row moving
+        between the tables during a scan is still read exactly once.
+        """
+        import numpy as np
+
+        last_id = after_id
+        while True:
+            history = history_union('id', 'user_id', 'movie_id', after_id=last_id).subquery()
+            rows = db.session.execute(select(history).order_by(history.c.id).limit(batch_size)).all()
+            if not rows:
+                return
+            data = np.array(rows, dtype=np.int64)
+            last_id = int(data[-1, 0])
+            yield last_id, data[:, 1], data[:, 2]
+            db.session.rollback()
+
+    @staticmethod
+    def _read_pairs(after_id):
+        import numpy as np
+
+        watermark, users, movies = after_id, [], []
+        for last_id, batch_users, batch_movies in RecommendationService.iter_watch_pairs(after_id):
+            watermark = last_id
+            users.append(batch_users)
+            movies.append(batch_movies)
+        if not users:
+            return watermark, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return watermark, np.concatenate(users), np.concatenate(movies)
+
+    @staticmethod
+    def build_index(k=None):
+        """Rebuild the index from the whole watch history and write it to disk"""
+        from app.services.recommendation_index import RecommendationIndex
+
+        k = k or current_app.config['RECOMMENDATIONS_TOP_K']
+        watermark, users, movies = RecommendationService._read_pairs(0)
+        index = RecommendationIndex.build(users, movies, watermark, k)
+        index.save(current_app.config['RECOMMENDATIONS_INDEX_PATH'])
+        logger.info('Built recommendation index: %s movies from %s watch rows', len(index.movie_ids), len(users))
+        return index, len(index.movie_ids)
+
+    @staticmethod
+    def refresh_index():
+        """Fold watch rows added since the last build into the index on disk"""
+        from app.services.recommendation_index import RecommendationIndex
+
+        path = current_app.config['RECOMMENDATIONS_INDEX_PATH']
+        if not os.path.exists(path):
+            return RecommendationService.build_index()
+
+        index = RecommendationIndex.load(path, with_interactions=True)
+        previous_watermark = index.watermark
+        # Rows are only visible once their transaction commits, which is not
+        # always in id order; re-read a window below the watermark to catch
+        # late commits (already indexed pairs are skipped).
+        overlap = current_app.config['RECOMMENDATIONS_REFRESH_OVERLAP']
+        watermark, users, movies = RecommendationService._read_pairs(max(0, index.watermark - overlap))
+        recomputed = index.refresh(users, movies, watermark)
+        if recomputed or index.watermark != previous_watermark:
+            index.save(path)
+        logger.info('Refreshed recommendation index: %s movies recomputed, watermark %s', recomputed, index.watermark)
+        return index, recomputed
@@ -1,74 +1,134 @@
-import boto3
-import os
-from botocore.exceptions import ClientError
-import logging
-
-logger = logging.getLogger(__name__)
-
-class S3Service:
-    """Service for handling AWS S3 operations"""
-    
-    def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_S3_REGION', 'us-east-1')
-        )
-        self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
-    
-    def upload_movie(self, file_obj, key, content_type='video/mp4', metadata=None):
-        """Upload movie file to S3"""
-        try:
-            extra_args = {
-                'ContentType': content_type,
-                'ServerSideEncryption': 'AES256'
-            }
-            
-            if metadata:
-                extra_args['Metadata'] = metadata
-            
-            self.s3_client.upload_fileobj(
-                file_obj,
-                self.bucket_name,
-                key,
-                ExtraArgs=extra_args
-            )
-            
-            logger.info(f"Successfully uploaded movie to S3: {key}")
-            return True
-        except ClientError as e:
-            logger.error(f"Error uploading to S3: {str(e)}")
-            raise
-    
-    def generate_presigned_url(self, key, expiration=3600):
-        """Generate presigned URL for streaming"""
-        try:
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': key},
-                ExpiresIn=expiration
-            )
-            return url
-        except ClientError as e:
-            logger.error(f"Error generating presigned URL: {str(e)}")
-            raise
-    
-    def delete_movie(self, key):
-        """Delete movie file from S3"""
-        try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
-            logger.info(f"Successfully deleted movie from S3: {key}")
-            return True
-        except ClientError as e:
-            logger.error(f"Error deleting from S3: {str(e)}")
-            raise
-    
-    def get_object_size(self, key):
-        """Get size of object in S3"""
-        try:
-            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
-            return response['ContentLength']
-        except ClientError as e:
-            logger.error(f"Error getting object size: {str(e)}")
-            raise
+import boto3
+import os
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+import logging
+from app.utils.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+class S3Service:
+    """Service for handling AWS S3 operations"""
+    
+    def __init__(self):
+        self.s3_client = boto3.client(
+            's3',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=os.getenv('AWS_S3_REGION', 'us-east-1')
+        )
+        self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+    
+    @instrumented('s3')
+    def upload_movie(self, file_obj, key, content_type='video/mp4', metadata=None, part_size=None):
+        """Upload movie file to S3
+        
+        With part_size, the file is sent in parts of exactly that size with
+        SHA-256 checksums, so S3 reports a ChecksumSHA256 that can be
+        compared with file_handler.spool_and_hash.
+        """
+        try:
+            extra_args = {
+                'ContentType': content_type,
+                'ServerSideEncryption': 'AES256'
+            }
+            
+            if metadata:
+                extra_args['Metadata'] = metadata
+            
+            config = None
+            if part_size:
+                extra_args['ChecksumAlgorithm'] = 'SHA256'
+                # Files up to one part go in a single PUT, whose checksum is the plain SHA-256
+                config = TransferConfig(multipart_threshold=part_size + 1, multipart_chunksize=part_size)
+            
+            self.s3_client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                key,
+                ExtraArgs=extra_args,
+                Config=config
+            )
+            
+            logger.info('Successfully uploaded movie to S3: %s', key)
+            return True
+        except ClientError as e:
+            logger.error('Error uploading to S3: %s', e)
+            raise
+    
+    @instrumented('s3')
+    def get_object_checksum(self, key):
+        """Get the stored ChecksumSHA256 of an object, or None if it was uploaded without one"""
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key, ChecksumMode='ENABLED')
+            return response.get('ChecksumSHA256')
+        except ClientError as e:
+            logger.error('Error getting object checksum: %s', e)
+            raise
+    
+    @instrumented('s3')
+    def generate_presigned_url(self, key, expiration=3600):
+        """Generate presigned URL for streaming"""
+        try:
+            url = self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': key},
+                ExpiresIn=expiration
+            )
+            return url
+        except ClientError as e:
+            logger.error('Error generating presigned URL: %s', e)
+            raise
+    
+    @instrumented('s3')
+    def delete_movie(self, key):
+        """Delete movie file from S3"""
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            logger.info('Successfully deleted movie from S3: %s', key)
+            return True
+        except ClientError as e:
+            logger.error('Error deleting from S3: %s', e)
+            raise
+    
+    @instrumented('s3')
+    def get_object_size(self, key):
+        """Get size of object in S3"""
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return response['ContentLength']
+        except ClientError as e:
+            logger.error('Error getting object size: %s', e)
+            raise
+    
+    def iter_objects(self, prefix='', page_size=1000):
+        """Yield (key, size, last_modified) for every object under prefix, in key order"""
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix,
+            PaginationConfig={'PageSize': page_size}
+        )
+        try:
+            for page in pages:
+                for obj in page.get('Contents', []):
+                    yield obj['Key'], obj['Size'], obj['LastModified']
+        except ClientError as e:
+            logger.error('Error listing S3 objects: %s', e)
+            raise
+    
+    @instrumented('s3')
+    def delete_objects(self, keys):
+        """Delete up to 1000 objects in one request; returns (deleted_keys, {key: error})"""
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+            )
+            errors = {e['Key']: f"{e.get('Code')}: {e.get('Message')}" for e in response.get('Errors', [])}
+            deleted = [key for key in keys if key not in errors]
+            logger.info('Deleted %s objects from S3 (%s failed)', len(deleted), len(errors))
+            return deleted, errors
+        except ClientError as e:
+            logger.error('Error batch deleting from S3: %s', e)
+            raise
@@ -0,0 +1,90 @@
+from app.services import tmdb_service
+from app.services.movie_service import MovieService
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+import contextvars
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Executor:
+    """Per-process thread pool for TMDB calls (threads do not survive a fork, so workers build their own)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+    
+    def get(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(
+                    max_workers=current_app.config['HYBRID_SEARCH_WORKERS'],
+                    thread_name_prefix='hybrid-search'
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+
+tmdb_executor = _Executor()
+
+
+class SearchService:
+    """Search across the local catalog and TMDB"""
+    
+    @staticmethod
+    def hybrid_search(query, limit=20):
+        """Search the local catalog and TMDB concurrently; returns (results, sources).
+        
+        Hosted titles come first: local matches, most viewed first, then
+        public movies we host whose tmdb_id TMDB returned, in TMDB's order.
+        TMDB-only titles follow.  TMDB is waited for at most
+        HYBRID_SEARCH_TMDB_BUDGET_MS after it was called; if it is late or
+        fails the local results are returned alone.  ``sources`` has the
+        hosted and TMDB counts and ``tmdb_status`` (ok, timeout or error).
+        """
+        started = time.perf_counter()
+        budget = current_app.config['HYBRID_SEARCH_TMDB_BUDGET_MS'] / 1000
+        # The copied context lets the call show up in the request's Server-Timing header;
+        # the request timeout frees the pool thread soon after an abandoned call
+        future = tmdb_executor.get().submit(
+            contextvars.copy_context().run, tmdb_service.get().search_movies, query, timeout=budget
+        )
+        
+        hosted = MovieService.search_top_movies(query, limit)
+        
+        try:
+            tmdb_results = future.result(timeout=max(budget - (time.perf_counter() - started), 0))['results']
+            tmdb_status = 'ok'
+        except TimeoutError:
+            # Not started yet (all workers busy with slow calls) means it never will be
+            future.cancel()
+            tmdb_results, tmdb_status = [], 'timeout'
+            logger.warning('TMDB search exceeded the %sms budget, answering with local results', int(budget * 1000))
+        except Exception as e:
+            tmdb_results, tmdb_status = [], 'error'
+            logger.warning('TMDB search failed, answering with local results: %s', e)
+        
+        seen = {movie.tmdb_id for movie in hosted if movie.tmdb_id is not None}
+        unseen = [result['tmdb_id'] for result in tmdb_results if result['tmdb_id'] not in seen]
+        also_hosted = MovieService.get_public_movies_by_tmdb_ids(unseen) if unseen and len(hosted) < limit else {}
+        
+        results = [dict(movie.to_dict(include_images=True), source='local') for movie in hosted]
+        tmdb_only = []
+        for result in tmdb_results:
+            tmdb_id = result['tmdb_id']
+            if tmdb_id in seen:
+                continue
+            seen.add(tmdb_id)
+            if tmdb_id in also_hosted:
+                results.append(dict(also_hosted[tmdb_id].to_dict(include_images=True), source='local'))
+            else:
+                tmdb_only.append(dict(result, source='tmdb'))
+        hosted_count = min(len(results), limit)
+        results = (results + tmdb_only)[:limit]
+        
+        return results, {'local': hosted_count, 'tmdb': len(results) - hosted_count, 'tmdb_status': tmdb_status}
@@ -0,0 +1,178 @@
+from app.models.movie import Movie
+from app import db
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+S3_DELETE_BATCH_SIZE = 1000  # delete_objects accepts at most 1000 keys per request
+
+
+class ReconciliationReport:
+    """Running totals and a bounded sample of findings"""
+
+    def __init__(self, sample_size=100):
+        self.sample_size = sample_size
+        self.objects_scanned = 0
+        self.rows_scanned = 0
+        self.orphans = 0
+        self.orphan_bytes = 0
+        self.recent_orphans_skipped = 0
+        self.missing_objects = 0
+        self.size_mismatches = 0
+        self.deleted = 0
+        self.delete_errors = 0
+        self.samples = {'orphan': [], 'missing': [], 'size_mismatch': [], 'delete_error': []}
+
+    def sample(self, kind, item):
+        if len(self.samples[kind]) < self.sample_size:
+            self.samples[kind].append(item)
+
+    def to_dict(self):
+        return {
+            'objects_scanned': self.objects_scanned,
+            'rows_scanned': self.rows_scanned,
+            'orphans': self.orphans,
+            'orphan_bytes': self.orphan_bytes,
+            'recent_orphans_skipped': self.recent_orphans_skipped,
+            'missing_objects': self.missing_objects,
+            'size_mismatches': self.size_mismatches,
+            'deleted': self.deleted,
+            'delete_errors': self.delete_errors,
+            'samples': self.samples
+        }
+
+
+class StorageReconciler:
+    """Merge-joins the S3 bucket listing against Movie rows to find orphans and mismatches.
+
+    Both sides are streamed in key order (S3 lists keys in UTF-8 byte order;
+    the database scan is keyset paginated with a byte-order collation), so
+    memory use does not grow with the size of the bucket or the table.  The
+    database scan ends its transaction between batches, so run it outside of
+    any unit of work that has pending changes.
+    """
+
+    def __init__(self, s3_service, prefix='movies/', batch_size=1000, grace_period=timedelta(hours=24),
+                 delete_orphans=False, workers=4, sample_size=100):
+        self.s3_service = s3_service
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.grace_period = grace_period
+        self.delete_orphans = delete_orphans
+        self.workers = workers
+        self.report = ReconciliationReport(sample_size)
+
+    def _key_column(self):
+        # Postgres sorts by locale collation by default; S3 uses byte order
+        if db.engine.dialect.name == 'postgresql':
+            return Movie.s3_key.collate('C')
+        return Movie.s3_key
+
+    def iter_db_objects(self):
+        """Yield (s3_key, file_size) for movie rows under the prefix using a keyset scan"""
+        key_column = self._key_column()
+        last_key = None
+        while True:
+            query = db.session.query(Movie.s3_key, Movie.file_size).filter(Movie.s3_key.startswith(self.prefix, autoescape=True))
+            if last_key is not None:
+                query = query.filter(key_column > last_key)
+            # Movies with identical files share a key
+            rows = query.distinct().order_by(key_column).limit(self.batch_size).all()
+            if not rows:
+                return
+            for row in rows:
+                yield row.s3_key, row.file_size
+            last_key = rows[-1].s3_key
+            # Release the read snapshot between batches
+            db.session.rollback()
+
+    def iter_findings(self):
+        """Yield (kind, details) findings while merge-joining both listings"""
+        cutoff = datetime.now(timezone.utc) - self.grace_period
+        objects = iter(self.s3_service.iter_objects(self.prefix))
+        rows = iter(self.iter_db_objects())
+        obj = next(objects, None)
+        row = next(rows, None)
+
+        while obj is not None or row is not None:
+            if row is None or (obj is not None and obj[0] < row[0]):
+                key, size, last_modified = obj
+                self.report.objects_scanned += 1
+                if last_modified is not None and _as_utc(last_modified) > cutoff:
+                    # Possibly an upload whose movie row is not committed yet
+                    self.report.recent_orphans_skipped += 1
+                else:
+                    self.report.orphans += 1
+                    self.report.orphan_bytes += size
+                    yield 'orphan', {
+                        'key': key,
+                        'size': size,
+                        'last_modified': _as_utc(last_modified).isoformat() if last_modified else None
+                    }
+                obj = next(objects, None)
+            elif obj is None or row[0] < obj[0]:
+                self.report.rows_scanned += 1
+                self.report.missing_objects += 1
+                yield 'missing', {'key': row[0], 'file_size': row[1]}
+                row = next(rows, None)
+            else:
+                self.report.objects_scanned += 1
+                self.report.rows_scanned += 1
+                if row[1] is not None and row[1] != obj[1]:
+                    self.report.size_mismatches += 1
+                    yield 'size_mismatch', {'key': obj[0], 'object_size': obj[1], 'file_size': row[1]}
+                obj = next(objects, None)
+                row = next(rows, None)
+
+    def run(self, on_finding=None):
+        """Reconcile the bucket and optionally delete orphans; returns the report"""
+        pending = []
+        limiter = threading.BoundedSemaphore(self.workers * 2)
+        lock = threading.Lock()
+
+        def delete_batch(keys):
+            try:
+                deleted, errors = self.s3_service.delete_objects(keys)
+            except Exception as e:
+                deleted, errors = [], {key: str(e) for key in keys}
+            finally:
+                limiter.release()
+            with lock:
+                self.report.deleted += len(deleted)
+                self.report.delete_errors += len(errors)
+                for key, error in errors.items():
+                    self.report.sample('delete_error', {'key': key, 'error': error})
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for kind, details in self.iter_findings():
+                self.report.sample(kind, details)
+                if on_finding is not None:
+                    on_finding(kind, details)
+                if kind == 'orphan' and self.delete_orphans:
+                    pending.append(details['key'])
+                    if len(pending) >= S3_DELETE_BATCH_SIZE:
+                        # Blocks when too many batches are in flight so memory stays bounded
+                        limiter.acquire()
+                        pool.submit(delete_batch, pending)
+                        pending = []
+            if pending:
+                limiter.acquire()
+                pool.submit(delete_batch, pending)
+
+        logger.info(
+            'Storage reconciliation finished: %s orphans (%s bytes), %s missing objects, %s size mismatches, %s deleted',
+            self.report.orphans, self.report.orphan_bytes, self.report.missing_objects,
+            self.report.size_mismatches, self.report.deleted
+        )
+        return self.report
+
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -0,0 +1,187 @@
+from app.models.revoked_token import RevokedToken
+from app import db
+from app.utils.bloom import BloomFilter
+from app.utils.metrics import record_cache
+from app.utils.query_budget import untracked
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NEVER_EXPIRES = datetime(9999, 1, 1)  # For tokens issued without an exp claim
+
+
+class RevocationFilter:
+    """Per-process Bloom filter of revoked token ids, synced incrementally from revoked_tokens.
+
+    Nearly every request carries a token that was never revoked, and the
+    filter rules those out in memory.  A hit (a revoked token or a rare false
+    positive) is confirmed with one indexed lookup.  At most every
+    TOKEN_BLOCKLIST_SYNC_INTERVAL seconds the filter folds in rows past the
+    highest id it has seen, so revocations made by other processes take
+    effect within that interval; those made by this process at once.  The
+    filter is rebuilt from unexpired rows when it outgrows its capacity and
+    after every prune.
+
+    Its queries are per-process upkeep, so they are left out of route budgets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._bloom = None
+        self._cursor = 0  # Highest revoked_tokens.id folded into the filter
+        self._synced_at = 0.0
+        self._pruner = None
+
+    def _check_fork(self):
+        # A filter inherited from a parent process misses everything revoked since the fork
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _rows(self, after_id=None):
+        query = select(RevokedToken.id, RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow())
+        if after_id is not None:
+            query = query.where(RevokedToken.id > after_id)
+        with untracked():
+            return db.session.execute(query).all()
+
+    def rebuild(self):
+        """Replace the filter with one holding every unexpired revocation"""
+        config = current_app.config
+        rows = self._rows()
+        bloom = BloomFilter(max(config['TOKEN_BLOCKLIST_CAPACITY'], 2 * len(rows)), config['TOKEN_BLOCKLIST_ERROR_RATE'])
+        for row in rows:
+            bloom.add(row.jti)
+        with self._lock:
+            self._bloom = bloom
+            self._cursor = max([row.id for row in rows] + [self._cursor])
+            self._synced_at = time.monotonic()
+        logger.info('Rebuilt token revocation filter with %s entries', len(rows))
+
+    def sync(self):
+        """Fold in revocations committed since the last sync"""
+        with self._lock:
+            self._check_fork()
+            bloom, cursor = self._bloom, self._cursor
+        if bloom is None or bloom.full:
+            return self.rebuild()
+
+        # Re-read an overlap: ids are assigned before commit, so a lower id can commit later
+        rows = self._rows(cursor - current_app.config['TOKEN_BLOCKLIST_SYNC_OVERLAP'])
+        for row in rows:
+            if row.jti not in bloom:
+                bloom.add(row.jti)
+        with self._lock:
+            self._cursor = max([row.id for row in rows] + [self._cursor])
+            self._synced_at = time.monotonic()
+
+    def add(self, jti):
+        """Record a revocation made by this process (after it is committed)"""
+        with self._lock:
+            self._check_fork()
+            bloom = self._bloom
+        if bloom is not None:
+            bloom.add(jti)
+
+    def is_revoked(self, jti):
+        config = current_app.config
+        with self._lock:
+            self._check_fork()
+            stale = self._bloom is None or time.monotonic() - self._synced_at >= config['TOKEN_BLOCKLIST_SYNC_INTERVAL']
+        # Only one thread syncs; the others answer from the current filter unless there is none yet
+        if stale and self._sync_lock.acquire(blocking=self._bloom is None):
+            try:
+                self.sync()
+            finally:
+                self._sync_lock.release()
+        self._ensure_pruner()
+
+        if jti not in self._bloom:
+            record_cache('token_revocations', True)
+            return False
+        record_cache('token_revocations', False)
+        with untracked():
+            return db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+
+    def prune(self):
+        """Delete revocations of tokens that have expired anyway, then rebuild; returns how many were removed"""
+        removed = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        self.rebuild()
+        return removed
+
+    def _ensure_pruner(self):
+        interval = current_app.config['TOKEN_BLOCKLIST_PRUNE_INTERVAL']
+        if not interval or self._pruner is not None:
+            return
+        with self._lock:
+            if self._pruner is not None:
+                return
+            app = current_app._get_current_object()
+            self._pruner = threading.Thread(target=self._prune_loop, args=(app, interval),
+                                            name='token-revocation-pruner', daemon=True)
+            self._pruner.start()
+
+    def _prune_loop(self, app, interval):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    removed = self.prune()
+                    logger.info('Pruned %s expired token revocations', removed)
+                except Exception:
+                    logger.exception('Token revocation prune failed')
+                finally:
+                    db.session.remove()
+
+
+revocations = RevocationFilter()
+
+
+class TokenRevocationService:
+    """Service for revoking JWTs before they expire"""
+
+    @staticmethod
+    def revoke_tokens(decoded_tokens):
+        """Revoke decoded tokens (as from get_jwt or decode_token); already revoked ones are skipped"""
+        rows = [
+            RevokedToken(
+                jti=token['jti'],
+                token_type=token['type'],
+                user_id=int(token['sub']),
+                expires_at=datetime.fromtimestamp(token['exp'], timezone.utc).replace(tzinfo=None)
+                if 'exp' in token else NEVER_EXPIRES
+            )
+            for token in decoded_tokens
+        ]
+        try:
+            db.session.add_all(rows)
+            db.session.commit()
+        except IntegrityError:
+            # One of them was revoked before; store the others one by one
+            db.session.rollback()
+            for row in rows:
+                if RevokedToken.query.filter_by(jti=row.jti).first() is None:
+                    db.session.add(row)
+            db.session.commit()
+
+        for token in decoded_tokens:
+            revocations.add(token['jti'])
+        logger.info('Revoked %s tokens', len(decoded_tokens))
+
+    @staticmethod
+    def is_token_revoked(jwt_header, jwt_payload):
+        """token_in_blocklist_loader callback"""
+        return revocations.is_revoked(jwt_payload['jti'])
@@ -0,0 +1,239 @@
+from app.models.movie import Movie
+from app.models.trending_score import TrendingScore
+from app import db
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Scores are stored as log(sum(w * exp(rate * (t - EPOCH)))).  Decay scales
+# every movie by the same factor, so ranking by the stored value never needs a
+# rescan; only reading an absolute score subtracts rate * (now - EPOCH).
+# Changing EPOCH invalidates the trending_scores table.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+NEG_INF = float('-inf')
+
+
+def logaddexp(a, b):
+    """log(exp(a) + exp(b)) without overflow"""
+    if a == NEG_INF:
+        return b
+    if b == NEG_INF:
+        return a
+    high, low = (a, b) if a > b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decay_rate(half_life_hours):
+    return math.log(2) / (half_life_hours * 3600)
+
+
+class TrendingEngine:
+    """Per-process, incrementally updated top-K of time-decayed movie popularity.
+
+    Events are folded into an in-memory pending delta and a sorted top list.
+    A background thread periodically merges the deltas into the
+    ``trending_scores`` table (so all workers contribute) and reloads the
+    global top list with an indexed ``ORDER BY log_score DESC LIMIT n``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._pending = {}  # movie_id -> log score not yet persisted
+        self._base = {}  # movie_id -> persisted log score, for movies in the last snapshot
+        self._top = []  # ascending [(log_score, movie_id)]
+        self._top_scores = {}  # movie_id -> log_score currently in self._top
+        self._loaded = False
+        self._flusher = None
+
+    def _check_fork(self):
+        # State inherited from a parent process belongs to the parent
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _place(self, movie_id, log_score, size):
+        previous = self._top_scores.get(movie_id)
+        if previous is not None:
+            del self._top[bisect_left(self._top, (previous, movie_id))]
+        elif len(self._top) >= size and log_score <= self._top[0][0]:
+            return
+        insort(self._top, (log_score, movie_id))
+        self._top_scores[movie_id] = log_score
+        if len(self._top) > size:
+            _, dropped = self._top.pop(0)
+            del self._top_scores[dropped]
+
+    def record(self, movie_id, weight, now=None):
+        """Add ``weight`` to a movie's decayed score"""
+        if weight <= 0:
+            return
+        config = current_app.config
+        now = time.time() if now is None else now
+        log_weight = math.log(weight) + decay_rate(config['TRENDING_HALF_LIFE_HOURS']) * (now - EPOCH)
+        with self._lock:
+            self._check_fork()
+            pending = logaddexp(self._pending.get(movie_id, NEG_INF), log_weight)
+            self._pending[movie_id] = pending
+            # Movies outside the snapshot have an unknown persisted score; the
+            # pending delta is a lower bound until the next reload.
+            self._place(movie_id, logaddexp(self._base.get(movie_id, NEG_INF), pending), config['TRENDING_TOP_SIZE'])
+        self._ensure_flusher()
+
+    def top(self, limit, now=None):
+        """Return [(movie_id, current score)] for the highest scoring movies"""
+        config = current_app.config
+        with self._lock:
+            self._check_fork()
+            loaded = self._loaded
+        if not loaded:
+            self.reload()
+
+        offset = decay_rate(config['TRENDING_HALF_LIFE_HOURS']) * ((time.time() if now is None else now) - EPOCH)
+        with self._lock:
+            best = self._top[::-1][:limit]
+        return [(movie_id, math.exp(log_score - offset)) for log_score, movie_id in best]
+
+    def reload(self):
+        """Replace the top list with the persisted ranking plus unflushed local events"""
+        size = current_app.config['TRENDING_TOP_SIZE']
+        rows = db.session.query(TrendingScore.movie_id, TrendingScore.log_score).order_by(
+            TrendingScore.log_score.desc()
+        ).limit(size).all()
+        with self._lock:
+            self._base = {row.movie_id: row.log_score for row in rows}
+            self._top = []
+            self._top_scores = {}
+            for movie_id, log_score in self._base.items():
+                self._place(movie_id, logaddexp(log_score, self._pending.get(movie_id, NEG_INF)), size)
+            for movie_id, pending in self._pending.items():
+                if movie_id not in self._base:
+                    self._place(movie_id, pending, size)
+            self._loaded = True
+
+    def flush(self, now=None):
+        """Merge pending deltas into trending_scores, prune decayed rows and reload"""
+        with self._lock:
+            self._check_fork()
+            pending, self._pending = self._pending, {}
+
+        if pending:
+            try:
+                self._persist(pending)
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    for movie_id, log_score in pending.items():
+                        self._pending[movie_id] = logaddexp(self._pending.get(movie_id, NEG_INF), log_score)
+                logger.error('Error persisting trending scores: %s', e)
+                raise
+
+        config = current_app.config
+        now = time.time() if now is None else now
+        floor = decay_rate(config['TRENDING_HALF_LIFE_HOURS']) * (now - EPOCH) + math.log(config['TRENDING_MIN_SCORE'])
+        pruned = TrendingScore.query.filter(TrendingScore.log_score < floor).delete(synchronize_session=False)
+        db.session.commit()
+        self.reload()
+        return len(pending), pruned
+
+    def _persist(self, pending):
+        for attempt in range(2):
+            try:
+                ids = list(pending)
+                rows = {
+                    row.movie_id: row
+                    for row in TrendingScore.query.filter(TrendingScore.movie_id.in_(ids)).with_for_update()
+                }
+                missing = [movie_id for movie_id in ids if movie_id not in rows]
+                existing_movies = {
+                    movie_id for (movie_id,) in db.session.query(Movie.id).filter(Movie.id.in_(missing))
+                } if missing else set()
+
+                for movie_id, log_score in pending.items():
+                    if movie_id in rows:
+                        rows[movie_id].log_score = logaddexp(rows[movie_id].log_score, log_score)
+                    elif movie_id in existing_movies:
+                        db.session.add(TrendingScore(movie_id=movie_id, log_score=log_score))
+                db.session.commit()
+                return
+            except IntegrityError:
+                # Another worker inserted one of the rows first; merge into it instead
+                db.session.rollback()
+                if attempt:
+                    raise
+
+    def _ensure_flusher(self):
+        interval = current_app.config['TRENDING_FLUSH_INTERVAL']
+        if not interval or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            app = current_app._get_current_object()
+            self._flusher = threading.Thread(target=self._flush_loop, args=(app, interval),
+                                             name='trending-flusher', daemon=True)
+            self._flusher.start()
+            atexit.register(self._flush_at_exit, app)
+
+    def _flush_loop(self, app, interval):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Trending flush failed')
+                finally:
+                    db.session.remove()
+
+    def _flush_at_exit(self, app):
+        if self._pid == os.getpid() and self._pending:
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Trending flush at exit failed')
+
+
+trending = TrendingEngine()
+
+
+class TrendingService:
+    """Service for the local trending ranking"""
+
+    @staticmethod
+    def record_stream(movie_id):
+        """Count a stream URL issue"""
+        trending.record(movie_id, current_app.config['TRENDING_STREAM_WEIGHT'])
+
+    @staticmethod
+    def record_progress(movie_id, seconds_watched, total_duration):
+        """Count newly watched time, so a full watch adds TRENDING_WATCH_WEIGHT however often progress is reported"""
+        if total_duration and seconds_watched > 0:
+            fraction = min(seconds_watched / total_duration, 1.0)
+            trending.record(movie_id, current_app.config['TRENDING_WATCH_WEIGHT'] * fraction)
+
+    @staticmethod
+    def get_trending_movies(limit=20):
+        """Get public movies ordered by decayed popularity with one movie query"""
+        # Over-fetch so private or deleted movies do not leave the page short
+        ranked = trending.top(limit * 2)
+        if not ranked:
+            return []
+        movies = {
+            movie.id: movie
+            for movie in Movie.query.filter(Movie.id.in_([movie_id for movie_id, _ in ranked]), Movie.is_public == True)
+        }
+        return [(movies[movie_id], score) for movie_id, score in ranked if movie_id in movies][:limit]
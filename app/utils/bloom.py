@@ -0,0 +1,50 @@
+"""Fixed-size Bloom filter for set membership with no false negatives.
+
+``item in bloom`` is False only for items never added, and True for added
+items plus a ``error_rate`` fraction of the rest, which callers confirm
+against the source of truth.  Items cannot be removed; rebuild the filter
+instead.
+"""
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Bloom filter sized for ``capacity`` string items at ``error_rate`` false positives"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))  # Bits
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self._count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self):
+        """Number of ``add`` calls, counting repeats"""
+        return self._count
+
+    @property
+    def full(self):
+        """True once more items were added than the filter was sized for"""
+        return self._count > self.capacity
@@ -0,0 +1,56 @@
+"""Small in-process caches with expiry.
+
+Entries live in the memory of a single worker process.  Explicit
+``invalidate`` calls therefore only reach the worker that handled the write;
+the TTL bounds how long other workers can serve a stale value.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.metrics import record_cache
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, name, ttl=60, maxsize=10000):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``MISSING``"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache(self.name, entry is not None)
+        return entry[1] if entry is not None else MISSING
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,165 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/csv',
+    'text/plain',
+    'text/html',
+    'text/css',
+)
+SLICE_SIZE = 64 * 1024
+
+
+def available_encodings():
+    """Content codings this process can produce"""
+    return ('br', 'gzip', 'identity') if brotli is not None else ('gzip', 'identity')
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into {coding: q}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header, available):
+    """Pick the best coding from ``available`` for an Accept-Encoding header"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*')
+    best, best_q = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        q = accepted.get(coding, wildcard if wildcard is not None else (1.0 if coding == 'identity' else 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best or 'identity'
+
+
+def compress(data, coding):
+    """Compress a whole payload at maximum ratio (for build-time assets)"""
+    if coding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if coding == 'br':
+        return brotli.compress(data, quality=11)
+    return data
+
+
+class StreamCompressor:
+    """Incremental gzip or brotli encoder"""
+
+    def __init__(self, coding, level):
+        self.coding = coding
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits=31 selects the gzip container
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.coding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Emit everything buffered so far without ending the stream"""
+        if self.coding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_chunks(chunks, compressor, flush_each_chunk):
+    """Compress an iterable of byte chunks lazily, one slice at a time"""
+    for chunk in chunks:
+        for start in range(0, len(chunk), SLICE_SIZE):
+            out = compressor.compress(chunk[start:start + SLICE_SIZE])
+            if flush_each_chunk and start + SLICE_SIZE >= len(chunk):
+                # Streamed bodies: make every upstream chunk decodable on arrival
+                out += compressor.flush()
+            if out:
+                yield out
+    out = compressor.finish()
+    if out:
+        yield out
+
+
+def register_compression(app):
+    """Compress API responses on the fly according to Accept-Encoding.
+
+    Bodies below COMPRESSION_MIN_SIZE are sent as is. Known-size bodies up to
+    COMPRESSION_CPU_CAP_BYTES use the normal levels; larger or streamed bodies
+    use the fast levels so a single response cannot monopolize a worker's CPU.
+    The body is compressed slice by slice while it is sent, so no compressed
+    copy of the whole payload is ever held in memory.
+    """
+    if not app.config.get('COMPRESSION_ENABLED'):
+        return
+
+    @app.after_request
+    def compress_response(response):
+        config = app.config
+        if (request.method == 'HEAD'
+                or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        coding = choose_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+        if coding == 'identity':
+            return response
+
+        length = None if response.is_streamed else response.calculate_content_length()
+        if length is not None and length < config['COMPRESSION_MIN_SIZE']:
+            return response
+
+        fast = length is None or length > config['COMPRESSION_CPU_CAP_BYTES']
+        if coding == 'br':
+            level = config['COMPRESSION_BROTLI_FAST_QUALITY'] if fast else config['COMPRESSION_BROTLI_QUALITY']
+        else:
+            level = config['COMPRESSION_GZIP_FAST_LEVEL'] if fast else config['COMPRESSION_GZIP_LEVEL']
+
+        response.response = compress_chunks(
+            response.iter_encoded(),
+            StreamCompressor(coding, level),
+            flush_each_chunk=response.is_streamed
+        )
+        response.headers['Content-Encoding'] = coding
+        response.headers.pop('Content-Length', None)
+        # The encoded bytes differ from the identity representation
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,175 @@
+"""Route read-only service calls to read replicas.
+
+Replica URLs from ``SQLALCHEMY_REPLICA_URIS`` become Flask-SQLAlchemy binds
+(``replica_0``, ``replica_1``, ...).  Inside a function decorated with
+``@replica_reads`` the session sends plain SELECTs to the next healthy
+replica, round robin.  Everything else stays on the primary:
+
+* flushes and INSERT/UPDATE/DELETE statements;
+* any query after the current session has written, or while it has pending
+  changes, so a request sees its own writes;
+* requests from a client that wrote within ``REPLICA_STICKY_SECONDS``,
+  tracked with a cookie so it works across worker processes while the
+  replicas catch up.
+
+A replica that fails is skipped until a ``SELECT 1`` probe succeeds again,
+at most every ``REPLICA_CHECK_INTERVAL`` seconds; the call that hit the
+failure is retried on the primary.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_COOKIE = 'db_last_write'
+
+# Set inside @replica_reads calls: {'used': bind key of the replica last read from}
+_replica_reads = contextvars.ContextVar('replica_reads', default=None)
+
+
+def replica_reads(f):
+    """Allow the SELECTs issued inside ``f`` to be served by a replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if _replica_reads.get() is not None:
+            return f(*args, **kwargs)
+        state = {'used': None}
+        token = _replica_reads.set(state)
+        try:
+            return f(*args, **kwargs)
+        except DBAPIError:
+            if state['used'] is None:
+                raise
+            pool = current_app.extensions['replicas']
+            pool.mark_down(state['used'])
+            # Nothing was written through this session (or it would not have used a replica)
+            current_app.extensions['sqlalchemy'].session.rollback()
+        finally:
+            _replica_reads.reset(token)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+class ReplicaPool:
+    """Round-robin choice among healthy replica engines"""
+
+    def __init__(self, engines, check_interval=10):
+        self.engines = engines  # bind key -> Engine
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(list(engines))
+        self._down_since = {}  # bind key -> time of the last failure or failed probe
+        self._lock = threading.Lock()
+
+    def mark_down(self, key):
+        with self._lock:
+            if key not in self._down_since:
+                logger.warning('Read replica %s is unavailable, reading from the other replicas or the primary', key)
+            self._down_since[key] = time.monotonic()
+
+    def _probe(self, key):
+        try:
+            with self.engines[key].connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            logger.warning('Read replica %s health check failed: %s', key, e)
+            self.mark_down(key)
+            return False
+        with self._lock:
+            self._down_since.pop(key, None)
+        logger.info('Read replica %s is healthy again', key)
+        return True
+
+    def pick(self):
+        """Return the bind key of the next healthy replica, or None when all are down"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                key = next(self._cycle)
+                down_since = self._down_since.get(key)
+            if down_since is None:
+                return key
+            if now - down_since >= self.check_interval and self._probe(key):
+                return key
+        return None
+
+    def healthy(self):
+        with self._lock:
+            return [key for key in self.engines if key not in self._down_since]
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica inside ``@replica_reads`` calls when it is safe"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        state = _replica_reads.get()
+        if (state is not None and bind is None and not self._flushing
+                and getattr(clause, 'is_select', False)
+                and not self.info.get('wrote') and not (self.new or self.dirty or self.deleted)
+                and has_app_context()):
+            pool = current_app.extensions.get('replicas')
+            if pool is not None and not (has_request_context() and g.get('db_sticky_primary')):
+                key = pool.pick()
+                if key is not None:
+                    state['used'] = key
+                    return pool.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+def add_replica_binds(app):
+    """Declare one bind per replica URL; must run before ``db.init_app``"""
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for number, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+        binds[f'replica_{number}'] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def register_replica_routing(app, db):
+    """Set up the replica pool and the read-your-writes cookie"""
+    keys = [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith('replica_')]
+    if not keys:
+        return
+
+    with app.app_context():
+        engines = {key: db.engines[key] for key in keys}
+    # Replicas get the primary's schema through replication; keep create_all/drop_all off them
+    for key in keys:
+        db.metadatas.pop(key, None)
+    app.extensions['replicas'] = ReplicaPool(engines, app.config['REPLICA_CHECK_INTERVAL'])
+    sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+
+    @app.before_request
+    def stick_to_primary_after_writes():
+        try:
+            last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+        except ValueError:
+            last_write = 0
+        g.db_sticky_primary = time.time() - last_write < sticky_seconds
+        # The session outlives the request when an app context was already pushed (tests, CLI)
+        db.session().info.pop('wrote', None)
+
+    @app.after_request
+    def remember_writes(response):
+        if db.session().info.get('wrote'):
+            response.set_cookie(LAST_WRITE_COOKIE, f'{time.time():.3f}', max_age=sticky_seconds,
+                                httponly=True, samesite='Lax')
+        return response
@@ -1,57 +1,57 @@
-from flask import jsonify
-from datetime import datetime
-import logging
-
-logger = logging.getLogger(__name__)
-
-class APIError(Exception):
-    """Custom API exception"""
-    def __init__(self, message, status_code=400):
-        super().__init__()
-        self.message = message
-        self.status_code = status_code
-
-def register_error_handlers(app):
-    """Register error handlers for the application"""
-    
-    @app.errorhandler(APIError)
-    def handle_api_error(error):
-        """Handle custom API errors"""
-        logger.error(f"API Error: {error.message}")
-        return jsonify({
-            'error': error.message,
-            'timestamp': datetime.utcnow().isoformat()
-        }), error.status_code
-    
-    @app.errorhandler(404)
-    def not_found(error):
-        """Handle 404 errors"""
-        return jsonify({
-            'error': 'Resource not found',
-            'timestamp': datetime.utcnow().isoformat()
-        }), 404
-    
-    @app.errorhandler(500)
-    def internal_error(error):
-        """Handle 500 errors"""
-        logger.error(f"Internal Server Error: {str(error)}")
-        return jsonify({
-            'error': 'Internal server error',
-            'timestamp': datetime.utcnow().isoformat()
-        }), 500
-    
-    @app.errorhandler(401)
-    def unauthorized(error):
-        """Handle 401 errors"""
-        return jsonify({
-            'error': 'Unauthorized',
-            'timestamp': datetime.utcnow().isoformat()
-        }), 401
-    
-    @app.errorhandler(403)
-    def forbidden(error):
-        """Handle 403 errors"""
-        return jsonify({
-            'error': 'Forbidden',
-            'timestamp': datetime.utcnow().isoformat()
-        }), 403
+from flask import jsonify
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+class APIError(Exception):
+    """Custom API exception"""
+    def __init__(self, message, status_code=400):
+        super().__init__()
+        self.message = message
+        self.status_code = status_code
+
+def register_error_handlers(app):
+    """Register error handlers for the application"""
+    
+    @app.errorhandler(APIError)
+    def handle_api_error(error):
+        """Handle custom API errors"""
+        logger.error('API Error: %s', error.message)
+        return jsonify({
+            'error': error.message,
+            'timestamp': datetime.utcnow().isoformat()
+        }), error.status_code
+    
+    @app.errorhandler(404)
+    def not_found(error):
+        """Handle 404 errors"""
+        return jsonify({
+            'error': 'Resource not found',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 404
+    
+    @app.errorhandler(500)
+    def internal_error(error):
+        """Handle 500 errors"""
+        logger.error('Internal Server Error: %s', error)
+        return jsonify({
+            'error': 'Internal server error',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 500
+    
+    @app.errorhandler(401)
+    def unauthorized(error):
+        """Handle 401 errors"""
+        return jsonify({
+            'error': 'Unauthorized',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 401
+    
+    @app.errorhandler(403)
+    def forbidden(error):
+        """Handle 403 errors"""
+        return jsonify({
+            'error': 'Forbidden',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 403
@@ -1,28 +1,73 @@
-from werkzeug.utils import secure_filename
-import os
-
-def allowed_file(filename, allowed_extensions):
-    """Check if file has allowed extension"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
-
-def get_file_size(file_obj):
-    """Get file size without reading entire file"""
-    file_obj.seek(0, os.SEEK_END)
-    size = file_obj.tell()
-    file_obj.seek(0)
-    return size
-
-def format_file_size(size_bytes):
-    """Format bytes to human readable format"""
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.2f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.2f} PB"
-
-def generate_s3_key(user_id, filename):
-    """Generate S3 key for file storage"""
-    from datetime import datetime
-    secure_name = secure_filename(filename)
-    timestamp = datetime.utcnow().timestamp()
-    return f"movies/{user_id}/{timestamp}_{secure_name}"
+from collections import namedtuple
+from werkzeug.utils import secure_filename
+import base64
+import hashlib
+import os
+
+# sha256: hex digest of the whole file; checksum_sha256: what S3 reports for it when uploaded in part_size parts
+FileDigest = namedtuple('FileDigest', ['sha256', 'size', 'checksum_sha256'])
+
+def allowed_file(filename, allowed_extensions):
+    """Check if file has allowed extension"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+def get_file_size(file_obj):
+    """Get file size without reading entire file"""
+    file_obj.seek(0, os.SEEK_END)
+    size = file_obj.tell()
+    file_obj.seek(0)
+    return size
+
+def format_file_size(size_bytes):
+    """Format bytes to human readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.2f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.2f} PB"
+
+def generate_s3_key(user_id, filename):
+    """Generate S3 key for file storage"""
+    from datetime import datetime
+    secure_name = secure_filename(filename)
+    timestamp = datetime.utcnow().timestamp()
+    return f"movies/{user_id}/{timestamp}_{secure_name}"
+
+def s3_checksum(part_digests):
+    """S3 ChecksumSHA256 of an object from the SHA-256 digests of its upload parts"""
+    if len(part_digests) == 1:
+        return base64.b64encode(part_digests[0]).decode()
+    combined = hashlib.sha256(b''.join(part_digests)).digest()
+    return f"{base64.b64encode(combined).decode()}-{len(part_digests)}"
+
+def spool_and_hash(stream, path, part_size, chunk_size=1024 * 1024):
+    """Copy an upload stream to path, hashing it on the way; returns a FileDigest.
+    
+    Besides the SHA-256 of the whole file, each part_size part is hashed as S3
+    does for a multipart upload with SHA-256 checksums, so the stored object
+    can be checked against what was received.
+    """
+    whole = hashlib.sha256()
+    part = hashlib.sha256()
+    part_digests = []
+    part_filled = size = 0
+    with open(path, 'wb') as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+            whole.update(chunk)
+            size += len(chunk)
+            view = memoryview(chunk)
+            while view:
+                take = min(len(view), part_size - part_filled)
+                part.update(view[:take])
+                part_filled += take
+                view = view[take:]
+                if part_filled == part_size:
+                    part_digests.append(part.digest())
+                    part, part_filled = hashlib.sha256(), 0
+    if part_filled or not part_digests:
+        part_digests.append(part.digest())
+    return FileDigest(whole.hexdigest(), size, s3_checksum(part_digests))
@@ -1,40 +1,215 @@
-import logging.config
-import os
-
-LOGGING_CONFIG = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'standard': {
-            'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-        },
-        'detailed': {
-            'format': '%(asctime)s [%(levelname)s] %(name)s - %(filename)s:%(lineno)d - %(funcName)s: %(message)s'
-        },
-    },
-    'handlers': {
-        'default': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'standard',
-            'stream': 'ext://sys.stdout'
-        },
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
-            'formatter': 'detailed',
-            'filename': 'logs/app.log',
-            'maxBytes': 10485760,
-            'backupCount': 5
-        },
-    },
-    'root': {
-        'level': 'DEBUG',
-        'handlers': ['default', 'file']
-    }
-}
-
-def setup_logging():
-    """Setup application logging"""
-    os.makedirs('logs', exist_ok=True)
-    logging.config.dictConfig(LOGGING_CONFIG)
+"""Application logging: JSON lines written off the request threads.
+
+Request threads only build the record, and only for records that pass the
+level check and the per-logger sampling; ``QueueHandler`` hands them to a
+``QueueListener`` thread that serializes them and does the file and stream
+I/O.  Log calls should pass arguments lazily
+(``logger.info('Movie created: %s', title)``) so nothing is formatted for
+records that are dropped.
+
+Environment:
+
+``LOG_LEVEL``
+    Root level (default INFO).
+``LOG_FORMAT``
+    ``json`` (default) or ``text`` for a human readable console.
+``LOG_SAMPLE_RATES``
+    Comma separated ``logger=rate`` pairs, e.g. ``app.access=0.1``, keeping
+    that fraction of the logger's DEBUG and INFO records.  Warnings and
+    errors are never sampled.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+DEFAULT_SAMPLE_RATES = 'app.access=0.1'
+
+access_logger = logging.getLogger('app.access')
+
+# LogRecord attributes that are not user supplied ``extra`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the request id and any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.levelno >= logging.WARNING:
+            entry['location'] = f'{record.pathname}:{record.lineno}'
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z'
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request being handled (runs in the request thread, before queueing)"""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of the DEBUG and INFO records of selected loggers (and their children)"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+def parse_sample_rates(value):
+    """Parse ``logger=rate,...`` into a dict"""
+    rates = {}
+    for pair in filter(None, (item.strip() for item in value.split(','))):
+        name, _, rate = pair.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Only what must happen while the arguments and traceback still exist is done here:
+        # merging the message and rendering the exception.  Serialization is left to the listener.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def _build_handlers(log_format, stream, log_dir):
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(
+        '%(asctime)s [%(levelname)s] %(name)s [%(request_id)s]: %(message)s')
+    console = logging.StreamHandler(stream)
+    console.setLevel(logging.INFO)
+    console.setFormatter(formatter)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, 'app.log'),
+        maxBytes=10485760,
+        backupCount=5,
+        delay=True  # Open the file on first write, not at startup
+    )
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(JsonFormatter())
+    return console, file_handler
+
+
+def _start_listener(handlers):
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return log_queue
+
+
+def _restart_listener_after_fork():
+    # The listener thread does not survive fork; forked server workers need their own
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, _QueueHandler):
+            handler.queue = _start_listener(_listener.handlers)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+
+
+def setup_logging(log_format=None, sample_rates=None, stream=None, log_dir='logs'):
+    """Setup application logging; arguments left as None come from the environment"""
+    os.makedirs(log_dir, exist_ok=True)
+    stop_logging()
+    handlers = _build_handlers(log_format or os.getenv('LOG_FORMAT', 'json'), stream, log_dir)
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', DEFAULT_SAMPLE_RATES))
+
+    queue_handler = _QueueHandler(_start_listener(handlers))
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+
+    if not getattr(setup_logging, '_hooks_installed', False):
+        atexit.register(stop_logging)
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+        setup_logging._hooks_installed = True
+
+
+def register_request_logging(app):
+    """Give each request an id (echoed in X-Request-ID) and write a sampled access log line"""
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        # Accept a caller's id (e.g. from the load balancer) only if it is short and printable
+        g.request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_access(response):
+        request_id = g.get('request_id')
+        if request_id is not None:
+            response.headers[REQUEST_ID_HEADER] = request_id
+            level = logging.WARNING if response.status_code >= 500 else logging.INFO
+            if access_logger.isEnabledFor(level):
+                access_logger.log(level, '%s %s %s', request.method, request.path, response.status_code, extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+                })
+        return response
@@ -0,0 +1,370 @@
+"""Prometheus text-format metrics for requests, queries and external calls.
+
+Samples are recorded into per-thread shards so the hot path never takes a
+lock; shards are merged only when the registry is scraped.  Under a
+multi-process server each worker periodically dumps its snapshot into
+``METRICS_MULTIPROC_DIR`` and ``/metrics`` sums every worker's file.
+Workers fold their samples into one shared file of exited workers when
+they are recycled, so the directory does not grow with every restart.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.server_timing import record_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Total HTTP requests by endpoint, method and status'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint and method'),
+    'db_query_duration_seconds': ('histogram', 'SQL statement execution time by statement type'),
+    'db_query_errors_total': ('counter', 'SQL statements that raised an error'),
+    'external_call_duration_seconds': ('histogram', 'Latency of S3 and TMDB calls'),
+    'external_call_errors_total': ('counter', 'S3 and TMDB calls that raised an error'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache name and result'),
+}
+
+
+class _Shard:
+    """Samples recorded by a single thread"""
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """Per-process metric store with lock-free recording"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """Increment a counter"""
+        counters = self._shard().counters
+        key = (name, tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels=(), value=0.0):
+        """Record a histogram observation in seconds"""
+        histograms = self._shard().histograms
+        key = (name, tuple(labels))
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                hist[i] += 1
+                break
+        hist[-2] += value
+        hist[-1] += 1
+
+    def register_collector(self, collector):
+        """Register a callable yielding ``(name, labels, value)`` counter samples at scrape time"""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Merge all shards into a JSON-serializable snapshot"""
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread is not None and not shard.thread.is_alive():
+                    _merge_into(self._retired.counters, self._retired.histograms,
+                                shard.counters.copy(), shard.histograms.copy())
+                else:
+                    live.append(shard)
+            self._shards = live
+            counters = dict(self._retired.counters)
+            histograms = {k: list(v) for k, v in self._retired.histograms.items()}
+            for shard in live:
+                _merge_into(counters, histograms, shard.counters.copy(), shard.histograms.copy())
+
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    key = (name, tuple(labels))
+                    counters[key] = counters.get(key, 0) + value
+            except Exception as e:
+                logger.warning('Metrics collector failed: %s', e)
+
+        return _as_snapshot(self.buckets, counters, histograms)
+
+
+def _as_snapshot(buckets, counters, histograms):
+    return {
+        'buckets': list(buckets),
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), hist] for (name, labels), hist in histograms.items()],
+    }
+
+
+def _merge_into(counters, histograms, new_counters, new_histograms):
+    for key, value in new_counters.items():
+        counters[key] = counters.get(key, 0) + value
+    for key, hist in new_histograms.items():
+        existing = histograms.get(key)
+        if existing is None:
+            histograms[key] = list(hist)
+        else:
+            for i, value in enumerate(hist):
+                existing[i] += value
+
+
+registry = MetricsRegistry()
+
+
+def record_cache(cache_name, hit):
+    """Record a cache lookup so hit rates show up in ``cache_requests_total``"""
+    registry.inc('cache_requests_total', (('cache', cache_name), ('result', 'hit' if hit else 'miss')))
+
+
+def register_lru_cache(cache_name, cached_function):
+    """Expose the hit/miss counts of a ``functools.lru_cache`` wrapped function"""
+    def collect():
+        info = cached_function.cache_info()
+        yield 'cache_requests_total', (('cache', cache_name), ('result', 'hit')), info.hits
+        yield 'cache_requests_total', (('cache', cache_name), ('result', 'miss')), info.misses
+    registry.register_collector(collect)
+
+
+def instrumented(service, operation=None):
+    """Decorator timing calls to an external service such as S3 or TMDB"""
+    def decorator(f):
+        labels = (('service', service), ('operation', operation or f.__name__))
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                registry.inc('external_call_errors_total', labels)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                registry.observe('external_call_duration_seconds', labels, elapsed)
+                record_span(service, elapsed)
+        return decorated_function
+    return decorator
+
+
+def _statement_type(statement):
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return verb if verb in ('SELECT', 'INSERT', 'UPDATE', 'DELETE') else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if starts:
+        registry.observe('db_query_duration_seconds', (('operation', _statement_type(statement)),),
+                         time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('metrics_query_start'):
+        conn.info['metrics_query_start'].pop()
+    statement = exception_context.statement or ''
+    registry.inc('db_query_errors_total', (('operation', _statement_type(statement)),))
+
+
+def _install_engine_listeners():
+    if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def merge_snapshots(snapshots):
+    """Sum several process snapshots into one"""
+    counters = {}
+    histograms = {}
+    buckets = list(DEFAULT_BUCKETS)
+    for snap in snapshots:
+        buckets = snap.get('buckets', buckets)
+        _merge_into(
+            counters, histograms,
+            {(name, tuple(tuple(l) for l in labels)): value for name, labels, value in snap['counters']},
+            {(name, tuple(tuple(l) for l in labels)): hist for name, labels, hist in snap['histograms']}
+        )
+    return buckets, counters, histograms
+
+
+def render_prometheus(snapshots):
+    """Render merged snapshots in the Prometheus text exposition format"""
+    buckets, counters, histograms = merge_snapshots(snapshots)
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        if metric_type == 'counter':
+            for (sample_name, labels), value in sorted(counters.items()):
+                if sample_name == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+        else:
+            for (sample_name, labels), hist in sorted(histograms.items()):
+                if sample_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, hist):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_number(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {hist[-1]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(float(hist[-2]))}')
+                lines.append(f'{name}_count{_format_labels(labels)} {hist[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+class _MultiprocessWriter:
+    """Periodically dumps this process's snapshot for other workers to read"""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'metrics_{os.getpid()}.json')
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush < self.interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            self.flush()
+        finally:
+            self._lock.release()
+
+    @property
+    def retired_path(self):
+        return os.path.join(self.directory, 'metrics_retired.json')
+
+    def flush(self):
+        self._write(self.path, registry.snapshot())
+
+    def retire(self):
+        """Fold this process's samples into the exited workers' file and remove its own file"""
+        import fcntl  # Unix only, like the pre-fork server that calls this
+
+        with open(os.path.join(self.directory, 'metrics_retired.lock'), 'w') as lock:
+            # Workers recycled at the same time must not overwrite each other's totals
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            snapshots = [registry.snapshot()]
+            try:
+                with open(self.retired_path) as f:
+                    snapshots.append(json.load(f))
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logger.warning('Discarding unreadable metrics file %s: %s', self.retired_path, e)
+            self._write(self.retired_path, _as_snapshot(*merge_snapshots(snapshots)))
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, path, snapshot):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning('Skipping unreadable metrics file %s: %s', path, e)
+        return snapshots
+
+
+def register_metrics(app):
+    """Register request timing hooks, query listeners and the /metrics endpoint"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    _install_engine_listeners()
+
+    writer = None
+    multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        writer = _MultiprocessWriter(multiproc_dir, app.config.get('METRICS_FLUSH_INTERVAL', 5))
+        app.extensions['metrics_writer'] = writer  # Retired by exiting server workers
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            registry.observe('http_request_duration_seconds',
+                             (('endpoint', endpoint), ('method', request.method)),
+                             time.perf_counter() - start)
+            registry.inc('http_requests_total',
+                         (('endpoint', endpoint), ('method', request.method), ('status', str(response.status_code))))
+        if writer is not None:
+            writer.maybe_flush()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        snapshots = writer.collect() if writer is not None else [registry.snapshot()]
+        return Response(render_prometheus(snapshots), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,159 @@
+"""Per-request SQL statement budgets and repeated-statement (N+1) detection.
+
+Enabled with ``QUERY_BUDGET_MODE`` set to ``log`` or ``raise``; when it is
+``off`` no engine listener is installed at all.  Routes declare their budget
+with the ``query_budget`` decorator.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_current_tracker = ContextVar('query_tracker', default=None)
+
+_WHITESPACE = re.compile(r'\s+')
+_PARAM_LIST = re.compile(r'\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in ``raise`` mode when a request exceeds its query budget or repeats a statement"""
+
+
+def statement_shape(statement):
+    """Normalize a SQL statement so executions differing only in parameters compare equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _PARAM_LIST.sub('(?)', shape)
+    return _NUMBER.sub('N', shape)
+
+
+class QueryTracker:
+    """Collects the statements executed while it is active, forwarding them to an enclosing tracker"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.shapes = Counter()
+
+    def record(self, statement):
+        self.count += 1
+        self.shapes[statement_shape(statement)] += 1
+        if self.parent is not None:
+            self.parent.record(statement)
+
+    def repeated(self, threshold):
+        """Return ``(shape, count)`` pairs executed at least ``threshold`` times"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement)
+
+
+def _install_engine_listener():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    """Count the SQL statements executed inside the block"""
+    _install_engine_listener()
+    tracker = QueryTracker(parent=_current_tracker.get())
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+@contextmanager
+def untracked():
+    """Leave the statements executed inside the block out of every budget.
+
+    For per-process upkeep that a request happens to trigger but does not
+    own, such as refreshing a shared in-memory index.
+    """
+    token = _current_tracker.set(None)
+    try:
+        yield
+    finally:
+        _current_tracker.reset(token)
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a route may execute"""
+    def decorator(f):
+        # Stored as a function attribute; functools.wraps in outer decorators carries it along
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+def check_budget(tracker, budget, repeat_threshold, label):
+    """Return a list of human readable budget violations"""
+    problems = []
+    if budget is not None and tracker.count > budget:
+        problems.append(f"{label} executed {tracker.count} queries (budget {budget})")
+    for shape, count in tracker.repeated(repeat_threshold):
+        problems.append(f"{label} repeated a statement {count} times (possible N+1): {shape[:200]}")
+    return problems
+
+
+def register_query_budget(app):
+    """Count statements per request and enforce declared budgets"""
+    mode = app.config.get('QUERY_BUDGET_MODE', 'off')
+    if mode == 'off':
+        return
+    if mode not in ('log', 'raise'):
+        raise ValueError(f"Invalid QUERY_BUDGET_MODE: {mode}")
+
+    _install_engine_listener()
+
+    @app.before_request
+    def start_query_tracking():
+        tracker = QueryTracker(parent=_current_tracker.get())
+        request.environ['query_budget.tracker'] = tracker
+        request.environ['query_budget.token'] = _current_tracker.set(tracker)
+
+    @app.after_request
+    def enforce_query_budget(response):
+        tracker = request.environ.get('query_budget.tracker')
+        if tracker is None:
+            return response
+
+        response.headers['X-Query-Count'] = str(tracker.count)
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', current_app.config.get('QUERY_BUDGET_DEFAULT'))
+        problems = check_budget(
+            tracker,
+            budget,
+            current_app.config.get('QUERY_BUDGET_REPEAT_THRESHOLD', 5),
+            f"{request.method} {request.endpoint}"
+        )
+        if problems:
+            if current_app.config.get('QUERY_BUDGET_MODE') == 'raise':
+                raise QueryBudgetExceeded('; '.join(problems))
+            for problem in problems:
+                logger.warning(problem)
+        return response
+
+    @app.teardown_request
+    def stop_query_tracking(exc):
+        token = request.environ.pop('query_budget.token', None)
+        if token is not None:
+            try:
+                _current_tracker.reset(token)
+            except ValueError:
+                # Teardown ran in a different context than before_request
+                _current_tracker.set(None)
@@ -0,0 +1,64 @@
+"""Bring tables created by an older release up to the current models.
+
+``db.create_all`` only creates tables that do not exist, so ``flask init-db``
+follows it with ``upgrade_schema``: columns missing from an existing table
+are added (rows already there get the column's default), and indexes are
+created when missing or recreated when their uniqueness changed.  Nothing is
+ever dropped from a table, and running it again changes nothing.
+"""
+import logging
+
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _column_ddl(column, dialect):
+    quote = dialect.identifier_preparer.quote
+    ddl = f'{quote(column.name)} {column.type.compile(dialect=dialect)}'
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = literal(default.arg, column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        ddl += f' DEFAULT {value}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f' REFERENCES {quote(target.table.name)} ({quote(target.name)})'
+    return ddl
+
+
+def upgrade_schema(db):
+    """Add the columns and indexes existing tables are missing; returns one line per change"""
+    changes = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                connection.execute(text(
+                    f'ALTER TABLE {connection.dialect.identifier_preparer.quote(table.name)} '
+                    f'ADD COLUMN {_column_ddl(column, connection.dialect)}'
+                ))
+                changes.append(f'Added column {table.name}.{column.name}')
+
+            indexes = {index['name']: index for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                found = indexes.get(index.name)
+                if found is not None and bool(found['unique']) == bool(index.unique):
+                    continue
+                if found is not None:
+                    connection.execute(DropIndex(index))
+                connection.execute(CreateIndex(index))
+                changes.append(f'{"Recreated" if found is not None else "Created"} index {index.name}')
+
+    for change in changes:
+        logger.info('Schema upgrade: %s', change)
+    return changes
@@ -0,0 +1,89 @@
+"""Pre-fork production server for ``python run.py serve``.
+
+The app is created once in the master process and the workers are forked
+from it, so imported modules, the static asset manifest (built by
+``prepare_master`` before the fork) and other read-only state are shared
+copy-on-write.  Anything that holds a socket, a thread or
+a client is per process: database pools inherited from the master are
+discarded in ``post_fork``, and service singletons (``s3_service`` and the
+other ``LazyService`` instances) and the background engines notice the new
+pid and rebuild themselves on first use.
+
+Workers are recycled after SERVER_MAX_REQUESTS requests.  ``kill -HUP`` on
+the master starts fresh workers and retires the old ones once their
+requests finish; as the app is preloaded, picking up new code takes
+``kill -USR2`` (a new master) followed by ``kill -TERM`` of the old one.
+"""
+import logging
+
+from gunicorn.app.base import BaseApplication
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def server_options(config):
+    """Gunicorn settings from the app config"""
+    return {
+        'bind': config['SERVER_BIND'],
+        'workers': config['SERVER_WORKERS'],
+        'threads': config['SERVER_THREADS'],
+        'worker_class': 'gthread' if config['SERVER_THREADS'] > 1 else 'sync',
+        'max_requests': config['SERVER_MAX_REQUESTS'],
+        'max_requests_jitter': config['SERVER_MAX_REQUESTS_JITTER'],
+        'timeout': config['SERVER_TIMEOUT'],
+        'graceful_timeout': config['SERVER_GRACEFUL_TIMEOUT'],
+        'keepalive': config['SERVER_KEEPALIVE'],
+        'preload_app': True,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }
+
+
+def post_fork(server, worker):
+    """Drop the connections the worker inherited from the master"""
+    app = server.app.application
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the master still owns those sockets, the worker just forgets them
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Fold the worker's metrics into the exited workers' totals before it is recycled"""
+    writer = server.app.application.extensions.get('metrics_writer')
+    if writer is not None:
+        try:
+            writer.retire()
+        except OSError:
+            logger.exception('Final metrics flush failed')
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving an already created Flask app"""
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options if options is not None else server_options(application.config)
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def prepare_master(app):
+    """Build the read-only state workers share before they are forked"""
+    manifest = app.extensions.get('static_assets')
+    if manifest is not None and manifest.assets is None:
+        manifest.build()
+
+
+def serve(app):
+    """Run the app under gunicorn until the master is stopped"""
+    prepare_master(app)
+    Server(app).run()
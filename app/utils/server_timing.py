@@ -0,0 +1,109 @@
+"""Per-request time spent in the database, S3 and TMDB, sent as a ``Server-Timing`` header.
+
+Enabled with ``SERVER_TIMING_ENABLED``.  Spans are summed per name for the
+request being handled; browsers show them in the network panel next to
+the response, e.g. ``db;dur=12.1;desc="4 queries", tmdb;dur=240.3,
+total;dur=260.0``.  Requests slower than ``SERVER_TIMING_SLOW_MS`` are also
+logged with their breakdown.
+
+When disabled no engine listener is installed and ``record_span`` (called
+by ``metrics.instrumented``) is a single context variable lookup.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_current_spans = ContextVar('server_timing_spans', default=None)
+
+
+def record_span(name, seconds):
+    """Add ``seconds`` to the named span of the current request, if timing is on"""
+    spans = _current_spans.get()
+    if spans is not None:
+        span = spans.get(name)
+        if span is None:
+            spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_spans.get() is not None:
+        conn.info.setdefault('server_timing_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('server_timing_start')
+    if starts:
+        record_span('db', time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('server_timing_start'):
+        conn.info['server_timing_start'].pop()
+
+
+def _install_engine_listeners():
+    if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+
+
+def format_header(spans, total):
+    """Render spans (name -> [seconds, count]) and the total as a Server-Timing value"""
+    parts = []
+    for name, (seconds, count) in sorted(spans.items()):
+        unit = 'queries' if name == 'db' else 'calls'
+        parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count} {unit}"')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def register_server_timing(app):
+    """Collect spans per request and add the Server-Timing header"""
+    if not app.config.get('SERVER_TIMING_ENABLED'):
+        return
+
+    _install_engine_listeners()
+
+    @app.before_request
+    def start_server_timing():
+        request.environ['server_timing.start'] = time.perf_counter()
+        request.environ['server_timing.token'] = _current_spans.set({})
+
+    @app.after_request
+    def add_server_timing(response):
+        start = request.environ.get('server_timing.start')
+        spans = _current_spans.get()
+        if start is None or spans is None:
+            return response
+
+        total = time.perf_counter() - start
+        response.headers['Server-Timing'] = format_header(spans, total)
+
+        slow_ms = current_app.config.get('SERVER_TIMING_SLOW_MS')
+        if slow_ms and total * 1000 >= slow_ms:
+            logger.warning('Slow request %s %s: %s', request.method, request.path, response.headers['Server-Timing'],
+                           extra={'duration_ms': round(total * 1000, 1),
+                                  'spans': {name: round(seconds * 1000, 1) for name, (seconds, _) in spans.items()}})
+        return response
+
+    @app.teardown_request
+    def stop_server_timing(exc):
+        token = request.environ.pop('server_timing.token', None)
+        if token is not None:
+            try:
+                _current_spans.reset(token)
+            except ValueError:
+                # Teardown ran in a different context than before_request
+                _current_spans.set(None)
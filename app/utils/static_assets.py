@@ -0,0 +1,135 @@
+"""Fingerprinted, precompressed frontend assets served from memory.
+
+The bundled ``frontend/`` directory is read once: ``app.js``, ``api.js`` and
+``styles.css`` get content-hashed names (``app.3f2a9c1d0b4e.js``) that are
+cached forever, ``index.html`` is rewritten to reference them, and gzip and
+brotli variants of every compressible file are generated up front.  Requests
+are then answered from the in-memory manifest without touching the disk.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, abort, request
+
+from app.utils.compression import available_encodings, choose_encoding, compress
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINTED_ASSETS = ('app.js', 'api.js', 'styles.css')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+MIN_COMPRESS_SIZE = 256
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class StaticAsset:
+    """One file with its precompressed representations"""
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body}
+        if len(body) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+            for coding in available_encodings():
+                if coding == 'identity':
+                    continue
+                compressed = compress(body, coding)
+                if len(compressed) < len(body):
+                    self.variants[coding] = compressed
+
+    def to_response(self):
+        """Build a response for the current request, honouring Accept-Encoding and If-None-Match"""
+        coding = choose_encoding(request.headers.get('Accept-Encoding'), self.variants)
+        response = Response(self.variants[coding], mimetype=self.mimetype)
+        if coding != 'identity':
+            response.headers['Content-Encoding'] = coding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = self.cache_control
+        response.set_etag(f'{self.etag}-{coding}')
+        return response.make_conditional(request)
+
+
+class StaticAssetManifest:
+    """In-memory map of URL path to ``StaticAsset``, built once per process"""
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = None
+        self.fingerprints = {}
+        self._lock = threading.Lock()
+
+    def _read(self, relative_path):
+        with open(os.path.join(self.root, relative_path), 'rb') as f:
+            return f.read()
+
+    def _mimetype(self, path):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype = f'{mimetype}; charset=utf-8'
+        return mimetype
+
+    def build(self):
+        """Hash, rewrite and compress the frontend files"""
+        assets = {}
+        fingerprints = {}
+        for name in FINGERPRINTED_ASSETS:
+            if not os.path.exists(os.path.join(self.root, name)):
+                continue
+            body = self._read(name)
+            stem, ext = os.path.splitext(name)
+            hashed_name = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+            assets[hashed_name] = StaticAsset(body, self._mimetype(name), IMMUTABLE_CACHE_CONTROL)
+            fingerprints[name] = hashed_name
+
+        # Everything else, including the unhashed names for old cached HTML
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                relative = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, '/')
+                if relative != 'index.html':
+                    assets[relative] = StaticAsset(self._read(relative), self._mimetype(relative),
+                                                   REVALIDATE_CACHE_CONTROL)
+
+        index = self._read('index.html').decode('utf-8')
+        for name, hashed_name in fingerprints.items():
+            index = re.sub(r'(src|href)="/?%s"' % re.escape(name), r'\1="/%s"' % hashed_name, index)
+        assets['index.html'] = StaticAsset(index.encode('utf-8'), 'text/html; charset=utf-8', REVALIDATE_CACHE_CONTROL)
+
+        self.assets = assets
+        self.fingerprints = fingerprints
+        logger.info('Built static asset manifest: %s files, fingerprints %s', len(assets), fingerprints)
+        return self
+
+    def get(self, path):
+        """Return the asset for a URL path, building the manifest on first use"""
+        if self.assets is None:
+            with self._lock:
+                if self.assets is None:
+                    self.build()
+        return self.assets.get(path)
+
+
+def register_static_assets(app, root):
+    """Serve the frontend from a precompressed in-memory manifest"""
+    manifest = StaticAssetManifest(root)
+    app.extensions['static_assets'] = manifest
+    if app.config.get('STATIC_ASSETS_BUILD_ON_STARTUP'):
+        manifest.build()
+
+    @app.route('/')
+    def serve_index():
+        return manifest.get('index.html').to_response()
+
+    @app.route('/<path:path>')
+    def serve_static(path):
+        asset = manifest.get(path)
+        if asset is None:
+            if path.startswith('api/'):
+                abort(404)
+            # Client-side routes fall back to the single page app
+            asset = manifest.get('index.html')
+        return asset.to_response()
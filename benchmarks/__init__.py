@@ -0,0 +1,12 @@
+"""Load and benchmark suite for the Blixx API.
+
+Run ``python -m benchmarks.run_benchmark --help`` for options.
+"""
+
+
+def install_fakes(s3_service, tmdb_service):
+    """Point the route modules at in-process S3/TMDB stand-ins"""
+    from app import services
+
+    services.s3_service.override(s3_service)
+    services.tmdb_service.override(tmdb_service)
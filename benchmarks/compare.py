@@ -0,0 +1,52 @@
+"""Compare two benchmark result files.
+
+Usage::
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import json
+import sys
+
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return ''
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def compare(before, after, metric='p95'):
+    """Return printable rows comparing latency, throughput and query counts per scenario"""
+    rows = [f"{'scenario':<24}{metric + ' before':>12}{metric + ' after':>12}{'change':>9}"
+            f"{'rps change':>12}{'queries':>14}"]
+    for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        old = before['endpoints'].get(name)
+        new = after['endpoints'].get(name)
+        if old is None or new is None:
+            rows.append(f"{name:<24}{'only in ' + ('after' if old is None else 'before'):>24}")
+            continue
+        old_latency = old['latency_ms'][metric]
+        new_latency = new['latency_ms'][metric]
+        queries = f"{old['queries_per_request']} -> {new['queries_per_request']}"
+        rows.append(f"{name:<24}{old_latency:>12}{new_latency:>12}{_change(old_latency, new_latency):>9}"
+                    f"{_change(old['throughput_rps'], new['throughput_rps']):>12}{queries:>14}")
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print(__doc__)
+        return 2
+    with open(argv[0]) as f:
+        before = json.load(f)
+    with open(argv[1]) as f:
+        after = json.load(f)
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    for metric in ('p50', 'p95', 'p99'):
+        print()
+        print('\n'.join(compare(before, after, metric)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
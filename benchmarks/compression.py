@@ -0,0 +1,58 @@
+"""Compare response size and latency with and without response compression.
+
+Runs the large-payload scenarios once per Accept-Encoding against the same
+seeded database and prints wire bytes next to latency::
+
+    python -m benchmarks.compression --movies 20000 --watch-rows 100000 --requests 200
+
+Extra arguments are passed through to ``benchmarks.run_benchmark``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks import run_benchmark
+
+DEFAULT_SCENARIOS = 'movies.list_large,movies.list,stream.history,movies.tmdb_search,users.my_movies'
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the bytes/latency trade-off of response compression')
+    parser.add_argument('--encodings', default=','.join(ENCODINGS))
+    parser.add_argument('--scenarios', default=DEFAULT_SCENARIOS)
+    parser.add_argument('--output', default=None, help='Optional JSON output path')
+    args, passthrough = parser.parse_known_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, encoding in enumerate(args.encodings.split(',')):
+            path = os.path.join(tmp, f'{encoding}.json')
+            run_args = passthrough + ['--scenarios', args.scenarios, '--accept-encoding', encoding, '--output', path]
+            if index:
+                run_args.append('--reuse-db')
+            run_benchmark.main(run_args)
+            with open(path) as f:
+                results[encoding] = json.load(f)['endpoints']
+
+    baseline = next(iter(results.values()))
+    print(f"\n{'scenario':<24}{'encoding':>10}{'wire_bytes':>12}{'ratio':>8}{'p50':>9}{'p95':>9}{'rps':>9}")
+    for name in args.scenarios.split(','):
+        for encoding, endpoints in results.items():
+            row = endpoints[name]
+            base_bytes = baseline[name]['wire_bytes_mean'] or 1
+            print(f"{name:<24}{encoding:>10}{row['wire_bytes_mean']:>12}{row['wire_bytes_mean'] / base_bytes:>8.2f}"
+                  f"{row['latency_ms']['p50']:>9}{row['latency_ms']['p95']:>9}{row['throughput_rps']:>9}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Wrote {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
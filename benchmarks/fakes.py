@@ -0,0 +1,118 @@
+"""In-process stand-ins for S3Service and TMDBService with configurable latency"""
+import random
+import time
+
+
+class _Latency:
+    """Sleeps for a fixed latency plus uniform jitter, in milliseconds"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+
+    def wait(self):
+        delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+class FakeS3Service:
+    """Mimics S3Service without network access"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        self.bucket_name = 'benchmark-bucket'
+        self.objects = {}
+        self._latency = _Latency(latency_ms, jitter_ms, seed)
+
+    def upload_movie(self, file_obj, key, content_type='video/mp4', metadata=None, part_size=None):
+        """Drain the upload so request parsing costs stay realistic"""
+        size = 0
+        while True:
+            chunk = file_obj.read(1024 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+        self._latency.wait()
+        self.objects[key] = size
+        return True
+
+    def generate_presigned_url(self, key, expiration=3600):
+        self._latency.wait()
+        return f'https://{self.bucket_name}.s3.amazonaws.com/{key}?X-Amz-Expires={expiration}&X-Amz-Signature=fake'
+
+    def delete_movie(self, key):
+        self._latency.wait()
+        self.objects.pop(key, None)
+        return True
+
+    def get_object_checksum(self, key):
+        # Nothing to compare against, as for a bucket without additional checksums
+        self._latency.wait()
+        return None
+
+    def get_object_size(self, key):
+        self._latency.wait()
+        return self.objects.get(key, 0)
+
+    def iter_objects(self, prefix='', page_size=1000):
+        keys = sorted(k for k in self.objects if k.startswith(prefix))
+        for i, key in enumerate(keys):
+            if i % page_size == 0:
+                self._latency.wait()
+            yield key, self.objects[key], None
+
+    def delete_objects(self, keys):
+        self._latency.wait()
+        for key in keys:
+            self.objects.pop(key, None)
+        return list(keys), {}
+
+
+class FakeTMDBService:
+    """Mimics TMDBService with deterministic canned results"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None, results_per_page=20):
+        self.results_per_page = results_per_page
+        self._latency = _Latency(latency_ms, jitter_ms, seed)
+
+    def _movie(self, tmdb_id, title):
+        return {
+            'tmdb_id': tmdb_id,
+            'title': title,
+            'description': f'Synthetic overview for {title}',
+            'release_date': '2020-01-01',
+            'rating': round((tmdb_id % 100) / 10.0, 1),
+            'poster_url': f'https://image.tmdb.org/t/p/w500/poster{tmdb_id}.jpg',
+            'backdrop_url': f'https://image.tmdb.org/t/p/w1280/backdrop{tmdb_id}.jpg',
+            'genre_ids': [28 + tmdb_id % 5]
+        }
+
+    def _page(self, prefix, page):
+        start = (page - 1) * self.results_per_page
+        return {
+            'total_results': self.results_per_page * 10,
+            'total_pages': 10,
+            'current_page': page,
+            'results': [self._movie(start + i + 1, f'{prefix} {start + i + 1}') for i in range(self.results_per_page)]
+        }
+
+    def get_movie_details(self, tmdb_id):
+        self._latency.wait()
+        return self._movie(int(tmdb_id), f'TMDB movie {tmdb_id}')
+
+    def search_movies(self, query, page=1):
+        self._latency.wait()
+        return self._page(query, page)
+
+    def get_trending_movies(self, time_window='week', page=1):
+        self._latency.wait()
+        return self._page(f'Trending {time_window}', page)
+
+    def get_movies_by_genre(self, genre_id, page=1):
+        self._latency.wait()
+        return self._page(f'Genre {genre_id}', page)
+
+    def get_genres(self):
+        self._latency.wait()
+        return [{'id': 28 + i, 'name': name} for i, name in enumerate(['Action', 'Adventure', 'Animation', 'Comedy', 'Crime'])]
@@ -0,0 +1,152 @@
+"""Measure the per-request cost of application logging.
+
+Sends the same in-process requests (Flask test client, in-memory SQLite)
+under each logging setup and reports the mean time per request and the
+overhead over running with logging off::
+
+    python -m benchmarks.logging_overhead --requests 5000 --output benchmarks/results/logging.json
+
+Setups:
+
+``off``       root level WARNING, nothing is logged
+``sync``      the former configuration: text lines written by a StreamHandler
+              and a RotatingFileHandler in the request thread
+``queued``    ``setup_logging``: JSON lines written by the queue listener thread
+``sampled``   as ``queued`` with the access log sampled at ``--sample-rate``
+
+Every request writes one access log line and one application INFO line
+(before sampling).  Each setup runs twice: with the console going to
+/dev/null, and with every console write blocking for ``--sink-latency-ms``
+as it does when stdout is a full pipe or a slow log collector.  This
+benchmark keeps one CPU busy, so the listener thread's serialization
+competes with the requests; in a server it overlaps time the request
+threads spend waiting on the database and network.
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmark import git_commit
+
+SETUPS = ('off', 'sync', 'queued', 'sampled')
+app_logger = logging.getLogger('benchmarks.logging_overhead')
+
+
+class SlowStream:
+    """Console stream whose writes block like a congested pipe (sleeping releases the GIL, as real I/O does)"""
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data):
+        time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def configure(setup, log_dir, stream, sample_rate):
+    from app.utils.logger_config import setup_logging, stop_logging
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    if setup == 'off':
+        root.setLevel(logging.WARNING)
+    elif setup == 'sync':
+        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s - %(filename)s:%(lineno)d - %(funcName)s: %(message)s')
+        console = logging.StreamHandler(stream)
+        console.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+        file_handler = logging.handlers.RotatingFileHandler(os.path.join(log_dir, 'sync.log'), maxBytes=10485760, backupCount=5)
+        file_handler.setFormatter(formatter)
+        root.addHandler(console)
+        root.addHandler(file_handler)
+        root.setLevel(logging.INFO)
+    else:
+        rate = sample_rate if setup == 'sampled' else 1.0
+        setup_logging(sample_rates={'app.access': rate}, stream=stream, log_dir=log_dir)
+        logging.getLogger().setLevel(logging.INFO)
+
+
+def measure(app, setup, requests, log_dir, sample_rate, sink_latency):
+    from app.utils.logger_config import stop_logging
+
+    client = app.test_client()
+    with open(os.devnull, 'w') as devnull:
+        stream = SlowStream(devnull, sink_latency) if sink_latency else devnull
+        configure(setup, log_dir, stream, sample_rate)
+        path = f'/bench/logging/{setup}'
+        for _ in range(min(200, requests)):
+            client.get(path)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get(path)
+            timings.append(time.perf_counter() - start)
+        # Time to drain what the listener still holds, paid outside the requests
+        drain_start = time.perf_counter()
+        stop_logging()
+        drain_ms = (time.perf_counter() - drain_start) * 1000
+    return {
+        'mean_us': round(statistics.mean(timings) * 1e6, 1),
+        'p50_us': round(statistics.median(timings) * 1e6, 1),
+        'p99_us': round(sorted(timings)[int(len(timings) * 0.99) - 1] * 1e6, 1),
+        'drain_ms': round(drain_ms, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure per-request logging overhead')
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--setups', default=','.join(SETUPS))
+    parser.add_argument('--sample-rate', type=float, default=0.1)
+    parser.add_argument('--sink-latency-ms', type=float, default=0.5)
+    parser.add_argument('--output', default=None, help='Optional JSON output path')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('BENCHMARK_DATABASE_URL', 'sqlite://')
+    os.environ.setdefault('METRICS_MULTIPROC_DIR', '')
+    from app import create_app
+    app = create_app('benchmark')
+
+    @app.route('/bench/logging/<setup>')
+    def logged_view(setup):
+        app_logger.info('Handled benchmark request %s for %s', setup, 'user')
+        return {'ok': True}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        for sink_latency_ms in sorted({0.0, args.sink_latency_ms}):
+            for setup in args.setups.split(','):
+                results[f'{setup}@{sink_latency_ms:g}ms'] = measure(
+                    app, setup, args.requests, log_dir, args.sample_rate, sink_latency_ms / 1000)
+
+    print(f"{'setup@sink_latency':<22}{'mean_us':>10}{'p50_us':>10}{'p99_us':>10}{'overhead_us':>13}{'drain_ms':>10}")
+    for name, row in results.items():
+        baseline = results.get(f"off@{name.split('@')[1]}", {}).get('mean_us')
+        row['overhead_us'] = round(row['mean_us'] - baseline, 1) if baseline is not None else None
+        print(f"{name:<22}{row['mean_us']:>10}{row['p50_us']:>10}{row['p99_us']:>10}"
+              f"{str(row['overhead_us']):>13}{row['drain_ms']:>10}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'meta': {'commit': git_commit(), 'requests': args.requests, 'sample_rate': args.sample_rate,
+                                'python': sys.version.split()[0]},
+                       'setups': results}, f, indent=2)
+        print(f'Wrote {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""Drive every blueprint endpoint concurrently against a seeded database.
+
+Example::
+
+    python -m benchmarks.run_benchmark --movies 100000 --watch-rows 1000000 \\
+        --concurrency 16 --requests 500 --output benchmarks/results/run.json
+
+S3 and TMDB are replaced with in-process fakes (see ``benchmarks.fakes``) so
+results only depend on this code base, the database and the configured
+fake latencies.  Compare two runs with ``python -m benchmarks.compare``.
+"""
+import argparse
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+DEFAULT_DATABASE = os.path.join('benchmarks', 'results', 'benchmark.db')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, wall_time, setup_errors=0):
+    """Reduce raw ``(latency_s, status, queries, bytes, wire_bytes)`` samples to report figures.
+
+    ``setup_errors`` counts requests skipped because their untimed setup failed.
+    """
+    latencies = sorted(s[0] * 1000 for s in samples)
+    queries = [s[2] for s in samples if s[2] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if s[1] is None or s[1] >= 500),
+        'setup_errors': setup_errors,
+        'status_counts': {str(k): v for k, v in sorted(_count(s[1] for s in samples).items(), key=lambda kv: str(kv[0]))},
+        'throughput_rps': round(len(samples) / wall_time, 2) if wall_time else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': _round(percentile(latencies, 50)),
+            'p95': _round(percentile(latencies, 95)),
+            'p99': _round(percentile(latencies, 99)),
+            'max': _round(latencies[-1] if latencies else None)
+        },
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'response_bytes_mean': round(sum(s[3] for s in samples) / len(samples)) if samples else None,
+        'wire_bytes_mean': round(sum(s[4] for s in samples) / len(samples)) if samples else None
+    }
+
+
+def _count(values):
+    counts = defaultdict(int)
+    for value in values:
+        counts[value] += 1
+    return counts
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def decode_body(data, content_encoding):
+    """Undo a gzip or br Content-Encoding (the client decodes too, so this is timed)"""
+    if content_encoding == 'gzip':
+        return gzip.decompress(data)
+    if content_encoding == 'br':
+        import brotli
+        return brotli.decompress(data)
+    return data
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkClient:
+    """Holds per-thread HTTP sessions and the logged-in user pool"""
+
+    def __init__(self, base_url, users, movies, accept_encoding=None):
+        self.base_url = base_url
+        self.accept_encoding = accept_encoding
+        self.users = users
+        self.movies = movies
+        self.tokens = {}
+        self._local = threading.local()
+        self._register_counter = itertools.count()
+        self._assign = itertools.count()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            # Bodies are read raw in run_scenarios so wire bytes can be counted
+            session.stream = True
+            if self.accept_encoding is not None:
+                session.headers['Accept-Encoding'] = self.accept_encoding
+            self._local.user_id = next(self._assign) % len(self.tokens) + 1
+            self._local.rng = random.Random(self._local.user_id)
+        return session
+
+    @property
+    def user_id(self):
+        self.session
+        return self._local.user_id
+
+    @property
+    def rng(self):
+        self.session
+        return self._local.rng
+
+    def auth(self, kind='access'):
+        return {'Authorization': f"Bearer {self.tokens[self.user_id][kind]}"}
+
+    def login_pool(self, pool_size, password):
+        for user_id in range(1, pool_size + 1):
+            response = requests.post(f'{self.base_url}/api/auth/login',
+                                     json={'username': f'bench_{user_id}', 'password': password})
+            response.raise_for_status()
+            data = response.json()
+            self.tokens[user_id] = {'access': data['access_token'], 'refresh': data['refresh_token']}
+
+    def random_movie_id(self):
+        return self.rng.randint(1, self.movies)
+
+    def owned_movie_id(self):
+        # Seeded movie m is uploaded by user (m - 1) % users + 1
+        return self.user_id
+
+    def owned_movie_ids(self, count):
+        return [movie_id for movie_id in range(self.user_id, self.movies + 1, self.users)][:count]
+
+    def upload(self):
+        return self.session.post(
+            f'{self.base_url}/api/movies/upload',
+            headers=self.auth(),
+            data={'title': 'Benchmark upload', 'genre': 'Drama', 'is_public': 'true'},
+            files={'file': ('bench.mp4', io.BytesIO(b'\0' * 64 * 1024), 'video/mp4')}
+        )
+
+
+def build_scenarios(client, password):
+    """Map scenario name to a callable issuing one request and returning the response.
+
+    A scenario may instead be a ``(setup, call)`` pair; ``setup`` runs untimed
+    and its result is passed to ``call``.  A setup that raises skips that
+    request and is counted as a setup error.
+    """
+    base = client.base_url
+
+    def get(path, authed=False):
+        return lambda: client.session.get(base + path(), headers=client.auth() if authed else None)
+
+    def register():
+        n = next(client._register_counter)
+        return client.session.post(f'{base}/api/auth/register', json={
+            'username': f'bench_new_{os.getpid()}_{n}',
+            'email': f'bench_new_{os.getpid()}_{n}@example.com',
+            'password': password
+        })
+
+    def upload_for_delete():
+        response = client.upload()
+        response.raise_for_status()
+        return response.json()['movie']['id']
+
+    def delete_uploaded(movie_id):
+        return client.session.delete(f'{base}/api/movies/{movie_id}', headers=client.auth())
+
+    return {
+        'auth.register': register,
+        'auth.login': lambda: client.session.post(f'{base}/api/auth/login', json={
+            'username': f'bench_{client.user_id}', 'password': password}),
+        'auth.refresh': lambda: client.session.post(f'{base}/api/auth/refresh', headers=client.auth('refresh')),
+        'auth.verify': get(lambda: '/api/auth/verify', authed=True),
+        'movies.upload': client.upload,
+        'movies.get': get(lambda: f'/api/movies/{client.random_movie_id()}'),
+        'movies.batch': get(lambda: '/api/movies/batch?ids=' + ','.join(
+            str(client.random_movie_id()) for _ in range(20))),
+        'movies.list': get(lambda: f'/api/movies?page={client.rng.randint(1, 50)}&per_page=20'),
+        'movies.list_large': get(lambda: '/api/movies?page=1&per_page=500'),
+        'movies.list_filtered': get(lambda: f"/api/movies?genre={client.rng.choice(['drama', 'comedy', 'sci-fi'])}"
+                                            f"&year={client.rng.randint(1970, 2024)}&min_rating=5"),
+        'movies.featured': get(lambda: '/api/movies/featured'),
+        'movies.similar': get(lambda: f'/api/movies/{client.random_movie_id()}/similar'),
+        'movies.trending': get(lambda: '/api/movies/trending'),
+        'movies.search': get(lambda: f"/api/movies/search?q={client.rng.choice(['night', 'storm', 'echo'])}"),
+        'movies.tmdb_search': get(lambda: '/api/movies/tmdb/search?q=matrix'),
+        'movies.tmdb_trending': get(lambda: '/api/movies/tmdb/trending'),
+        'movies.update': lambda: client.session.put(f'{base}/api/movies/{client.owned_movie_id()}',
+                                                    headers=client.auth(),
+                                                    json={'description': f'updated {time.time()}'}),
+        'movies.delete': (upload_for_delete, delete_uploaded),
+        'movies.bulk_update': lambda: client.session.post(f'{base}/api/movies/bulk/update', headers=client.auth(),
+                                                          json={'ids': client.owned_movie_ids(50),
+                                                                'changes': {'genre': client.rng.choice(['Drama', 'Comedy'])}}),
+        'stream.url': get(lambda: f'/api/stream/{client.random_movie_id()}/url', authed=True),
+        'stream.watch': lambda: client.session.post(f'{base}/api/stream/{client.random_movie_id()}/watch',
+                                                    headers=client.auth(),
+                                                    json={'watch_time': client.rng.randint(0, 7200), 'total_duration': 7200}),
+        'stream.watch_batch': lambda: client.session.post(f'{base}/api/stream/watch/batch',
+                                                          headers=client.auth(),
+                                                          json={'updates': [
+                                                              {'movie_id': client.random_movie_id(),
+                                                               'watch_time': client.rng.randint(0, 7200),
+                                                               'total_duration': 7200}
+                                                              for _ in range(20)
+                                                          ]}),
+        'stream.history': get(lambda: '/api/stream/history', authed=True),
+        'users.me': get(lambda: '/api/users/me', authed=True),
+        'users.update_me': lambda: client.session.put(f'{base}/api/users/me', headers=client.auth(),
+                                                      json={'first_name': 'Bench'}),
+        'users.my_movies': get(lambda: '/api/users/me/movies', authed=True),
+        'users.movie_stats': get(lambda: '/api/users/me/movies/stats', authed=True),
+        'users.continue_watching': get(lambda: '/api/users/me/continue-watching', authed=True),
+        'users.recommendations': get(lambda: '/api/users/me/recommendations', authed=True),
+        'users.profile': get(lambda: f'/api/users/{client.rng.randint(1, client.users)}'),
+        'users.public_movies': get(lambda: f'/api/users/{client.rng.randint(1, client.users)}/movies'),
+    }
+
+
+def run_scenarios(scenarios, names, requests_per_scenario, concurrency, seed):
+    """Execute the scenarios interleaved across a thread pool; returns (samples, setup_errors, wall_time)"""
+    tasks = [name for name in names for _ in range(requests_per_scenario)]
+    random.Random(seed).shuffle(tasks)
+    samples = defaultdict(list)
+    setup_errors = defaultdict(int)
+
+    def execute(name):
+        scenario = scenarios[name]
+        if isinstance(scenario, tuple):
+            setup, call = scenario
+            try:
+                context = setup()
+            except (requests.RequestException, ValueError, KeyError, TypeError):
+                # One failed setup request (e.g. a rejected upload) skips this sample, not the run
+                return name, None
+            scenario = lambda: call(context)
+        start = time.perf_counter()
+        try:
+            response = scenario()
+            # Body as sent on the wire, before Content-Encoding is decoded
+            wire = b''.join(response.raw.stream(64 * 1024, decode_content=False))
+            body = decode_body(wire, response.headers.get('Content-Encoding'))
+            elapsed = time.perf_counter() - start
+            queries = response.headers.get('X-Query-Count')
+            return name, (elapsed, response.status_code, int(queries) if queries else None, len(body), len(wire))
+        except requests.RequestException:
+            return name, (time.perf_counter() - start, None, None, 0, 0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, sample in pool.map(execute, tasks):
+            if sample is None:
+                setup_errors[name] += 1
+            else:
+                samples[name].append(sample)
+    return samples, setup_errors, time.perf_counter() - started
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=None,
+                        help=f'Database to seed and benchmark (default: sqlite file {DEFAULT_DATABASE})')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--watch-rows', type=int, default=1000000)
+    parser.add_argument('--reuse-db', action='store_true', help='Skip seeding if the database already has movies')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--scenarios', default='all', help='Comma separated scenario names')
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0)
+    parser.add_argument('--tmdb-latency-ms', type=float, default=150.0)
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--accept-encoding', default=None,
+                        help="Accept-Encoding sent by the client, e.g. identity, gzip or br (default: requests' own)")
+    parser.add_argument('--output', default=None, help='JSON output path (default: benchmarks/results/<ts>_<commit>.json)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = args.database_url or f"sqlite:///{os.path.abspath(DEFAULT_DATABASE)}"
+    if database_url.startswith('sqlite:///'):
+        os.makedirs(os.path.dirname(database_url[len('sqlite:///'):]) or '.', exist_ok=True)
+    os.environ['BENCHMARK_DATABASE_URL'] = database_url
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.models.movie import Movie
+    from app.services.job_service import JobWorker
+    from app.services.recommendation_service import RecommendationService
+    from benchmarks import install_fakes
+    from benchmarks.fakes import FakeS3Service, FakeTMDBService
+    from benchmarks.seed import BENCHMARK_PASSWORD, seed_database
+
+    app = create_app('benchmark')
+    app.config['RECOMMENDATIONS_INDEX_PATH'] = os.path.join(os.path.dirname(DEFAULT_DATABASE), 'recommendations.npz')
+    app.config['VIDEOS_UPLOAD_PATH'] = os.path.join(os.path.dirname(DEFAULT_DATABASE), 'uploads')
+    with app.app_context():
+        db.create_all()
+        if not (args.reuse_db and db.session.query(Movie.id).first()):
+            db.drop_all()
+            db.create_all()
+            seed_database(users=args.users, movies=args.movies, watch_rows=args.watch_rows, seed=args.seed)
+            if os.path.exists(app.config['RECOMMENDATIONS_INDEX_PATH']):
+                os.remove(app.config['RECOMMENDATIONS_INDEX_PATH'])
+        if not os.path.exists(app.config['RECOMMENDATIONS_INDEX_PATH']):
+            started = time.perf_counter()
+            RecommendationService.build_index()
+            print(f'Built recommendation index in {time.perf_counter() - started:.1f}s')
+        movie_count = db.session.query(db.func.max(Movie.id)).scalar() or 1
+
+    install_fakes(
+        FakeS3Service(args.s3_latency_ms, args.jitter_ms, args.seed),
+        FakeTMDBService(args.tmdb_latency_ms, args.jitter_ms, args.seed)
+    )
+
+    # Drain the job queue (upload storage, file deletions) as a `flask jobs work` process would
+    worker = JobWorker(app, concurrency=2, poll_interval=0.2)
+    worker.start()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    client = BenchmarkClient(base_url, args.users, movie_count, args.accept_encoding)
+    client.login_pool(min(args.concurrency, args.users), BENCHMARK_PASSWORD)
+    scenarios = build_scenarios(client, BENCHMARK_PASSWORD)
+    names = list(scenarios) if args.scenarios == 'all' else args.scenarios.split(',')
+
+    print(f'Running {len(names)} scenarios x {args.requests} requests at concurrency {args.concurrency}')
+    samples, setup_errors, wall_time = run_scenarios(scenarios, names, args.requests, args.concurrency, args.seed)
+    server.shutdown()
+    worker.stop()
+
+    all_samples = [s for name in names for s in samples[name]]
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': database_url.split('://')[0],
+            'args': vars(args)
+        },
+        'overall': summarize(all_samples, wall_time, sum(setup_errors.values())),
+        'endpoints': {name: summarize(samples[name], wall_time, setup_errors[name]) for name in names}
+    }
+
+    output = args.output or os.path.join(
+        'benchmarks', 'results', f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}_{report['meta']['commit'] or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'scenario':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'queries':>9}{'errors':>8}")
+    for name in names:
+        row = report['endpoints'][name]
+        latency = row['latency_ms']
+        # str(): a scenario whose every setup failed has no latencies
+        print(f"{name:<24}{str(latency['p50']):>9}{str(latency['p95']):>9}{str(latency['p99']):>9}"
+              f"{row['throughput_rps']:>9}{str(row['queries_per_request']):>9}{row['errors']:>8}")
+    for name in names:
+        if setup_errors[name]:
+            print(f'{name}: {setup_errors[name]} requests skipped after their setup failed')
+    print(f'Wrote {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
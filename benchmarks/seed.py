@@ -0,0 +1,120 @@
+"""Deterministic bulk seeding of users, movies and watch history"""
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.services.genre_service import genre_slug
+from app.models.genre import Genre, movie_genres
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watch_history import WatchHistory
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+GENRES = ['Action', 'Comedy', 'Drama', 'Horror', 'Sci-Fi', 'Documentary', 'Thriller', 'Romance']
+WORDS = ['night', 'river', 'silent', 'city', 'last', 'storm', 'golden', 'shadow', 'lost', 'empire',
+         'winter', 'echo', 'blue', 'iron', 'garden', 'signal']
+
+
+def _insert_batches(table, rows_iter, batch_size):
+    batch = []
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+
+def seed_database(users=10000, movies=100000, watch_rows=1000000, seed=42, batch_size=10000, log=print):
+    """Populate an empty schema at benchmark scale.
+
+    User ``bench_<n>`` rows all share ``BENCHMARK_PASSWORD``; movie ``n`` is
+    uploaded by user ``n % users`` and roughly 80% of movies are public.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+
+    log(f'Seeding {users} users')
+    _insert_batches(User.__table__, (
+        {
+            'id': i + 1,
+            'username': f'bench_{i + 1}',
+            'email': f'bench_{i + 1}@example.com',
+            'password_hash': password_hash,
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for i in range(users)
+    ), batch_size)
+
+    log(f'Seeding {len(GENRES)} genres')
+    _insert_batches(Genre.__table__, (
+        {'id': i + 1, 'name': name, 'slug': genre_slug(name)} for i, name in enumerate(GENRES)
+    ), batch_size)
+    movie_genre_ids = {}
+
+    def genre_for(movie_id):
+        genre_id = rng.randrange(len(GENRES)) + 1
+        movie_genre_ids[movie_id] = genre_id
+        return GENRES[genre_id - 1]
+
+    log(f'Seeding {movies} movies')
+    _insert_batches(Movie.__table__, (
+        {
+            'id': i + 1,
+            'title': ' '.join(rng.choice(WORDS) for _ in range(3)).title() + f' {i + 1}',
+            'description': ' '.join(rng.choice(WORDS) for _ in range(20)),
+            'genre': genre_for(i + 1),
+            'release_date': date(1970, 1, 1) + timedelta(days=rng.randint(0, 20000)),
+            'duration': rng.randint(70, 180),
+            'rating': round(rng.uniform(1, 10), 1),
+            's3_key': f'movies/{i % users + 1}/seed_{i + 1}.mp4',
+            'file_size': rng.randint(100, 5000) * 1024 * 1024,
+            'video_format': 'mp4',
+            'resolution': rng.choice(['720p', '1080p', '4K']),
+            'uploader_id': i % users + 1,
+            'view_count': rng.randint(0, 100000),
+            'is_public': rng.random() < 0.8,
+            'is_featured': rng.random() < 0.02,
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now
+        }
+        for i in range(movies)
+    ), batch_size)
+
+    _insert_batches(movie_genres, (
+        {'movie_id': movie_id, 'genre_id': genre_id} for movie_id, genre_id in movie_genre_ids.items()
+    ), batch_size)
+
+    log(f'Seeding {watch_rows} watch history rows')
+    per_user = max(1, min(movies, watch_rows // max(users, 1)))
+
+    def watch_rows_iter():
+        emitted = 0
+        for user_id in range(1, users + 1):
+            for movie_index in rng.sample(range(movies), per_user):
+                if emitted >= watch_rows:
+                    return
+                total = rng.randint(70, 180) * 60
+                watched = rng.randint(0, total)
+                last = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+                yield {
+                    'user_id': user_id,
+                    'movie_id': movie_index + 1,
+                    'watch_time': watched,
+                    'total_duration': total,
+                    'is_completed': watched >= total * 0.9,
+                    'viewed_at': last - timedelta(minutes=rng.randint(0, 600)),
+                    'last_watched': last
+                }
+                emitted += 1
+
+    _insert_batches(WatchHistory.__table__, watch_rows_iter(), batch_size)
+    log('Seeding complete')
@@ -0,0 +1,69 @@
+"""Measure cold-start time: package import, create_app() and the first request.
+
+Each sample runs in a fresh interpreter so nothing is already imported::
+
+    python -m benchmarks.startup --runs 10 --output benchmarks/results/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.run_benchmark import git_commit
+
+PROBE = r'''
+import json, time
+t0 = time.perf_counter()
+from app import create_app, db
+t1 = time.perf_counter()
+app = create_app('benchmark')
+t2 = time.perf_counter()
+with app.app_context():
+    db.create_all()
+t3 = time.perf_counter()
+response = app.test_client().get('/api/movies')
+t4 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t4 - t3) * 1000,
+    'total_ms': (t2 - t0 + t4 - t3) * 1000,
+    'modules_loaded': len(__import__('sys').modules)
+}))
+'''
+
+
+def sample(env):
+    output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure application cold-start time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', default=None, help='Optional JSON output path')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, BENCHMARK_DATABASE_URL='sqlite://', METRICS_MULTIPROC_DIR='')
+    runs = [sample(env) for _ in range(args.runs)]
+    report = {
+        'meta': {'commit': git_commit(), 'runs': args.runs, 'python': sys.version.split()[0]},
+        'median': {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]},
+        'runs': runs
+    }
+
+    for key, value in report['median'].items():
+        print(f'{key:<20}{value:>10}')
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,26 @@
-#!/usr/bin/env python
-import os
-import sys
-from dotenv import load_dotenv
-from app import create_app
-from app.utils.logger_config import setup_logging
-
-# Load environment variables
-load_dotenv()
-
-# Setup logging
-setup_logging()
-
-# Create Flask app
-app = create_app(os.getenv('FLASK_ENV', 'development'))
-
-if __name__ == '__main__':
-    port = int(os.getenv('FLASK_PORT', 5000))
-    debug = os.getenv('FLASK_ENV') == 'development'
-    app.run(host='0.0.0.0', port=port, debug=debug)
+#!/usr/bin/env python
+# python run.py: development server; python run.py serve: multi-worker production server
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables before config is imported
+load_dotenv()
+
+from app import create_app
+from app.utils.logger_config import setup_logging
+
+# Setup logging
+setup_logging()
+
+# Create Flask app
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['serve']:
+        from app.utils.server import serve
+        serve(app)
+    else:
+        port = int(os.getenv('FLASK_PORT', 5000))
+        debug = os.getenv('FLASK_ENV') == 'development'
+        app.run(host='0.0.0.0', port=port, debug=debug)
@@ -1 +1 @@
-# Tests package
+# Tests package
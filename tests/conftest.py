@@ -1,43 +1,143 @@
-import pytest
-from app import create_app, db
-from app.models.user import User
-
-@pytest.fixture(scope='session')
-def app():
-    """Create application for testing"""
-    app = create_app('testing')
-    
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
-    """Test client"""
-    return app.test_client()
-
-@pytest.fixture
-def runner(app):
-    """CLI runner"""
-    return app.test_cli_runner()
-
-@pytest.fixture
-def auth_headers(client):
-    """Create test user and return auth headers"""
-    # Register test user
-    client.post('/api/auth/register', json={
-        'username': 'testuser',
-        'email': 'test@example.com',
-        'password': 'testpassword123'
-    })
-    
-    # Login and get token
-    response = client.post('/api/auth/login', json={
-        'username': 'testuser',
-        'password': 'testpassword123'
-    })
-    
-    token = response.get_json()['access_token']
-    return {'Authorization': f'Bearer {token}'}
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from app import create_app, db
+from app.models.movie import Movie
+from app.models.user import User
+from app.services import s3_service
+from app.utils.query_budget import check_budget, track_queries
+
+@pytest.fixture(scope='session')
+def app():
+    """Create application for testing"""
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    """Test client"""
+    return app.test_client()
+
+@pytest.fixture
+def runner(app):
+    """CLI runner"""
+    return app.test_cli_runner()
+
+@pytest.fixture
+def auth_headers(client):
+    """Create test user and return auth headers"""
+    # Register test user
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'testpassword123'
+    })
+    
+    # Login and get token
+    response = client.post('/api/auth/login', json={
+        'username': 'testuser',
+        'password': 'testpassword123'
+    })
+    
+    token = response.get_json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def login(client):
+    """Register a user unless it exists and log in; returns the login response plus its auth headers"""
+    def log_in(username):
+        client.post('/api/auth/register', json={
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'password123'
+        })
+        account = client.post('/api/auth/login', json={
+            'username': username,
+            'password': 'password123'
+        }).get_json()
+        account['headers'] = {'Authorization': f"Bearer {account['access_token']}"}
+        return account
+    return log_in
+
+@pytest.fixture
+def create_movies(app):
+    """Create movies titled and keyed after a prefix (movies/<prefix>/<i>.mp4); returns their ids"""
+    def create(uploader_id, prefix, count, **fields):
+        movies = [Movie(title=f'{prefix} {i}', s3_key=f'movies/{prefix}/{i}.mp4', uploader_id=uploader_id, **fields)
+                  for i in range(count)]
+        db.session.add_all(movies)
+        db.session.commit()
+        return [movie.id for movie in movies]
+    return create
+
+class StubS3Service:
+    """In-memory S3Service stand-in; delete_objects refuses the keys in ``failing``"""
+    def __init__(self):
+        self.objects = {}
+        self.modified = {}
+        self.checksums = {}
+        self.failing = set()
+        self.deleted = []
+        self.delete_calls = []
+
+    def put(self, key, size, last_modified=None):
+        """Store ``size`` bytes under key, last modified a week ago unless given"""
+        self.objects[key] = b'\0' * size
+        self.modified[key] = last_modified or datetime.now(timezone.utc) - timedelta(days=7)
+
+    def upload_movie(self, file_obj, key, content_type='video/mp4', metadata=None, part_size=None):
+        self.objects[key] = file_obj.read()
+
+    def get_object_checksum(self, key):
+        return self.checksums.get(key)
+
+    def delete_movie(self, key):
+        self.deleted.append(key)
+        self.objects.pop(key, None)
+
+    def delete_objects(self, keys):
+        self.delete_calls.append(list(keys))
+        errors = {key: 'AccessDenied: denied' for key in keys if key in self.failing}
+        deleted = [key for key in keys if key not in errors]
+        for key in deleted:
+            self.objects.pop(key, None)
+        return deleted, errors
+
+    def iter_objects(self, prefix='', page_size=1000):
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        for key in sorted(self.objects):
+            if key.startswith(prefix):
+                yield key, len(self.objects[key]), self.modified.get(key, week_ago)
+
+    def generate_presigned_url(self, key, expiration=3600):
+        return f'https://example.com/{key}'
+
+@pytest.fixture
+def stub_s3(app, tmp_path, monkeypatch):
+    """Serve s3_service from an in-memory stub for the test; uploads spool to tmp_path"""
+    monkeypatch.setitem(app.config, 'VIDEOS_UPLOAD_PATH', str(tmp_path))
+    stub = StubS3Service()
+    s3_service.override(stub)
+    yield stub
+    s3_service.reset()
+
+@pytest.fixture
+def query_budget(app):
+    """Assert that a block (including any requests it makes) stays within a query budget"""
+    @contextmanager
+    def enforce(max_queries, repeat_threshold=None):
+        with track_queries() as tracker:
+            yield tracker
+        problems = check_budget(
+            tracker,
+            max_queries,
+            repeat_threshold or app.config['QUERY_BUDGET_REPEAT_THRESHOLD'],
+            'block'
+        )
+        assert not problems, '; '.join(problems)
+    return enforce
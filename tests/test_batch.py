@@ -0,0 +1,66 @@
+def test_get_movies_batch_keeps_order_and_reports_per_id(client, auth_headers, login, create_movies, query_budget):
+    """Test many movies come back from one query in request order with per-id errors"""
+    other_id = login('batch_other')['user']['id']
+    public = create_movies(other_id, 'batch-read', 3)
+    private = create_movies(other_id, 'batch-read-private', 1, is_public=False)[0]
+    ids = [public[2], 999999, public[0], private, public[1]]
+
+    with query_budget(1):
+        response = client.get(f'/api/movies/batch?ids={",".join(map(str, ids))}')
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['id'] for result in results] == ids
+    assert [result['status'] for result in results] == [200, 404, 200, 403, 200]
+    assert results[0]['movie']['title'] == 'batch-read 2'
+    assert results[0]['movie']['uploader']['username'] == 'batch_other'
+
+def test_get_movies_batch_rejects_bad_requests(app, client):
+    """Test malformed and oversized id lists are rejected"""
+    assert client.get('/api/movies/batch?ids=1,x').status_code == 400
+    assert client.get('/api/movies/batch').status_code == 400
+    too_many = ','.join(str(i) for i in range(app.config['BATCH_MAX_ITEMS'] + 1))
+    assert client.get(f'/api/movies/batch?ids={too_many}').status_code == 400
+
+def test_record_watch_batch_matches_single_updates(client, login, create_movies, query_budget):
+    """Test a batch applies every update in one transaction with record_watch semantics"""
+    # A separate viewer keeps these entries out of testuser's continue watching row
+    account = login('batch_viewer')
+    user_id, auth_headers = account['user']['id'], account['headers']
+    other_id = login('batch_other')['user']['id']
+    first, second = create_movies(other_id, 'batch-write', 2)
+    own_private = create_movies(user_id, 'batch-write-own', 1, is_public=False)[0]
+    other_private = create_movies(other_id, 'batch-write-other', 1, is_public=False)[0]
+    client.post(f'/api/stream/{first}/watch', headers=auth_headers,
+                json={'watch_time': 100, 'total_duration': 1000})
+
+    updates = [
+        {'movie_id': first, 'watch_time': 950, 'total_duration': 1000},
+        {'movie_id': second, 'watch_time': 10, 'total_duration': 1000},
+        {'movie_id': second, 'watch_time': 200, 'total_duration': 1000},
+        {'movie_id': own_private, 'watch_time': 50, 'total_duration': 1000},
+        {'movie_id': other_private, 'watch_time': 50, 'total_duration': 1000},
+        {'movie_id': 999999, 'watch_time': 50, 'total_duration': 1000},
+        {'movie_id': first, 'watch_time': 'soon'}
+    ]
+    with query_budget(6):
+        response = client.post('/api/stream/watch/batch', headers=auth_headers, json={'updates': updates})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [200, 200, 200, 200, 403, 404, 400]
+    assert results[0]['watch_entry']['is_completed'] is True
+    assert results[2]['watch_entry']['watch_time'] == 200
+
+    history = client.get('/api/stream/history?per_page=100', headers=auth_headers).get_json()['watch_history']
+    watched = {entry['movie_id']: entry['watch_time'] for entry in history}
+    assert watched[first] == 950
+    assert watched[second] == 200
+    assert watched[own_private] == 50
+    assert other_private not in watched
+
+def test_record_watch_batch_rejects_oversized_batches(app, client, auth_headers):
+    """Test a batch above BATCH_MAX_ITEMS is rejected as a whole"""
+    updates = [{'movie_id': 1, 'watch_time': 1, 'total_duration': 10}] * (app.config['BATCH_MAX_ITEMS'] + 1)
+    response = client.post('/api/stream/watch/batch', headers=auth_headers, json={'updates': updates})
+    assert response.status_code == 400
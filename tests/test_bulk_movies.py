@@ -0,0 +1,75 @@
+from app import db
+from app.models.job import Job
+from app.models.movie import Movie
+from app.models.watch_history import WatchHistory
+from app.services.job_service import JobService
+
+def test_bulk_update_changes_only_owned_movies(client, login, create_movies, query_budget):
+    """Test one request updates owned movies and reports the others per id"""
+    account = login('bulk_owner')
+    owner_id, headers = account['user']['id'], account['headers']
+    other_id = login('bulk_other')['user']['id']
+    owned = create_movies(owner_id, 'bulk-update', 3)
+    foreign = create_movies(other_id, 'bulk-update-other', 1)[0]
+
+    # Archive is a new genre: created, then linked to every owned movie
+    with query_budget(6):
+        response = client.post('/api/movies/bulk/update', headers=headers, json={
+            'ids': owned + [foreign, 999999],
+            'changes': {'is_public': False, 'genre': 'Archive'}
+        })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['updated'] == 3
+    assert [result['status'] for result in data['results']] == [200, 200, 200, 403, 404]
+    db.session.expire_all()
+    assert {(movie.is_public, movie.genre) for movie in Movie.query.filter(Movie.id.in_(owned))} == {(False, 'Archive')}
+    assert {tuple(genre.slug for genre in movie.genres) for movie in Movie.query.filter(Movie.id.in_(owned))} == {('archive',)}
+    assert db.session.get(Movie, foreign).is_public is True
+
+def test_bulk_update_rejects_unknown_fields(client, login):
+    """Test only visibility and genre can be changed in bulk"""
+    headers = login('bulk_owner')['headers']
+    response = client.post('/api/movies/bulk/update', headers=headers,
+                           json={'ids': [1], 'changes': {'uploader_id': 1}})
+    assert response.status_code == 400
+
+def test_bulk_delete_queues_batched_s3_deletes(app, client, login, create_movies, stub_s3, query_budget, monkeypatch):
+    """Test rows go in one transaction and files in delete_objects batches run as jobs"""
+    monkeypatch.setattr('app.services.movie_service.S3_DELETE_BATCH_SIZE', 2)
+    account = login('bulk_owner')
+    owner_id, headers = account['user']['id'], account['headers']
+    other_id = login('bulk_other')['user']['id']
+    owned = create_movies(owner_id, 'bulk-delete', 5)
+    foreign = create_movies(other_id, 'bulk-delete-other', 1)[0]
+    db.session.add(WatchHistory(user_id=other_id, movie_id=owned[0], watch_time=10, total_duration=100))
+    db.session.commit()
+    stub_s3.failing = {'movies/bulk-delete/3.mp4'}
+
+    with query_budget(6):
+        response = client.post('/api/movies/bulk/delete', headers=headers, json={'ids': owned + [foreign]})
+
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['deleted'] == 5
+    assert data['results'][5]['status'] == 403
+    assert Movie.query.filter(Movie.id.in_(owned)).count() == 0
+    assert WatchHistory.query.filter_by(movie_id=owned[0]).count() == 0
+    assert db.session.get(Movie, foreign) is not None
+    assert stub_s3.delete_calls == []
+
+    job = Job.query.filter_by(kind='storage.delete_objects').order_by(Job.id.desc()).first()
+    JobService.run_pending()
+    assert [len(batch) for batch in stub_s3.delete_calls] == [2, 2, 1]
+    assert sorted(key for batch in stub_s3.delete_calls for key in batch) == [f'movies/bulk-delete/{i}.mp4' for i in range(5)]
+    # The key S3 refused keeps the job queued for a retry
+    assert job.status == 'queued'
+    assert job.last_error.startswith('RuntimeError: 1 of 5 objects not deleted')
+
+def test_bulk_delete_limits_request_size(app, client, login):
+    """Test requests above BULK_MAX_ITEMS are rejected"""
+    headers = login('bulk_owner')['headers']
+    response = client.post('/api/movies/bulk/delete', headers=headers,
+                           json={'ids': list(range(app.config['BULK_MAX_ITEMS'] + 1))})
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+import gzip
+import json
+import zlib
+from flask import Response, stream_with_context
+from app import create_app
+
+def test_large_listing_is_gzip_encoded(client, login, create_movies):
+    """Test large JSON responses are compressed and decode to the same payload"""
+    create_movies(login('compress_list')['user']['id'], 'compress_list', 30, description='A long description ' * 10)
+
+    plain = client.get('/api/movies?per_page=30', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/api/movies?per_page=30', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+def test_small_responses_are_not_compressed(client):
+    """Test bodies below COMPRESSION_MIN_SIZE are sent as is"""
+    response = client.get('/api/movies/999999', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()
+
+def test_streamed_response_is_compressed_chunk_by_chunk():
+    """Test streamed bodies are encoded incrementally with each chunk flushed"""
+    app = create_app('testing')
+    produced = []
+
+    @app.route('/test/stream')
+    def stream():
+        def generate():
+            for i in range(3):
+                produced.append(i)
+                yield json.dumps({'row': i, 'padding': 'x' * 100}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    @app.route('/test/binary')
+    def binary():
+        return Response(b'\0' * 4096, mimetype='application/octet-stream')
+
+    with app.app_context():
+        test_client = app.test_client()
+        response = test_client.get('/test/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        decoder = zlib.decompressobj(31)
+        chunks = response.response
+        first = decoder.decompress(next(chunks))
+        # The first row is decodable before the generator has produced the rest
+        assert produced == [0]
+        assert json.loads(first.splitlines()[0])['row'] == 0
+        rest = b''.join(decoder.decompress(chunk) for chunk in chunks)
+        assert len((first + rest).splitlines()) == 3
+        response.close()
+
+        assert 'Content-Encoding' not in test_client.get('/test/binary', headers={'Accept-Encoding': 'gzip'}).headers
@@ -0,0 +1,39 @@
+from app.services.movie_service import continue_watching_cache
+
+def test_continue_watching_joins_movies_and_skips_completed(client, auth_headers, create_movies, query_budget):
+    """Test in-progress entries come back with movie fields from one query, then from the cache"""
+    continue_watching_cache.clear()
+    user_id = client.get('/api/users/me', headers=auth_headers).get_json()['id']
+    first, second, finished = create_movies(user_id, 'continue', 3)
+    for movie_id, watch_time in ((first, 600), (second, 1200), (finished, 7000)):
+        client.post(f'/api/stream/{movie_id}/watch', headers=auth_headers,
+                    json={'watch_time': watch_time, 'total_duration': 7200})
+
+    with query_budget(1):
+        response = client.get('/api/users/me/continue-watching', headers=auth_headers)
+
+    assert response.status_code == 200
+    entries = response.get_json()['continue_watching']
+    assert [entry['movie_id'] for entry in entries] == [second, first]
+    assert entries[0]['movie']['title'] == 'continue 1'
+    assert entries[0]['progress_percentage'] == 17
+
+    with query_budget(0):
+        cached = client.get('/api/users/me/continue-watching', headers=auth_headers)
+    assert cached.get_json() == response.get_json()
+
+def test_record_watch_invalidates_continue_watching(client, auth_headers, create_movies):
+    """Test finishing a movie removes it from the cached row"""
+    user_id = client.get('/api/users/me', headers=auth_headers).get_json()['id']
+    movie_id, = create_movies(user_id, 'continue-finished', 1)
+    client.post(f'/api/stream/{movie_id}/watch', headers=auth_headers,
+                json={'watch_time': 600, 'total_duration': 7200})
+    movie_ids = [entry['movie_id'] for entry in
+                 client.get('/api/users/me/continue-watching', headers=auth_headers).get_json()['continue_watching']]
+    assert movie_id in movie_ids
+
+    client.post(f'/api/stream/{movie_id}/watch', headers=auth_headers,
+                json={'watch_time': 7200, 'total_duration': 7200})
+
+    remaining = client.get('/api/users/me/continue-watching', headers=auth_headers).get_json()['continue_watching']
+    assert movie_id not in [entry['movie_id'] for entry in remaining]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models.engagement import MovieDailyStats, MovieEngagement
+from app.models.movie import Movie
+from app.models.watch_history import WatchHistory
+from app.services.engagement_service import EngagementRollup
+
+def _uploader_id(client, headers):
+    return client.get('/api/users/me', headers=headers).get_json()['id']
+
+def test_rollup_counts_only_new_progress(app, client, auth_headers):
+    """Test re-running the rollup adds deltas only and keeps last_watched untouched"""
+    uploader_id = _uploader_id(client, auth_headers)
+    movie = Movie(title='Rollup title', s3_key='movies/rollup/1.mp4', uploader_id=uploader_id)
+    db.session.add(movie)
+    db.session.commit()
+    client.post(f'/api/stream/{movie.id}/watch', headers=auth_headers, json={'watch_time': 600, 'total_duration': 6000})
+
+    EngagementRollup(overlap=timedelta(days=1)).run()
+    entry = WatchHistory.query.filter_by(movie_id=movie.id).one()
+    last_watched = entry.last_watched
+    EngagementRollup(overlap=timedelta(days=1)).run()
+
+    totals = db.session.get(MovieEngagement, movie.id)
+    assert (totals.starts, totals.completions, totals.seconds_watched) == (1, 0, 600)
+    assert WatchHistory.query.filter_by(movie_id=movie.id).one().last_watched == last_watched
+
+    client.post(f'/api/stream/{movie.id}/watch', headers=auth_headers, json={'watch_time': 5800, 'total_duration': 6000})
+    EngagementRollup(overlap=timedelta(days=1)).run()
+
+    db.session.expire_all()
+    totals = db.session.get(MovieEngagement, movie.id)
+    assert (totals.starts, totals.completions, totals.seconds_watched) == (1, 1, 5800)
+    today = MovieDailyStats.query.filter_by(movie_id=movie.id, day=datetime.utcnow().date()).one()
+    assert today.unique_viewers == 1
+
+def test_stats_endpoint_reads_rollups(client, auth_headers, query_budget):
+    """Test uploaders get completion rate and the daily series from the rollup tables"""
+    movie = Movie(title='Stats title', s3_key='movies/rollup/2.mp4', uploader_id=_uploader_id(client, auth_headers))
+    db.session.add(movie)
+    db.session.commit()
+    client.post(f'/api/stream/{movie.id}/watch', headers=auth_headers, json={'watch_time': 5800, 'total_duration': 6000})
+    EngagementRollup(overlap=timedelta(days=1)).run()
+
+    with query_budget(2):
+        response = client.get('/api/users/me/movies/stats?days=7', headers=auth_headers)
+
+    assert response.status_code == 200
+    stats = {movie['title']: movie for movie in response.get_json()['movies']}
+    rollup = stats['Stats title']
+    assert rollup['completion_rate'] == 1.0
+    assert rollup['seconds_watched'] == 5800
+    assert rollup['daily'][-1]['completions'] == 1
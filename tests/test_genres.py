@@ -0,0 +1,153 @@
+import io
+import pytest
+import time
+from datetime import date
+from app import db
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.services.genre_service import GenreService, split_genres
+from app.services.movie_service import catalog_facets_cache
+
+def _create_movie(uploader_id, key, genre, release_date=None, rating=None, is_public=True):
+    genres = GenreService.resolve(split_genres(genre))
+    movie = Movie(title=f'Genre {key}', s3_key=f'movies/genres/{key}.mp4', uploader_id=uploader_id,
+                  release_date=release_date, rating=rating, is_public=is_public)
+    GenreService.assign(movie, genres)
+    db.session.add(movie)
+    db.session.commit()
+    return movie.id
+
+@pytest.fixture(autouse=True)
+def clear_facets():
+    catalog_facets_cache.clear()
+    yield
+    catalog_facets_cache.clear()
+
+def test_split_genres_normalizes_free_text():
+    """Test free-text genres split on separators and dedupe by slug"""
+    assert split_genres(' Drama / sci-fi, Sci Fi | Drama ,') == ['Drama', 'sci-fi']
+    assert split_genres(None) == []
+
+def test_filters_and_facets(client, login, query_budget):
+    """Test genre/year/rating filters and facets counted under the other filters"""
+    user_id = login('genre_owner')['user']['id']
+    noir_old = _create_movie(user_id, 'noir-1931', 'Filmnoir, Mystery', date(1931, 5, 1), 8.2)
+    noir_new = _create_movie(user_id, 'noir-1932', 'Filmnoir', date(1932, 1, 1), 6.5)
+    _create_movie(user_id, 'noir-private', 'Filmnoir', date(1931, 1, 1), 9.0, is_public=False)
+    _create_movie(user_id, 'mystery-1931', 'Mystery', date(1931, 12, 31), 5.0)
+
+    with query_budget(3):
+        response = client.get('/api/movies?genre=FilmNoir')
+
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['filters'] == {'genre': 'filmnoir', 'year': None, 'min_rating': None}
+    assert sorted(movie['id'] for movie in data['movies']) == [noir_old, noir_new]
+    assert data['facets']['year'] == [{'value': 1932, 'count': 1}, {'value': 1931, 'count': 1}]
+    assert data['facets']['min_rating'][:3] == [{'value': 8, 'count': 1}, {'value': 7, 'count': 1},
+                                                {'value': 6, 'count': 2}]
+
+    data = client.get('/api/movies?year=1931&min_rating=7').get_json()
+    assert [movie['id'] for movie in data['movies']] == [noir_old]
+    # The genre facet ignores the genre filter but applies year and rating
+    genres = {item['value']: item for item in data['facets']['genre']}
+    assert genres['filmnoir'] == {'value': 'filmnoir', 'name': 'Filmnoir', 'count': 1}
+    assert genres['mystery']['count'] == 1
+
+    data = client.get('/api/movies?genre=mystery&year=1931').get_json()
+    assert data['total'] == 2
+    assert {item['value']: item['count'] for item in data['facets']['min_rating']}[5] == 2
+
+def test_facets_are_cached_and_cleared_by_writes(client, login, query_budget):
+    """Test facets are served from cache until a movie changes"""
+    account = login('genre_editor')
+    user_id, headers = account['user']['id'], account['headers']
+    movie_id = _create_movie(user_id, 'western-1', 'Western', date(1950, 1, 1), 7.0)
+
+    first = client.get('/api/movies?genre=western').get_json()['facets']
+    with query_budget(2):
+        assert client.get('/api/movies?genre=western').get_json()['facets'] == first
+
+    response = client.put(f'/api/movies/{movie_id}', headers=headers, json={'genre': 'Western / Comedy'})
+    assert response.status_code == 200
+    assert response.get_json()['genre'] == 'Western, Comedy'
+    assert [genre.slug for genre in db.session.get(Movie, movie_id).genres] == ['comedy', 'western']
+
+    data = client.get('/api/movies?year=1950').get_json()
+    assert {item['value'] for item in data['facets']['genre']} >= {'western', 'comedy'}
+    assert client.get('/api/movies?genre=comedy&year=1950').get_json()['total'] == 1
+
+def test_facets_expire_after_writes_in_other_workers(app, client, login, monkeypatch):
+    """Test a write that did not clear this worker's cache shows up once the facets TTL passes"""
+    monkeypatch.setitem(app.config, 'CATALOG_FACETS_CACHE_TTL', 0.2)
+    user_id = login('genre_other_worker')['user']['id']
+    _create_movie(user_id, 'noir-1', 'Noir', date(1946, 1, 1))
+
+    def counts():
+        facets = client.get('/api/movies?year=1946').get_json()['facets']
+        return {item['value']: item['count'] for item in facets['genre']}
+
+    assert counts()['noir'] == 1
+
+    # Written without clearing the cache, as another worker's write is
+    _create_movie(user_id, 'noir-2', 'Noir', date(1946, 1, 1))
+    assert counts()['noir'] == 1
+    time.sleep(0.25)
+    assert counts()['noir'] == 2
+
+def test_upload_links_genres(app, client, login, tmp_path, monkeypatch):
+    """Test uploads link free-text genres and TMDB genre ids"""
+    monkeypatch.setitem(app.config, 'VIDEOS_UPLOAD_PATH', str(tmp_path))
+    headers = login('genre_uploader')['headers']
+    GenreService.sync_tmdb_genres([{'id': 16, 'name': 'Animation'}])
+
+    response = client.post('/api/movies/upload', headers=headers, data={
+        'file': (io.BytesIO(b'video'), 'anime.mp4'),
+        'title': 'Anime',
+        'genre': 'Anime',
+        'genre_ids': '16, 9999',
+        'is_public': 'true'
+    })
+
+    assert response.status_code == 202
+    assert response.get_json()['movie']['genre'] == 'Anime, Animation'
+
+def test_upload_creates_many_new_genres_within_budget(app, client, login, tmp_path, monkeypatch):
+    """Test an upload naming several new genres creates them with one statement, under the route's budget"""
+    monkeypatch.setitem(app.config, 'VIDEOS_UPLOAD_PATH', str(tmp_path))
+    headers = login('genre_many')['headers']
+    names = ['Heist', 'Neo-Noir', 'Space Opera', 'Mumblecore', 'Giallo', 'Wuxia']
+
+    # QUERY_BUDGET_MODE is 'raise' in tests, so a statement per new genre fails the request
+    response = client.post('/api/movies/upload', headers=headers, data={
+        'file': (io.BytesIO(b'many genres'), 'many.mp4'),
+        'title': 'Many genres',
+        'genre': ', '.join(names)
+    })
+
+    assert response.status_code == 202
+    assert response.get_json()['movie']['genre'] == ', '.join(names)
+    assert {genre.name for genre in Genre.query.filter(Genre.name.in_(names))} == set(names)
+
+def test_tmdb_sync_and_genre_ids(client, login):
+    """Test TMDB genres are matched by slug or id and resolve TMDB genre_ids"""
+    _create_movie(login('genre_owner')['user']['id'], 'horror-1', 'Horror')
+
+    created = GenreService.sync_tmdb_genres([{'id': 27, 'name': 'Horror'}, {'id': 10752, 'name': 'War'}])
+
+    assert created == 1
+    assert Genre.query.filter_by(slug='horror').one().tmdb_id == 27
+    assert [genre.slug for genre in GenreService.resolve(tmdb_ids=[10752, 99999])] == ['war']
+    assert 'war' in [genre['slug'] for genre in client.get('/api/movies/genres').get_json()['genres']]
+
+def test_backfill_links_free_text_genres(login):
+    """Test movies with only a free-text genre are linked to genre rows"""
+    user_id = login('genre_owner')['user']['id']
+    movie = Movie(title='Legacy', s3_key='movies/genres/legacy.mp4', uploader_id=user_id, genre='Musical, Drama')
+    db.session.add(movie)
+    db.session.commit()
+
+    assert GenreService.backfill(batch_size=2) >= 1
+    db.session.expire_all()
+    assert [genre.slug for genre in db.session.get(Movie, movie.id).genres] == ['drama', 'musical']
+    assert GenreService.backfill() == 0
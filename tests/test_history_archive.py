@@ -0,0 +1,132 @@
+import json
+import pytest
+import threading
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import create_app, db
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watch_history import ArchivedWatchHistory, WatchHistory
+from app.services.history_archive_service import HistoryArchiver
+from app.services.movie_service import MovieService
+from config.config import TestingConfig
+
+def _history(user_id, ages_in_days):
+    """Create one movie per age with an entry last watched that many days ago"""
+    movies = [Movie(title=f'Archive {user_id}-{i}', s3_key=f'movies/archive/{user_id}-{i}.mp4', uploader_id=user_id)
+              for i in range(len(ages_in_days))]
+    db.session.add_all(movies)
+    db.session.flush()
+    now = datetime.utcnow()
+    db.session.add_all(
+        WatchHistory(user_id=user_id, movie_id=movie.id, watch_time=600, total_duration=1200,
+                     viewed_at=now - timedelta(days=age), last_watched=now - timedelta(days=age))
+        for movie, age in zip(movies, ages_in_days)
+    )
+    db.session.commit()
+    return [movie.id for movie in movies]
+
+def _archived(user_id):
+    return {row.movie_id for row in ArchivedWatchHistory.query.filter_by(user_id=user_id)}
+
+def test_archiver_moves_old_entries_in_batches_and_reads_include_them(client, login):
+    """Test entries untouched past the cutoff move in bounded batches and history pages span both tables"""
+    account = login('archive_reader')
+    user_id, headers = account['user']['id'], account['headers']
+    movie_ids = _history(user_id, [1, 200, 300, 400])
+
+    archiver = HistoryArchiver(timedelta(days=180), batch_size=2)
+    assert archiver.run(max_batches=1) == 2
+    assert _archived(user_id) == {movie_ids[2], movie_ids[3]}  # Oldest first
+    assert archiver.run() >= 1
+    assert _archived(user_id) == set(movie_ids[1:])
+    assert [row.movie_id for row in WatchHistory.query.filter_by(user_id=user_id)] == [movie_ids[0]]
+
+    data = client.get('/api/stream/history?per_page=3', headers=headers).get_json()
+    assert (data['total'], data['pages']) == (4, 2)
+    assert [entry['movie_id'] for entry in data['watch_history']] == movie_ids[:3]
+    assert data['watch_history'][1]['progress_percentage'] == 50
+    page_two = client.get('/api/stream/history?per_page=3&page=2', headers=headers).get_json()
+    assert [entry['movie_id'] for entry in page_two['watch_history']] == movie_ids[3:]
+
+    exported = client.get('/api/users/me/history/export', headers=headers).get_data(as_text=True)
+    assert [json.loads(line)['movie_id'] for line in exported.splitlines()] == movie_ids
+
+def test_watching_again_restores_the_archived_entry(client, login):
+    """Test new progress on an archived entry moves it back with its id, singly and in batches"""
+    account = login('archive_rewatch')
+    user_id, headers = account['user']['id'], account['headers']
+    single, batched = _history(user_id, [365, 365])
+    ids = {row.movie_id: row.id for row in WatchHistory.query.filter_by(user_id=user_id)}
+    HistoryArchiver(timedelta(days=180)).run()
+    assert _archived(user_id) == {single, batched}
+
+    response = client.post(f'/api/stream/{single}/watch', headers=headers, json={'watch_time': 1200, 'total_duration': 1200})
+    assert response.status_code == 200
+    entry = response.get_json()['watch_entry']
+    assert (entry['id'], entry['watch_time'], entry['is_completed']) == (ids[single], 1200, True)
+
+    response = client.post('/api/stream/watch/batch', headers=headers, json={'updates': [
+        {'movie_id': batched, 'watch_time': 900, 'total_duration': 1200}
+    ]})
+    assert response.get_json()['results'][0]['watch_entry']['id'] == ids[batched]
+    assert _archived(user_id) == set()
+    assert WatchHistory.query.filter_by(user_id=user_id).count() == 2
+
+@pytest.mark.filterwarnings('error::sqlalchemy.exc.SAWarning')
+def test_entry_archived_during_a_write_is_restored_and_updated(monkeypatch, tmp_path):
+    """Test record_watch retries when the archiver moves the entry between its read and its update"""
+    # A file database, so the archiver runs on a connection of its own
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/race.db')
+    monkeypatch.setattr(TestingConfig, 'QUERY_BUDGET_MODE', 'log')  # The retry repeats the route's statements
+    race_app = create_app('testing')
+    with race_app.app_context():
+        db.create_all()
+        user = User(username='archive_race', email='archive_race@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        movie_id = _history(user.id, [200])[0]
+        entry_id = WatchHistory.query.filter_by(movie_id=movie_id).one().id
+
+        def archive():
+            with race_app.app_context():
+                archived.append(HistoryArchiver(timedelta(days=180)).run())
+                db.session.remove()
+
+        archived = []
+        def archive_before_first_flush(session, flush_context, instances):
+            if not archived:
+                # The request has read the entry; a concurrent archiver run commits before its UPDATE
+                worker = threading.Thread(target=archive)
+                worker.start()
+                worker.join()
+
+        event.listen(Session, 'before_flush', archive_before_first_flush)
+        try:
+            response = race_app.test_client().post(f'/api/stream/{movie_id}/watch', headers=headers,
+                                                   json={'watch_time': 900, 'total_duration': 1200})
+        finally:
+            event.remove(Session, 'before_flush', archive_before_first_flush)
+
+        assert archived == [1]
+        assert response.status_code == 200
+        entry = response.get_json()['watch_entry']
+        assert (entry['id'], entry['watch_time']) == (entry_id, 900)
+        assert _archived(user.id) == set()
+        db.session.remove()
+        db.engine.dispose()
+
+def test_deleting_a_movie_removes_its_archived_entries(client, login):
+    """Test archived entries go with their movie"""
+    account = login('archive_delete')
+    user_id, headers = account['user']['id'], account['headers']
+    movie_id = _history(user_id, [400])[0]
+    HistoryArchiver(timedelta(days=180)).run()
+
+    assert MovieService.delete_movie(movie_id)
+    assert _archived(user_id) == set()
+    assert client.get('/api/stream/history', headers=headers).get_json()['total'] == 0
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from app import db
+from app.models.movie import Movie
+
+def _watch_movies(client, headers, count):
+    user_id = client.get('/api/users/me', headers=headers).get_json()['id']
+    movies = [Movie(title=f'Export {user_id}-{i}', s3_key=f'movies/export/{user_id}-{i}.mp4', uploader_id=user_id)
+              for i in range(count)]
+    db.session.add_all(movies)
+    db.session.commit()
+    for movie in movies:
+        client.post(f'/api/stream/{movie.id}/watch', headers=headers,
+                    json={'watch_time': 3600, 'total_duration': 7200})
+    return [movie.id for movie in movies]
+
+def test_export_streams_ndjson_in_batches(app, client, login, monkeypatch):
+    """Test the full history streams newest first, one chunk per cursor batch"""
+    monkeypatch.setitem(app.config, 'HISTORY_EXPORT_BATCH_SIZE', 2)
+    headers = login('export_ndjson')['headers']
+    movie_ids = _watch_movies(client, headers, 5)
+    _watch_movies(client, login('export_other')['headers'], 2)
+
+    response = client.get('/api/users/me/history/export', headers=headers, buffered=False)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    chunks = list(response.response)
+    response.close()
+    assert len(chunks) == 3
+
+    entries = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+    assert sorted(entry['movie_id'] for entry in entries) == movie_ids
+    assert entries[0]['title'].startswith('Export ')
+    assert entries[0]['progress_percentage'] == 50
+    assert [entry['last_watched'] for entry in entries] == sorted((entry['last_watched'] for entry in entries), reverse=True)
+
+def test_export_csv(client, login):
+    """Test CSV export has a header row and one row per entry"""
+    headers = login('export_csv')['headers']
+    movie_ids = _watch_movies(client, headers, 3)
+
+    response = client.get('/api/users/me/history/export?format=csv', headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'watch-history.csv' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert sorted(int(row['movie_id']) for row in rows) == movie_ids
+    assert rows[0]['is_completed'] == 'False'
+
+def test_export_rejects_unknown_format(client, auth_headers):
+    """Test an unsupported format is a client error"""
+    response = client.get('/api/users/me/history/export?format=xml', headers=auth_headers)
+
+    assert response.status_code == 400
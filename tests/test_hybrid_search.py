@@ -0,0 +1,101 @@
+import time
+import pytest
+from app import db
+from app.models.movie import Movie
+from app.models.user import User
+from app.services import tmdb_service
+
+class StubTMDB:
+    def __init__(self, results=(), delay=0.0, error=None):
+        self.results = list(results)
+        self.delay = delay
+        self.error = error
+        self.timeout = None
+
+    def search_movies(self, query, page=1, timeout=10):
+        self.timeout = timeout
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {'results': self.results, 'current_page': page, 'total_pages': 1, 'total_results': len(self.results)}
+
+def _tmdb_movie(tmdb_id, title):
+    return {'tmdb_id': tmdb_id, 'title': title, 'description': None, 'release_date': None, 'rating': 7.0,
+            'poster_url': None, 'backdrop_url': None, 'images': {}, 'genre_ids': []}
+
+@pytest.fixture(scope='module')
+def hosted(app):
+    """Public movies titled 'Hybridtitle ...' with TMDB ids, plus a hosted title the text search misses"""
+    owner = User(username='hybrid_owner', email='hybrid_owner@example.com')
+    owner.set_password('password123')
+    db.session.add(owner)
+    db.session.flush()
+    movies = [
+        Movie(title='Hybridtitle Heat', tmdb_id=910001, s3_key='movies/hybrid/heat.mp4', uploader_id=owner.id,
+              is_public=True, view_count=50),
+        Movie(title='Hybridtitle Ronin', tmdb_id=910002, s3_key='movies/hybrid/ronin.mp4', uploader_id=owner.id,
+              is_public=True, view_count=10),
+        Movie(title='Collateral', tmdb_id=910003, s3_key='movies/hybrid/collateral.mp4', uploader_id=owner.id,
+              is_public=True),
+    ]
+    db.session.add_all(movies)
+    db.session.commit()
+    return movies
+
+@pytest.fixture(autouse=True)
+def reset_tmdb():
+    yield
+    tmdb_service.reset()
+
+def test_merges_tmdb_results_after_hosted_titles(client, hosted):
+    """Test hosted titles come first and TMDB results we host are not repeated"""
+    tmdb_service.override(StubTMDB([
+        _tmdb_movie(910002, 'Ronin'),
+        _tmdb_movie(920001, 'Thief'),
+        _tmdb_movie(910003, 'Collateral'),
+        _tmdb_movie(920002, 'Manhunter'),
+    ]))
+
+    response = client.get('/api/movies/search/hybrid?q=hybridtitle')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [(item['source'], item['title']) for item in data['results']] == [
+        ('local', 'Hybridtitle Heat'),
+        ('local', 'Hybridtitle Ronin'),
+        ('local', 'Collateral'),  # Hosted, found through its tmdb_id
+        ('tmdb', 'Thief'),
+        ('tmdb', 'Manhunter'),
+    ]
+    assert data['results'][0]['id'] == hosted[0].id
+    assert data['sources'] == {'local': 3, 'tmdb': 2, 'tmdb_status': 'ok'}
+
+    limited = client.get('/api/movies/search/hybrid?q=hybridtitle&limit=4').get_json()
+    assert [item['source'] for item in limited['results']] == ['local', 'local', 'local', 'tmdb']
+
+def test_late_tmdb_results_are_dropped(app, client, hosted, monkeypatch):
+    """Test the response does not wait for TMDB past the latency budget"""
+    monkeypatch.setitem(app.config, 'HYBRID_SEARCH_TMDB_BUDGET_MS', 50)
+    stub = StubTMDB([_tmdb_movie(920001, 'Thief')], delay=0.5)
+    tmdb_service.override(stub)
+
+    started = time.perf_counter()
+    data = client.get('/api/movies/search/hybrid?q=hybridtitle').get_json()
+
+    assert time.perf_counter() - started < 0.4
+    assert [item['title'] for item in data['results']] == ['Hybridtitle Heat', 'Hybridtitle Ronin']
+    assert data['sources'] == {'local': 2, 'tmdb': 0, 'tmdb_status': 'timeout'}
+    # The abandoned call gives up on its own instead of holding a pool thread
+    assert stub.timeout == 0.05
+
+def test_tmdb_errors_fall_back_to_local_results(client, hosted):
+    """Test a failing TMDB call still answers with hosted titles"""
+    tmdb_service.override(StubTMDB(error=RuntimeError('TMDB down')))
+
+    response = client.get('/api/movies/search/hybrid?q=hybridtitle')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['results']) == 2
+    assert data['sources']['tmdb_status'] == 'error'
+    assert client.get('/api/movies/search/hybrid').status_code == 400
@@ -0,0 +1,90 @@
+import io
+import pytest
+from PIL import Image
+from app import db
+from app.models.movie import Movie
+from app.models.user import User
+from app.services.image_service import DiskLRUCache, ImageService, ImageUnavailable, failed_sources, images
+
+def _jpeg(width=1000, height=1500):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(output, 'JPEG')
+    return output.getvalue()
+
+@pytest.fixture
+def image_source(app, tmp_path, monkeypatch):
+    """Serve sources from memory and cache variants under a temporary directory"""
+    monkeypatch.setitem(app.config, 'IMAGE_CACHE_DIR', str(tmp_path))
+    images._reset()
+    failed_sources.clear()
+    sources = {'poster.jpg': _jpeg()}
+    fetched = []
+
+    def fetch(self, name):
+        fetched.append(name)
+        if name not in sources:
+            raise ImageUnavailable(f'Failed to fetch {name}: 404')
+        return sources[name]
+
+    monkeypatch.setattr(ImageService, '_fetch', fetch)
+    yield fetched
+    images._reset()
+
+def test_image_variants_are_resized_cached_and_immutable(client, image_source):
+    """Test a variant is rendered once from one source fetch and then served from disk"""
+    response = client.get('/api/images/185/webp/poster.jpg')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert Image.open(io.BytesIO(response.data)).size == (185, 278)
+
+    assert client.get('/api/images/185/webp/poster.jpg').data == response.data
+    jpeg = client.get('/api/images/342/jpeg/poster.jpg')
+    assert Image.open(io.BytesIO(jpeg.data)).format == 'JPEG'
+    assert image_source == ['poster.jpg']
+
+    revalidated = client.get('/api/images/185/webp/poster.jpg', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+def test_image_requests_are_validated_and_failures_remembered(client, image_source):
+    """Test unknown widths, formats and names are rejected and failed sources are not refetched"""
+    assert client.get('/api/images/123/webp/poster.jpg').status_code == 404
+    assert client.get('/api/images/185/gif/poster.jpg').status_code == 404
+    assert client.get('/api/images/185/webp/..%2Fsecret.jpg').status_code == 404
+
+    assert client.get('/api/images/185/webp/missing.jpg').status_code == 502
+    assert client.get('/api/images/342/webp/missing.jpg').status_code == 502
+    assert image_source == ['missing.jpg']
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    """Test the cache stays within its byte budget, dropping the oldest unused entry"""
+    cache = DiskLRUCache(str(tmp_path), max_bytes=250)
+    cache.set('a', b'a' * 100)
+    cache.set('b', b'b' * 100)
+    assert cache.get('a') == b'a' * 100
+    cache.set('c', b'c' * 100)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'a' * 100
+    assert len(DiskLRUCache(str(tmp_path), max_bytes=250).get('c') or b'') == 100
+
+def test_movie_details_include_variant_urls(client):
+    """Test TMDB-hosted posters get proxy URLs and posters hosted elsewhere none"""
+    user = User(username='imageuser', email='image@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.flush()
+    movie = Movie(title='Poster', s3_key='movies/images/poster.mp4', uploader_id=user.id,
+                  poster_url='https://image.tmdb.org/t/p/w500/abc123.jpg', backdrop_url='https://example.com/b.jpg')
+    db.session.add(movie)
+    db.session.commit()
+
+    data = client.get(f'/api/movies/{movie.id}').get_json()
+
+    assert data['images']['poster'] == {
+        '185': '/api/images/185/webp/abc123.jpg',
+        '342': '/api/images/342/webp/abc123.jpg',
+        '500': '/api/images/500/webp/abc123.jpg'
+    }
+    assert data['images']['backdrop'] is None
@@ -0,0 +1,255 @@
+import base64
+import hashlib
+import io
+import pytest
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app, db
+from app.models.job import Job
+from app.models.movie import Movie
+from app.models.stored_object import StoredObject
+from app.models.user import User
+from app.services.job_service import JOB_HANDLERS, JobService, job_handler
+from app.services.movie_service import MovieService
+from config.config import TestingConfig
+
+@pytest.fixture
+def flaky_handler():
+    calls = {'runs': 0, 'failures': []}
+
+    @job_handler('test.flaky', on_failure=lambda payload, error: calls['failures'].append(str(error)))
+    def flaky(payload):
+        calls['runs'] += 1
+        if calls['runs'] <= payload['fail_times']:
+            raise RuntimeError('temporary outage')
+
+    yield calls
+    del JOB_HANDLERS['test.flaky']
+
+def _make_due(job):
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+def test_enqueue_is_idempotent(app):
+    """Test the same idempotency key yields one job"""
+    first = JobService.enqueue('test.noop', {'n': 1}, idempotency_key='noop-1')
+    second = JobService.enqueue('test.noop', {'n': 2}, idempotency_key='noop-1')
+    assert first.id == second.id
+    assert Job.query.filter_by(idempotency_key='noop-1').count() == 1
+    db.session.delete(first)
+    db.session.commit()
+
+def test_failed_jobs_retry_with_backoff_then_give_up(app, flaky_handler):
+    """Test a failing job is rescheduled with growing delays and finally marked failed"""
+    job = JobService.enqueue('test.flaky', {'fail_times': 10}, max_attempts=3)
+
+    JobService.run_pending()
+    assert (job.status, job.attempts) == ('queued', 1)
+    first_delay = job.run_at - datetime.utcnow()
+    assert timedelta(seconds=4) < first_delay <= timedelta(seconds=10)
+    assert JobService.run_pending() == 0  # not due yet
+
+    _make_due(job)
+    JobService.run_pending()
+    assert job.run_at - datetime.utcnow() > timedelta(seconds=9)
+
+    _make_due(job)
+    JobService.run_pending()
+    assert (job.status, job.attempts) == ('failed', 3)
+    assert job.last_error == 'RuntimeError: temporary outage'
+    assert flaky_handler['failures'] == ['temporary outage']
+
+def test_crashed_jobs_are_reclaimed_after_visibility_timeout(app, flaky_handler):
+    """Test a job whose worker died is claimed again once its lock expires"""
+    job = JobService.enqueue('test.flaky', {'fail_times': 0})
+    claimed = JobService.claim('crashed-worker')
+    assert claimed.id == job.id
+    assert JobService.claim('other-worker') is None
+
+    claimed.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    reclaimed = JobService.claim('other-worker')
+    assert (reclaimed.id, reclaimed.attempts, reclaimed.locked_by) == (job.id, 2, 'other-worker')
+    assert JobService.execute(reclaimed)
+    assert job.status == 'done'
+
+def test_upload_and_delete_return_before_storage_work(client, auth_headers, stub_s3, tmp_path):
+    """Test uploads and deletes answer 202 and jobs do the S3 work"""
+    response = client.post('/api/movies/upload', headers=auth_headers, data={
+        'title': 'Queued upload',
+        'is_public': 'true',
+        'file': (io.BytesIO(b'frames'), 'queued.mp4')
+    })
+    assert response.status_code == 202
+    movie = response.get_json()['movie']
+    assert movie['upload_status'] == 'pending'
+    assert stub_s3.objects == {}
+    assert client.get(f"/api/stream/{movie['id']}/url", headers=auth_headers).status_code == 409
+
+    JobService.run_pending()
+    assert list(stub_s3.objects.values()) == [b'frames']
+    assert db.session.get(Movie, movie['id']).upload_status == 'ready'
+    assert list(tmp_path.iterdir()) == []
+
+    response = client.delete(f"/api/movies/{movie['id']}", headers=auth_headers)
+    assert response.status_code == 202
+    assert stub_s3.deleted == []
+    JobService.run_pending()
+    assert stub_s3.objects == {}
+
+def _upload(client, headers, content, title):
+    return client.post('/api/movies/upload', headers=headers, data={
+        'title': title,
+        'file': (io.BytesIO(content), 'same.mp4')
+    })
+
+def test_identical_uploads_share_one_stored_object(client, auth_headers, stub_s3, tmp_path):
+    """Test a repeated upload reuses the stored file and the file goes with the last movie using it"""
+    content = f'shared frames {uuid.uuid4()}'.encode()
+    first = _upload(client, auth_headers, content, 'First copy').get_json()['movie']
+    JobService.run_pending()
+    assert list(stub_s3.objects.values()) == [content]
+
+    response = _upload(client, auth_headers, content, 'Second copy')
+    assert response.status_code == 201
+    second = response.get_json()['movie']
+    assert second['upload_status'] == 'ready'
+    assert list(tmp_path.iterdir()) == []
+
+    stored = StoredObject.query.filter_by(sha256=hashlib.sha256(content).hexdigest()).one()
+    assert (stored.ref_count, stored.status) == (2, 'ready')
+    assert stored.s3_key == db.session.get(Movie, second['id']).s3_key == db.session.get(Movie, first['id']).s3_key
+    assert list(stub_s3.objects) == [stored.s3_key]
+
+    client.delete(f"/api/movies/{first['id']}", headers=auth_headers)
+    JobService.run_pending()
+    assert list(stub_s3.objects) == [stored.s3_key]
+    db.session.refresh(stored)
+    assert stored.ref_count == 1
+
+    client.delete(f"/api/movies/{second['id']}", headers=auth_headers)
+    JobService.run_pending()
+    assert stub_s3.objects == {}
+    assert StoredObject.query.filter_by(sha256=hashlib.sha256(content).hexdigest()).first() is None
+
+def test_content_uploaded_again_after_release_gets_a_new_key(client, auth_headers, stub_s3):
+    """Test a released file is deleted even when the same content is uploaded before the release job runs"""
+    content = f'released frames {uuid.uuid4()}'.encode()
+    first = _upload(client, auth_headers, content, 'Released copy').get_json()['movie']
+    JobService.run_pending()
+    released_key = db.session.get(Movie, first['id']).s3_key
+    client.delete(f"/api/movies/{first['id']}", headers=auth_headers)
+
+    again = _upload(client, auth_headers, content, 'Uploaded again').get_json()['movie']
+    JobService.run_pending()
+
+    key = db.session.get(Movie, again['id']).s3_key
+    assert key != released_key
+    assert list(stub_s3.objects) == [key]
+
+def test_deleting_the_last_reference_stays_within_budget(client, auth_headers, stub_s3):
+    """Test deleting a movie with genres, watch history and the last reference to its file, under the route's budget"""
+    content = f'budget frames {uuid.uuid4()}'.encode()
+    response = client.post('/api/movies/upload', headers=auth_headers, data={
+        'title': 'Watched copy',
+        'genre': 'Drama, Action',
+        'file': (io.BytesIO(content), 'watched.mp4')
+    })
+    movie_id = response.get_json()['movie']['id']
+    JobService.run_pending()
+    client.post(f'/api/stream/{movie_id}/watch', headers=auth_headers, json={'watch_time': 60, 'total_duration': 600})
+    key = db.session.get(Movie, movie_id).s3_key
+
+    # QUERY_BUDGET_MODE is 'raise' in tests, so a row-by-row cascade fails the request
+    assert client.delete(f'/api/movies/{movie_id}', headers=auth_headers).status_code == 202
+    assert db.session.get(Movie, movie_id) is None
+    assert StoredObject.query.filter_by(sha256=hashlib.sha256(content).hexdigest()).first() is None
+    JobService.run_pending()
+    assert key not in stub_s3.objects
+
+@pytest.mark.filterwarnings('error::sqlalchemy.exc.SAWarning')
+def test_upload_racing_the_last_delete_stores_the_content_again(monkeypatch, tmp_path, stub_s3):
+    """Test an upload that finds the stored file just before its last reference goes stores a new copy"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/race.db')
+    monkeypatch.setattr(TestingConfig, 'VIDEOS_UPLOAD_PATH', str(tmp_path / 'spool'))
+    race_app = create_app('testing')
+    content = b'raced frames'
+    digest = hashlib.sha256(content)
+    with race_app.app_context():
+        db.create_all()
+        user = User(username='upload_race', email='upload_race@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        stored = StoredObject(sha256=digest.hexdigest(), s3_key='movies/sha256/raced/old', size=len(content),
+                              checksum_sha256=base64.b64encode(digest.digest()).decode(), status='ready')
+        db.session.add(stored)
+        db.session.flush()
+        movie = Movie(title='Last reference', s3_key=stored.s3_key, stored_object_id=stored.id, uploader_id=user.id)
+        db.session.add(movie)
+        db.session.commit()
+        old_key, movie_id = stored.s3_key, movie.id
+        stub_s3.put(old_key, len(content))
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        db.session.remove()
+        
+        def delete():
+            with race_app.app_context():
+                deleted.append(MovieService.delete_movie(movie_id))
+                db.session.remove()
+        
+        deleted, raced = [], []
+        def delete_before_claim(conn, cursor, statement, parameters, context, executemany):
+            if not raced and statement.startswith('UPDATE stored_objects'):
+                # The upload has found the stored file; the last movie using it is deleted before the claim
+                raced.append(True)
+                worker = threading.Thread(target=delete)
+                worker.start()
+                worker.join()
+        
+        event.listen(db.engine, 'before_cursor_execute', delete_before_claim)
+        try:
+            response = _upload(race_app.test_client(), headers, content, 'Raced copy')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', delete_before_claim)
+        
+        assert deleted == [True]
+        assert response.status_code == 202
+        new = StoredObject.query.filter_by(sha256=digest.hexdigest()).one()
+        assert (new.ref_count, new.status) == (1, 'pending')
+        assert new.s3_key != old_key
+        JobService.run_pending()
+        assert list(stub_s3.objects) == [new.s3_key]
+        assert db.session.get(Movie, response.get_json()['movie']['id']).upload_status == 'ready'
+        db.session.remove()
+        db.engine.dispose()
+
+def test_checksum_mismatch_fails_every_movie_sharing_the_file(client, auth_headers, stub_s3):
+    """Test a stored file that does not match what was received fails its pending movies, and a new upload retries"""
+    content = f'corrupted frames {uuid.uuid4()}'.encode()
+    store_jobs = Job.query.filter_by(kind='storage.store_object')
+    queued_before = store_jobs.count()
+    first = _upload(client, auth_headers, content, 'Pending copy').get_json()['movie']
+    second = _upload(client, auth_headers, content, 'Pending duplicate')
+    assert second.status_code == 202  # Shares the upload still in flight
+    assert store_jobs.count() == queued_before + 1
+    job = store_jobs.order_by(Job.id.desc()).first()
+
+    job.max_attempts = 1
+    db.session.commit()
+    stored = StoredObject.query.filter_by(sha256=hashlib.sha256(content).hexdigest()).one()
+    stub_s3.checksums[stored.s3_key] = 'not-the-checksum'
+    JobService.run_pending()
+    assert job.last_error.startswith('ValueError: Checksum mismatch')
+    assert stored.status == 'failed'
+    assert {db.session.get(Movie, movie_id).upload_status for movie_id in (first['id'], second.get_json()['movie']['id'])} == {'failed'}
+
+    del stub_s3.checksums[stored.s3_key]
+    retry = _upload(client, auth_headers, content, 'Retried copy')
+    assert retry.status_code == 202
+    JobService.run_pending()
+    assert db.session.get(Movie, retry.get_json()['movie']['id']).upload_status == 'ready'
+    assert stored.ref_count == 3
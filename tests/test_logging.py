@@ -0,0 +1,64 @@
+import io
+import json
+import logging
+from app.utils.logger_config import (JsonFormatter, REQUEST_ID_HEADER, SamplingFilter, parse_sample_rates,
+                                     setup_logging, stop_logging)
+
+def test_request_id_is_generated_or_propagated(client):
+    """Test every response carries a request id, reusing a sane incoming one"""
+    generated = client.get('/api/movies/genres').headers[REQUEST_ID_HEADER]
+    assert len(generated) == 32
+
+    response = client.get('/api/movies/genres', headers={REQUEST_ID_HEADER: 'lb-1234'})
+    assert response.headers[REQUEST_ID_HEADER] == 'lb-1234'
+
+    response = client.get('/api/movies/genres', headers={REQUEST_ID_HEADER: 'x' * 500})
+    assert response.headers[REQUEST_ID_HEADER] != 'x' * 500
+
+def test_sampling_filter_keeps_warnings():
+    """Test sampled loggers drop INFO records at rate 0 but never warnings, and children inherit the rate"""
+    sampling = SamplingFilter(parse_sample_rates('app.access=0, other=1'))
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, 'message', (), None)
+
+    assert not sampling.filter(record('app.access', logging.INFO))
+    assert not sampling.filter(record('app.access.child', logging.INFO))
+    assert sampling.filter(record('app.access', logging.WARNING))
+    assert sampling.filter(record('app.services', logging.INFO))
+
+def test_queued_json_logging_with_request_ids(app, client, tmp_path):
+    """Test records from a request are written as JSON by the listener, tagged with its id"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    try:
+        setup_logging(sample_rates={}, stream=stream, log_dir=str(tmp_path))
+        client.get('/api/movies/genres', headers={REQUEST_ID_HEADER: 'log-test'})
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            logging.getLogger('app.test').exception('Failed %s', 'thing')
+    finally:
+        stop_logging()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    access = next(entry for entry in entries if entry['logger'] == 'app.access')
+    assert access['request_id'] == 'log-test'
+    assert access['status'] == 200 and access['path'] == '/api/movies/genres'
+    failure = next(entry for entry in entries if entry['logger'] == 'app.test')
+    assert failure['message'] == 'Failed thing'
+    assert 'ValueError: broken' in failure['exception']
+    assert (tmp_path / 'app.log').read_text().count('log-test') >= 1
+
+def test_json_formatter_includes_extra_fields():
+    """Test extra fields become JSON keys"""
+    record = logging.LogRecord('app', logging.INFO, __file__, 1, 'Hello %s', ('world',), None)
+    record.duration_ms = 1.5
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == 'Hello world'
+    assert entry['duration_ms'] == 1.5
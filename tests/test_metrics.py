@@ -0,0 +1,41 @@
+import pytest
+from app.utils.metrics import MetricsRegistry, instrumented, registry, render_prometheus
+
+def test_metrics_endpoint_reports_request_latency(client):
+    """Test per-endpoint latency histograms are exposed in Prometheus format"""
+    client.get('/api/movies')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_request_duration_seconds_count{endpoint="movies.list_movies",method="GET"}' in body
+    assert 'http_requests_total{endpoint="movies.list_movies",method="GET",status="200"}' in body
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in body
+
+def test_instrumented_records_errors():
+    """Test external call errors are counted and still raised"""
+    @instrumented('s3', 'test_failure')
+    def failing_call():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        failing_call()
+
+    body = render_prometheus([registry.snapshot()])
+    assert 'external_call_errors_total{service="s3",operation="test_failure"} 1' in body
+
+def test_snapshots_from_several_workers_are_summed():
+    """Test multi-process snapshots merge into one exposition"""
+    worker = MetricsRegistry()
+    worker.inc('cache_requests_total', (('cache', 'test'), ('result', 'hit')))
+    worker.observe('http_request_duration_seconds', (('endpoint', 'x'), ('method', 'GET')), 0.02)
+    snapshot = worker.snapshot()
+
+    body = render_prometheus([snapshot, snapshot])
+
+    assert 'cache_requests_total{cache="test",result="hit"} 2' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="x",method="GET",le="0.025"} 2' in body
+    assert 'http_request_duration_seconds_count{endpoint="x",method="GET"} 2' in body
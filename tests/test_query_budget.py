@@ -0,0 +1,64 @@
+import pytest
+from app import create_app, db
+from app.models.movie import Movie
+from app.models.user import User
+from app.utils.query_budget import QueryBudgetExceeded, query_budget as declare_budget, statement_shape
+
+def test_statement_shape_ignores_parameters():
+    """Test IN lists and literals collapse to the same shape"""
+    assert statement_shape('SELECT * FROM movies WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT *  FROM movies WHERE id IN (?, ?)')
+    assert statement_shape('SELECT * FROM movies LIMIT 20') == statement_shape('SELECT * FROM movies LIMIT 5')
+
+def test_profile_stays_within_budget(client, login, create_movies, query_budget):
+    """Test the public profile counts uploads instead of loading them"""
+    user_id = login('budgetuser')['user']['id']
+    create_movies(user_id, 'budgetuser', 10)
+
+    with query_budget(2):
+        response = client.get(f'/api/users/{user_id}')
+
+    assert response.status_code == 200
+    assert response.get_json()['total_uploads'] == 10
+    assert response.headers['X-Query-Count'] == '2'
+
+def test_movie_detail_loads_uploader_in_one_query(client, login, create_movies, query_budget):
+    """Test movie details with uploader use a single joined query"""
+    user_id = login('detailuser')['user']['id']
+    create_movies(user_id, 'detailuser', 1)
+    movie = Movie.query.filter_by(uploader_id=user_id).first()
+    movie_id = movie.id
+    db.session.expunge_all()
+
+    with query_budget(1):
+        response = client.get(f'/api/movies/{movie_id}')
+
+    assert response.status_code == 200
+    assert response.get_json()['uploader']['username'] == 'detailuser'
+
+def test_repeated_statements_are_reported(app, login, create_movies, query_budget):
+    """Test an N+1 loop is caught by the repeated statement detector"""
+    user_id = login('nplusone')['user']['id']
+    create_movies(user_id, 'nplusone', 6)
+    db.session.expunge_all()
+
+    with pytest.raises(AssertionError, match='possible N\\+1'):
+        with query_budget(None):
+            for movie in Movie.query.filter_by(uploader_id=user_id).all():
+                User.query.filter_by(id=movie.uploader_id).first()
+
+def test_route_over_budget_raises():
+    """Test a route exceeding its declared budget fails in raise mode"""
+    app = create_app('testing')
+
+    @app.route('/test/over-budget')
+    @declare_budget(1)
+    def over_budget():
+        User.query.count()
+        Movie.query.count()
+        return 'ok'
+
+    with app.app_context():
+        db.create_all()
+        with pytest.raises(QueryBudgetExceeded):
+            app.test_client().get('/test/over-budget')
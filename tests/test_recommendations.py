@@ -0,0 +1,85 @@
+import numpy as np
+from app import db
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watch_history import WatchHistory
+from app.services.recommendation_index import CoWatchMatrix, RecommendationIndex
+
+def test_incremental_refresh_tracks_full_build():
+    """Test folding in new watch rows stores exact scores and keeps the top-K close to a rebuild"""
+    rng = np.random.default_rng(7)
+    users = rng.integers(1, 150, 2000)
+    movies = rng.integers(1, 200, 2000)
+
+    full = RecommendationIndex.build(users, movies, watermark=2000, k=10)
+    incremental = RecommendationIndex.build(users[:1900], movies[:1900], watermark=1900, k=10)
+    recomputed = incremental.refresh(users[1900:], movies[1900:], watermark=2000)
+
+    assert 0 < recomputed < len(full.movie_ids)
+    assert np.array_equal(incremental.movie_ids, full.movie_ids)
+    matrix = CoWatchMatrix(incremental.users, incremental.movies)
+    overlap = []
+    for row, movie_id in enumerate(full.movie_ids):
+        candidates, similarity = matrix.similarities(row)
+        exact = dict(zip(matrix.movie_ids[candidates].tolist(), similarity.tolist()))
+        listed = incremental.neighbours[row][incremental.neighbours[row] != 0]
+        for neighbour, score in zip(listed.tolist(), incremental.scores[row].tolist()):
+            assert abs(exact[neighbour] - score) < 1e-6
+        expected = set(full.neighbours[row][full.neighbours[row] != 0].tolist())
+        overlap.append(len(expected & set(listed.tolist())) / max(len(expected), 1))
+    assert np.mean(overlap) > 0.95
+    assert incremental.refresh(users[:10], movies[:10], watermark=2000) == 0
+
+def test_index_round_trips_through_disk(tmp_path):
+    """Test a saved index loads back with the same neighbours"""
+    index = RecommendationIndex.build([1, 1, 2, 2, 3], [10, 11, 10, 11, 12], watermark=5, k=3)
+    index.save(str(tmp_path / 'index.npz'))
+
+    loaded = RecommendationIndex.load(str(tmp_path / 'index.npz'))
+
+    assert loaded.similar(10, 5) == [(11, 1.0)]
+    assert loaded.recommend([10], 5) == [(11, 1.0)]
+    assert loaded.similar(99, 5) == []
+    assert loaded.watermark == 5
+
+def test_similar_and_recommendation_endpoints(app, client, runner, tmp_path, monkeypatch):
+    """Test the endpoints serve the index built by the CLI"""
+    monkeypatch.setitem(app.config, 'RECOMMENDATIONS_INDEX_PATH', str(tmp_path / 'index.npz'))
+    client.post('/api/auth/register', json={'username': 'rec_viewer', 'email': 'rec_viewer@example.com',
+                                            'password': 'password123'})
+    login = client.post('/api/auth/login', json={'username': 'rec_viewer', 'password': 'password123'}).get_json()
+    auth_headers = {'Authorization': f"Bearer {login['access_token']}"}
+    me = login['user']['id']
+    uploader = User(username='rec_uploader', email='rec_uploader@example.com')
+    uploader.set_password('password123')
+    db.session.add(uploader)
+    db.session.flush()
+    movies = [Movie(title=f'Rec {i}', s3_key=f'movies/rec/{i}.mp4', uploader_id=uploader.id) for i in range(3)]
+    db.session.add_all(movies)
+    db.session.flush()
+    first, second, third = (movie.id for movie in movies)
+    db.session.add_all([
+        WatchHistory(user_id=uploader.id, movie_id=first),
+        WatchHistory(user_id=uploader.id, movie_id=second),
+        WatchHistory(user_id=me, movie_id=first),
+    ])
+    db.session.commit()
+
+    fallback = client.get('/api/users/me/recommendations', headers=auth_headers).get_json()
+    assert fallback['source'] == 'popular'
+
+    result = runner.invoke(args=['recommendations', 'build'])
+    assert 'Indexed' in result.output
+
+    similar = client.get(f'/api/movies/{first}/similar').get_json()
+    assert [movie['id'] for movie in similar['movies']] == [second]
+
+    recommended = client.get('/api/users/me/recommendations', headers=auth_headers).get_json()
+    assert recommended['source'] == 'co_watch'
+    assert [movie['id'] for movie in recommended['movies']] == [second]
+
+    db.session.add(WatchHistory(user_id=me, movie_id=third))
+    db.session.commit()
+    result = runner.invoke(args=['recommendations', 'refresh'])
+    assert 'Recomputed' in result.output
+    assert third in [movie['id'] for movie in client.get(f'/api/movies/{first}/similar').get_json()['movies']]
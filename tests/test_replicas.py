@@ -0,0 +1,111 @@
+import time
+import pytest
+from app import create_app, db
+from app.models.movie import Movie
+from app.models.user import User
+from app.services.movie_service import MovieService
+from app.utils.db_routing import LAST_WRITE_COOKIE
+from config.config import TestingConfig
+
+def make_app(monkeypatch, tmp_path, replica_uris):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/primary.db')
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_REPLICA_URIS', replica_uris)
+    return create_app('testing')
+
+def seed(app, replica_keys):
+    """Create the same movie on every database, titled after the database it lives in"""
+    db.create_all()
+    user = User(username='replica_owner', email='replica_owner@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.flush()
+    movie = Movie(title='primary', s3_key='movies/replica-test.mp4', uploader_id=user.id, is_public=True)
+    db.session.add(movie)
+    db.session.commit()
+    user_row = {column.name: getattr(user, column.name) for column in User.__table__.columns}
+    movie_row = {column.name: getattr(movie, column.name) for column in Movie.__table__.columns}
+
+    for key in replica_keys:
+        engine = db.engines[key]
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(User.__table__.insert(), user_row)
+            connection.execute(Movie.__table__.insert(), dict(movie_row, title=key))
+    db.session.remove()
+    return movie.id
+
+@pytest.fixture
+def replica_app(monkeypatch, tmp_path):
+    app = make_app(monkeypatch, tmp_path, [f'sqlite:///{tmp_path}/replica_0.db', f'sqlite:///{tmp_path}/replica_1.db'])
+    with app.app_context():
+        movie_id = seed(app, ['replica_0', 'replica_1'])
+        yield app, movie_id
+
+def test_reads_are_spread_across_replicas(replica_app):
+    """Test decorated reads go to the replicas in turn"""
+    app, movie_id = replica_app
+    client = app.test_client()
+
+    titles = [client.get(f'/api/movies/{movie_id}').get_json()['title'] for _ in range(4)]
+
+    assert titles == ['replica_0', 'replica_1', 'replica_0', 'replica_1']
+    # Undecorated reads stay on the primary
+    assert db.session.get(Movie, movie_id).title == 'primary'
+
+def test_reads_after_own_write_use_primary(replica_app):
+    """Test a session that has written reads its own changes from the primary"""
+    app, movie_id = replica_app
+
+    assert MovieService.get_movie_with_uploader(movie_id).title.startswith('replica_')
+    db.session.remove()
+
+    MovieService.update_movie(movie_id, {'description': 'changed'})
+    movie = MovieService.get_movie_with_uploader(movie_id)
+
+    assert movie.title == 'primary'
+    assert movie.description == 'changed'
+
+def test_client_sticks_to_primary_after_writing(replica_app):
+    """Test the last-write cookie keeps a client on the primary while replicas catch up"""
+    app, movie_id = replica_app
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'replica_owner', 'password': 'password123'})
+    headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    response = client.put('/api/users/me', json={'first_name': 'Rita'}, headers=headers)
+    assert LAST_WRITE_COOKIE in response.headers.get('Set-Cookie', '')
+
+    assert client.get(f'/api/movies/{movie_id}').get_json()['title'] == 'primary'
+
+    stale_client = app.test_client()
+    stale_client.set_cookie(LAST_WRITE_COOKIE, str(time.time() - app.config['REPLICA_STICKY_SECONDS'] - 1))
+    assert stale_client.get(f'/api/movies/{movie_id}').get_json()['title'].startswith('replica_')
+
+def test_unavailable_replica_falls_back_to_primary(monkeypatch, tmp_path):
+    """Test a failing replica is skipped and the read is retried on the primary"""
+    app = make_app(monkeypatch, tmp_path, [f'sqlite:///{tmp_path}/missing/replica.db'])
+
+    with app.app_context():
+        movie_id = seed(app, [])
+        pool = app.extensions['replicas']
+
+        response = app.test_client().get(f'/api/movies/{movie_id}')
+
+        assert response.status_code == 200
+        assert response.get_json()['title'] == 'primary'
+        assert pool.healthy() == []
+
+        # Still down: later reads go straight to the primary without touching the replica
+        assert MovieService.get_movie_with_uploader(movie_id).title == 'primary'
+
+        # Once a probe succeeds the replica is used again
+        (tmp_path / 'missing').mkdir()
+        db.metadata.create_all(pool.engines['replica_0'])
+        monkeypatch.setattr(pool, 'check_interval', 0)
+        db.session.remove()
+        assert MovieService.get_movie_with_uploader(movie_id) is None
+        assert pool.healthy() == ['replica_0']
+
+def test_no_replicas_configured(app):
+    """Test routing is off without replica URLs"""
+    assert 'replicas' not in app.extensions
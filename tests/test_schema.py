@@ -0,0 +1,38 @@
+from sqlalchemy import Column, MetaData, String, Table, inspect
+from app import create_app, db
+from app.models.movie import Movie
+from app.models.user import User
+from config.config import TestingConfig
+
+def test_init_db_upgrades_tables_from_an_older_release(monkeypatch, tmp_path):
+    """Test init-db adds the new movie columns and relaxes the s3_key index on an existing database"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/old.db')
+    old_app = create_app('testing')
+    with old_app.app_context():
+        # movies as the first release created it
+        old = MetaData()
+        User.__table__.to_metadata(old)
+        movies = Table('movies', old, Column('s3_key', String(500), nullable=False, unique=True, index=True), *(
+            column._copy() for column in Movie.__table__.columns
+            if column.name not in ('s3_key', 'stored_object_id', 'upload_status')
+        ))
+        old.create_all(db.engine)
+        with db.engine.begin() as connection:
+            connection.execute(movies.insert().values(title='Old upload', s3_key='movies/old.mp4', uploader_id=1))
+
+        result = old_app.test_cli_runner().invoke(args=['init-db'])
+
+        assert result.exit_code == 0, result.output
+        assert 'Added column movies.stored_object_id' in result.output
+        assert 'Recreated index ix_movies_s3_key' in result.output
+        inspector = inspect(db.engine)
+        assert {'stored_object_id', 'upload_status'} <= {column['name'] for column in inspector.get_columns('movies')}
+        indexes = {index['name']: index for index in inspector.get_indexes('movies')}
+        assert not indexes['ix_movies_s3_key']['unique']
+        assert 'ix_movies_public_rating' in indexes
+        assert Movie.query.filter_by(s3_key='movies/old.mp4').one().upload_status == 'ready'
+
+        rerun = old_app.test_cli_runner().invoke(args=['init-db'])
+        assert rerun.output == 'Database tables created\n'
+        db.session.remove()
+        db.engine.dispose()
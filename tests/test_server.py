@@ -0,0 +1,61 @@
+import json
+import os
+from types import SimpleNamespace
+from app import create_app, db
+from app.utils.metrics import _MultiprocessWriter, merge_snapshots, registry
+from app.utils.server import post_fork, prepare_master, server_options, worker_exit
+from config.config import TestingConfig
+
+def test_server_options_preload_and_recycle(app, monkeypatch):
+    """Test the production server preloads the app and picks its worker class from the thread count"""
+    monkeypatch.setitem(app.config, 'SERVER_THREADS', 1)
+    options = server_options(app.config)
+
+    assert options['preload_app'] is True
+    assert options['worker_class'] == 'sync'
+    assert options['max_requests'] == app.config['SERVER_MAX_REQUESTS']
+
+    monkeypatch.setitem(app.config, 'SERVER_THREADS', 8)
+    assert server_options(app.config)['worker_class'] == 'gthread'
+
+def test_static_manifest_is_built_before_workers_fork(app, monkeypatch):
+    """Test the master hashes the frontend once instead of every worker on its first request"""
+    manifest = app.extensions['static_assets']
+    monkeypatch.setattr(manifest, 'assets', None)
+    prepare_master(app)
+    assert manifest.assets['index.html'].variants['identity']
+
+def test_post_fork_discards_inherited_connections(monkeypatch, tmp_path):
+    """Test a forked worker starts with an empty connection pool"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path}/server.db')
+    server_app = create_app('testing')
+    with server_app.app_context():
+        db.session.execute(db.text('SELECT 1'))
+        db.session.remove()
+        pool = db.engine.pool
+        assert pool.checkedin() == 1
+
+    post_fork(SimpleNamespace(app=SimpleNamespace(application=server_app)), None)
+
+    with server_app.app_context():
+        assert db.engine.pool is not pool
+        assert db.engine.pool.checkedin() == 0
+        assert db.session.execute(db.text('SELECT 1')).scalar() == 1
+        db.session.remove()
+
+def test_worker_exit_folds_metrics_into_the_retired_file(tmp_path):
+    """Test recycled workers leave one aggregate file instead of a file per pid"""
+    writer = _MultiprocessWriter(str(tmp_path), 5)
+    server = SimpleNamespace(app=SimpleNamespace(application=SimpleNamespace(extensions={'metrics_writer': writer})))
+    key = ('cache_requests_total', (('cache', 'recycled'), ('result', 'hit')))
+    registry.inc(*key)
+    writer.flush()
+    assert os.path.exists(writer.path)
+
+    worker_exit(server, None)
+    worker_exit(server, None)  # A second worker with the same samples
+
+    assert sorted(os.listdir(tmp_path)) == ['metrics_retired.json', 'metrics_retired.lock']
+    with open(writer.retired_path) as f:
+        _, counters, _ = merge_snapshots([json.load(f)])
+    assert counters[key] == 2
@@ -0,0 +1,61 @@
+import logging
+import re
+import time
+from app import create_app
+from app.services import tmdb_service
+from app.utils.metrics import instrumented
+from config.config import TestingConfig
+
+class SlowTMDB:
+    @instrumented('tmdb')
+    def search_movies(self, query, page=1, timeout=10):
+        time.sleep(0.02)
+        return {'results': [], 'page': page, 'total_pages': 0, 'total_results': 0}
+
+def spans(response):
+    return {name: (float(duration), desc) for name, duration, desc in
+            re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers['Server-Timing'])}
+
+def test_server_timing_reports_database_time(client, auth_headers):
+    """Test the header counts the request's queries (budgeted or not) and ends with the total"""
+    response = client.get('/api/users/me/movies', headers=auth_headers)
+
+    timing = spans(response)
+    assert int(timing['db'][1].split()[0]) >= int(response.headers['X-Query-Count']) > 0
+    assert timing['total'][0] >= timing['db'][0]
+
+def test_server_timing_reports_external_calls(client, auth_headers):
+    """Test instrumented TMDB calls show up as their own span"""
+    tmdb_service.override(SlowTMDB())
+    try:
+        response = client.get('/api/movies/tmdb/search?q=heat', headers=auth_headers)
+    finally:
+        tmdb_service.reset()
+
+    assert response.status_code == 200
+    timing = spans(response)
+    assert timing['tmdb'][0] >= 20
+    assert timing['tmdb'][1] == '1 calls'
+    assert 'db' not in timing or timing['db'][0] < timing['tmdb'][0]
+
+def test_slow_requests_are_logged(app, client, auth_headers, monkeypatch, caplog):
+    """Test requests over the threshold log their breakdown"""
+    monkeypatch.setitem(app.config, 'SERVER_TIMING_SLOW_MS', 1)
+    tmdb_service.override(SlowTMDB())
+    try:
+        with caplog.at_level(logging.WARNING, logger='app.utils.server_timing'):
+            client.get('/api/movies/tmdb/search?q=heat', headers=auth_headers)
+    finally:
+        tmdb_service.reset()
+
+    record = next(record for record in caplog.records if record.name == 'app.utils.server_timing')
+    assert 'tmdb' in record.spans
+
+def test_server_timing_disabled(monkeypatch):
+    """Test no header is added when the feature is off"""
+    monkeypatch.setattr(TestingConfig, 'SERVER_TIMING_ENABLED', False)
+    disabled_app = create_app('testing')
+
+    response = disabled_app.test_client().get('/api/auth/verify')
+
+    assert 'Server-Timing' not in response.headers
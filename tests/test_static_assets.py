@@ -0,0 +1,42 @@
+import gzip
+import re
+from app.utils.compression import choose_encoding
+
+def test_index_references_fingerprinted_assets(client):
+    """Test index.html points at content-hashed, immutable asset URLs"""
+    response = client.get('/')
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    html = response.get_data(as_text=True)
+    script = re.search(r'src="/(app\.[0-9a-f]{12}\.js)"', html).group(1)
+
+    asset = client.get(f'/{script}', headers={'Accept-Encoding': 'gzip'})
+
+    assert asset.status_code == 200
+    assert asset.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert asset.headers['Content-Encoding'] == 'gzip'
+    assert asset.headers['Vary'] == 'Accept-Encoding'
+    assert b'function' in gzip.decompress(asset.data)
+
+def test_conditional_request_returns_not_modified(client):
+    """Test ETag revalidation of the index page"""
+    etag = client.get('/').headers['ETag']
+
+    response = client.get('/', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+
+def test_unknown_paths_fall_back_to_index_except_api(client):
+    """Test client-side routes serve the app shell while unknown API paths 404"""
+    assert b'<html' in client.get('/movies/42').data.lower()
+    assert client.get('/api/does-not-exist').status_code == 404
+
+def test_choose_encoding_honours_quality_values():
+    """Test Accept-Encoding negotiation"""
+    available = ('br', 'gzip', 'identity')
+    assert choose_encoding('gzip, deflate, br', available) == 'br'
+    assert choose_encoding('br;q=0.5, gzip', available) == 'gzip'
+    assert choose_encoding('br;q=0, gzip;q=0', available) == 'identity'
+    assert choose_encoding(None, available) == 'identity'
+    assert choose_encoding('*', ('gzip', 'identity')) == 'gzip'
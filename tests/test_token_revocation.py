@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from app import db
+from app.models.revoked_token import RevokedToken
+from app.models.user import User
+from app.services.token_revocation_service import revocations
+from app.utils.bloom import BloomFilter
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def test_bloom_filter_has_no_false_negatives():
+    """Added items are always found and few others are"""
+    bloom = BloomFilter(1000, 0.01)
+    added = [str(uuid.uuid4()) for _ in range(1000)]
+    for item in added:
+        bloom.add(item)
+    
+    assert all(item in bloom for item in added)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+    assert false_positives < 300
+    assert len(bloom) == 1000 and not bloom.full
+    bloom.add('one more')
+    assert bloom.full
+
+def test_logout_revokes_access_and_refresh_tokens(client, login):
+    """Both tokens stop working after logout"""
+    tokens = login('revoke_user')
+    assert client.get('/api/auth/verify', headers=bearer(tokens['access_token'])).status_code == 200
+    
+    response = client.post('/api/auth/logout', headers=bearer(tokens['access_token']),
+                           json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    assert response.get_json()['revoked'] == 2
+    
+    assert client.get('/api/auth/verify', headers=bearer(tokens['access_token'])).status_code == 401
+    assert client.post('/api/auth/refresh', headers=bearer(tokens['refresh_token'])).status_code == 401
+
+def test_logout_rejects_another_users_refresh_token(client, login):
+    """A refresh token can only be revoked by its owner"""
+    mine = login('revoke_owner')
+    theirs = login('revoke_other')
+    
+    response = client.post('/api/auth/logout', headers=bearer(mine['access_token']),
+                           json={'refresh_token': theirs['refresh_token']})
+    assert response.status_code == 400
+    assert client.get('/api/auth/verify', headers=bearer(theirs['access_token'])).status_code == 200
+
+def test_unrevoked_token_is_checked_without_queries(app, client, login, monkeypatch):
+    """The Bloom filter answers for tokens that were never revoked"""
+    monkeypatch.setitem(app.config, 'TOKEN_BLOCKLIST_SYNC_INTERVAL', 3600)
+    tokens = login('revoke_fast_path')
+    client.get('/api/auth/verify', headers=bearer(tokens['access_token']))  # Builds the filter
+    
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get('/api/auth/verify', headers=bearer(tokens['access_token']))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    
+    assert response.status_code == 200
+    assert not any('revoked_tokens' in statement for statement in statements)
+
+def test_revocation_by_another_process_is_synced(app, client, login):
+    """Rows written elsewhere are picked up by the next sync"""
+    tokens = login('revoke_elsewhere')
+    headers = bearer(tokens['access_token'])
+    assert client.get('/api/auth/verify', headers=headers).status_code == 200
+    
+    jti = decode_token(tokens['access_token'])['jti']
+    user = User.query.filter_by(username='revoke_elsewhere').first()
+    db.session.add(RevokedToken(jti=jti, token_type='access', user_id=user.id,
+                                expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.session.commit()
+    
+    assert client.get('/api/auth/verify', headers=headers).status_code == 401
+
+def test_prune_removes_expired_revocations(app):
+    """Expired rows are deleted and the filter is rebuilt without them"""
+    user = User(username='revoke_prune', email='revoke_prune@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.flush()
+    expired, live = str(uuid.uuid4()), str(uuid.uuid4())
+    db.session.add_all([
+        RevokedToken(jti=expired, token_type='access', user_id=user.id,
+                     expires_at=datetime.utcnow() - timedelta(minutes=1)),
+        RevokedToken(jti=live, token_type='refresh', user_id=user.id,
+                     expires_at=datetime.utcnow() + timedelta(days=1)),
+    ])
+    db.session.commit()
+    
+    assert revocations.prune() >= 1
+    assert RevokedToken.query.filter_by(jti=expired).first() is None
+    assert revocations.is_revoked(live)
+    assert not revocations.is_revoked(expired)
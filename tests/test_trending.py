@@ -0,0 +1,50 @@
+import math
+from app.models.trending_score import TrendingScore
+from app.services.trending_service import EPOCH, TrendingEngine, logaddexp, trending
+
+HOUR = 3600
+
+def test_scores_decay_with_half_life(app):
+    """Test an event loses half its weight per half-life and recent events outrank old ones"""
+    engine = TrendingEngine()
+    now = EPOCH + 1000 * HOUR
+    engine._loaded = True
+    engine.record(1, 4.0, now=now - 48 * HOUR)
+    engine.record(2, 1.5, now=now)
+
+    ranked = dict(engine.top(10, now=now))
+
+    assert math.isclose(ranked[1], 1.0, rel_tol=1e-9)
+    assert math.isclose(ranked[2], 1.5, rel_tol=1e-9)
+    assert [movie_id for movie_id, _ in engine.top(10, now=now)] == [2, 1]
+    assert math.isclose(logaddexp(math.log(2), math.log(3)), math.log(5))
+
+def test_top_list_keeps_only_the_best(app, monkeypatch):
+    """Test the in-memory ranking is bounded by TRENDING_TOP_SIZE"""
+    monkeypatch.setitem(app.config, 'TRENDING_TOP_SIZE', 3)
+    engine = TrendingEngine()
+    engine._loaded = True
+    for movie_id in range(1, 11):
+        engine.record(movie_id, float(movie_id), now=EPOCH)
+    engine.record(2, 100.0, now=EPOCH)
+
+    assert [movie_id for movie_id, _ in engine.top(10, now=EPOCH)] == [2, 10, 9]
+
+def test_trending_endpoint_ranks_streams_and_persists(client, auth_headers, login, create_movies, stub_s3, query_budget):
+    """Test stream URL issues and watch progress feed /api/movies/trending and survive a flush"""
+    quiet, popular = create_movies(login('trending_uploader')['user']['id'], 'trending_uploader', 2)
+    client.get(f'/api/stream/{quiet}/url', headers=auth_headers)
+    for _ in range(3):
+        client.get(f'/api/stream/{popular}/url', headers=auth_headers)
+    client.post(f'/api/stream/{quiet}/watch', headers=auth_headers, json={'watch_time': 60, 'total_duration': 600})
+
+    with query_budget(2):
+        response = client.get('/api/movies/trending')
+
+    ranked = [movie['id'] for movie in response.get_json()['movies']]
+    assert ranked.index(popular) < ranked.index(quiet)
+
+    trending.flush()
+    stored = {row.movie_id: row.log_score for row in TrendingScore.query.filter(TrendingScore.movie_id.in_([quiet, popular]))}
+    assert stored[popular] > stored[quiet]
+    assert not trending._pending